@@ -0,0 +1,82 @@
+# Compares the speed of parsing OpenGaze REC messages with the generic
+# XML parser (a regular expression fix-up and lxml) against the record
+# tokenizer that OpenGazeTracker uses for REC messages.
+#
+# Usage:
+#     python benchmark.py [debug_log.txt]
+#
+# Optionally pass the path to a debug log that was recorded with
+# OpenGazeTracker(debug=True); all its incoming REC messages will then be
+# used. Without a log, the benchmark uses the messages below, which were
+# recorded from a GP3 with all data fields enabled.
+
+import re
+import sys
+import time
+
+import lxml.etree
+
+from pygaze._eyetracker.opengaze import OpenGazeTracker
+
+
+RECORDED = [
+    '<REC CNT="1842" TIME="31.47058" TIME_TICK="110254093855" FPOGX="0.48861" FPOGY="0.52106" FPOGS="30.98271" FPOGD="0.48787" FPOGID="112" FPOGV="1" LPOGX="0.49725" LPOGY="0.51460" LPOGV="1" RPOGX="0.47997" RPOGY="0.52752" RPOGV="1" BPOGX="0.48861" BPOGY="0.52106" BPOGV="1" LPCX="0.38125" LPCY="0.56374" LPD="17.21474" LPS="1.01352" LPV="1" RPCX="0.61488" RPCY="0.55921" RPD="16.84208" RPS="1.01352" RPV="1" LEYEX="-0.03126" LEYEY="0.00614" LEYEZ="0.63917" LPUPILD="0.00416" LPUPILV="1" REYEX="0.03209" REYEY="0.00607" REYEZ="0.64053" RPUPILD="0.00410" RPUPILV="1" CX="0.50052" CY="0.49948" CS="0" USER="0" />',
+    '<REC CNT="1843" TIME="31.47724" TIME_TICK="110254117012" FPOGX="0.48861" FPOGY="0.52106" FPOGS="30.98271" FPOGD="0.49453" FPOGID="112" FPOGV="1" LPOGX="0.49801" LPOGY="0.51391" LPOGV="1" RPOGX="0.48032" RPOGY="0.52817" RPOGV="1" BPOGX="0.48917" BPOGY="0.52104" BPOGV="1" LPCX="0.38127" LPCY="0.56371" LPD="17.22031" LPS="1.01349" LPV="1" RPCX="0.61490" RPCY="0.55925" RPD="16.84720" RPS="1.01349" RPV="1" LEYEX="-0.03126" LEYEY="0.00614" LEYEZ="0.63919" LPUPILD="0.00416" LPUPILV="1" REYEX="0.03209" REYEY="0.00607" REYEZ="0.64055" RPUPILD="0.00411" RPUPILV="1" CX="0.50052" CY="0.49948" CS="0" USER="0" />',
+    '<REC CNT="1844" TIME="31.48389" TIME_TICK="110254140163" FPOGX="0.48861" FPOGY="0.52106" FPOGS="30.98271" FPOGD="0.50118" FPOGID="112" FPOGV="1" LPOGX="0.00000" LPOGY="0.00000" LPOGV="0" RPOGX="0.48110" RPOGY="0.52773" RPOGV="1" BPOGX="0.48110" BPOGY="0.52773" BPOGV="1" LPCX="0.00000" LPCY="0.00000" LPD="0.00000" LPS="1.01349" LPV="0" RPCX="0.61492" RPCY="0.55927" RPD="16.85105" RPS="1.01349" RPV="1" LEYEX="0.00000" LEYEY="0.00000" LEYEZ="0.00000" LPUPILD="0.00000" LPUPILV="0" REYEX="0.03209" REYEY="0.00607" REYEZ="0.64056" RPUPILD="0.00411" RPUPILV="1" CX="0.50052" CY="0.49948" CS="0" USER="0" />',
+    ]
+
+
+def read_debug_log(path):
+
+    """Returns all incoming REC messages in an OpenGazeTracker debug log."""
+
+    messages = []
+    with open(path, 'r') as f:
+        for line in f:
+            i = line.find('Incoming: <REC')
+            if i >= 0:
+                messages.append(line[i+len('Incoming: '):].strip())
+    return messages
+
+
+def parse_lxml(xml):
+
+    """The generic parser, as it was used for all messages."""
+
+    xml = re.sub(r'(=".+?")', r'\1 ', xml)
+    e = lxml.etree.fromstring(xml)
+    return (e.tag, e.attrib)
+
+
+def benchmark(parse, messages, repeats):
+
+    t0 = time.perf_counter()
+    for i in range(repeats):
+        for msg in messages:
+            parse(msg)
+    return (time.perf_counter() - t0) / (repeats * len(messages))
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1:
+        messages = read_debug_log(sys.argv[1])
+    else:
+        messages = RECORDED
+    repeats = max(1, 100000 // len(messages))
+
+    # An OpenGazeTracker without a connection, as we only need its parser.
+    tracker = OpenGazeTracker.__new__(OpenGazeTracker)
+    tracker._rec_fields = None
+
+    # Both parsers should produce the same attributes.
+    for msg in messages:
+        if dict(parse_lxml(msg)[1]) != tracker._parse_msg(msg)[1]:
+            raise Exception("Parsers disagree on message: {}".format(msg))
+
+    t_lxml = benchmark(parse_lxml, messages, repeats)
+    t_rec = benchmark(tracker._parse_msg, messages, repeats)
+    print("{} messages, {} repeats".format(len(messages), repeats))
+    print("regex + lxml:     {:.2f} us per message".format(t_lxml * 1e6))
+    print("record tokenizer: {:.2f} us per message".format(t_rec * 1e6))
+    print("speed-up:         {:.1f}x".format(t_lxml / t_rec))
@@ -11,7 +11,7 @@ controls = [
    'min_val': 0,
    'max_val': 1000,
    'suffix': ' ms',
-   'tooltip': 'A pause between messages to avoid overloading the eye tracker'},
+   'tooltip': 'A pause between messages to avoid overloading the eye tracker; leave at 2 to use the eye tracker\'s own safe rate, which is never shortened; messages are sent in the background, so the experiment does not wait'},
   {'type': 'checkbox',
    'var': 'auto_log',
    'label': 'Automatically log all variables',
@@ -30,11 +30,17 @@ class PygazeLog(Item):
     
     def run(self):
         self.set_item_onset()
+        # Messages are queued, and sent to the eye tracker in the background
+        # with at least the backend's own message interval between them. They
+        # keep the time at which they were queued, so this item does not need
+        # to wait. A throttle that was changed from its default can only make
+        # the interval longer, never shorter than what the backend needs.
+        tracker = self.experiment.pygaze_eyetracker
+        if self.var.throttle != 2:
+            tracker.message_interval = max(type(tracker).message_interval,
+                self.var.throttle)
         for msg in self.var.msg.split(u'\n'):
-            self.experiment.pygaze_eyetracker.log(self.syntax.eval_text(msg))
-            self.clock.sleep(self.var.throttle)
+            tracker.log_async(self.syntax.eval_text(msg))
         if self.var.auto_log == u'yes':
             for logvar, info in self.experiment.var.inspect().items():
-                self.experiment.pygaze_eyetracker.log_var(
-                    logvar, info[u'value'])
-                self.clock.sleep(self.var.throttle)
+                tracker.log_var_async(logvar, info[u'value'])
@@ -46,11 +46,20 @@
 #        
 #        print("Display.show call at %d" % int(pygaze.clock.get_time()))
 #
+# The frame timing methods are the exception: these are the same for all
+# subclasses, which only need to pass the time of every flip to _flipped.
+
+from pygaze._display.frametiming import FrameTimer
+
 
 class BaseDisplay:
 
     """A class for Display objects, to present Screen objects on a monitor"""
 
+    # the FrameTimer that flips are passed to, or None when frame timing was
+    # not started
+    _frametimer = None
+
     def __init__(self):
 
         """
@@ -181,3 +190,138 @@ class BaseDisplay:
         """
 
         pass
+
+
+    def start_frame_timing(self, tracker=None, nframes=600):
+
+        """
+        Starts recording the time of every flip (i.e. every call to
+        Display.show), to estimate the refresh period and to detect
+        dropped frames. Dropped frames are logged to the eye tracker, so
+        that compromised trials can be excluded in the analysis.
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        tracker    --    an eyetracker.EyeTracker instance to which
+                    FRAME_DROPPED messages should be logged, or None to
+                    not log them (default = None)
+        nframes    --    the number of flip intervals that are kept in the
+                    ring buffer (default = 600)
+        
+        returns
+        
+        None
+        """
+
+        self._frametimer = FrameTimer(tracker=tracker, nframes=nframes)
+
+    def stop_frame_timing(self):
+
+        """
+        Stops recording the flip times.
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        report    --    the final frame timing report (see
+                    Display.get_frame_timing), or None when frame timing
+                    was not started
+        """
+
+        report = self.get_frame_timing()
+        self._frametimer = None
+        return report
+
+    def get_frame_timing(self):
+
+        """
+        Summarizes the flip times that were recorded since calling
+        Display.start_frame_timing.
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        report    --    a dict with the number of flips ("nflips"), the
+                    estimated refresh period in milliseconds ("period"),
+                    the total number of dropped frames ("dropped"), the
+                    number of flips that came too late ("events"), the
+                    longest flip interval ("max_interval") and a dict of
+                    flip interval percentiles ("percentiles"); or None
+                    when frame timing was not started
+        """
+
+        if self._frametimer is None:
+            return None
+        return self._frametimer.report()
+
+    def _flipped(self, t):
+
+        """
+        Passes the time of a flip to the frame timer, if frame timing was
+        started (internal use)
+        
+        arguments
+        
+        t        --    the time of the flip in milliseconds
+        
+        returns
+        
+        None
+        """
+
+        if self._frametimer is not None:
+            self._frametimer.flip(t)
+
+
+    def play_sequence(self, screens, frames_per_item=1, tracker=None):
+
+        """
+        Presents a sequence of Screens frame-locked, e.g. for rapid serial
+        visual presentation or flicker paradigms. All Screens are converted
+        to the display's format before the first one is presented, so that
+        every refresh only needs to present a prepared image. Note that
+        the timing is locked to the monitor's refresh rate only when
+        flipping waits for the vertical retrace (which is the default in
+        PsychoPy, but depends on the driver in PyGame).
+        
+        arguments
+        
+        screens    --    a list of screen.Screen instances
+        
+        keyword arguments
+        
+        frames_per_item    --    the number of refreshes for which each
+                        Screen should be presented: a single integer
+                        for all Screens, or a list with an integer for
+                        every Screen (default = 1)
+        tracker    --    an eyetracker.EyeTracker instance to which the
+                    onset of every Screen is logged, or None to not log
+                    the onsets; messages are queued with log_async, so
+                    call the tracker's flush_messages to wait until they
+                    are written (default = None)
+        
+        returns
+        
+        onsets    --    a list with the flip time of the first frame of
+                    every Screen
+        """
+
+        pass
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of PyGaze - the open-source toolbox for eye tracking
+#
+#    PyGaze is a Python module for easily creating gaze contingent experiments
+#    or other software (as well as non-gaze contingent experiments/software)
+#    Copyright (C) 2012-2013  Edwin S. Dalmaijer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+from pygaze.py3compat import *
+
+
+class FrameTimer:
+
+    """Keeps track of the timing of Display flips, to estimate the refresh
+    period and to detect dropped frames (internal use)"""
+
+    def __init__(self, tracker=None, nframes=600, threshold=1.5):
+
+        """
+        Initializes a FrameTimer instance.
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        tracker    --    an eyetracker.EyeTracker instance to which dropped
+                    frames are logged, or None to not log them
+                    (default = None)
+        nframes    --    the number of flip times that are kept in the ring
+                    buffer (default = 600)
+        threshold    --    a flip interval that is longer than threshold
+                    times the refresh period counts as a dropped frame
+                    (default = 1.5)
+        """
+
+        self.tracker = tracker
+        self.nframes = int(nframes)
+        self.threshold = threshold
+        self.reset()
+
+
+    def reset(self):
+
+        """
+        Empties the ring buffer, and forgets the refresh period estimate.
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        None
+        """
+
+        self._intervals = [0.0] * self.nframes
+        self._index = 0
+        self._count = 0
+        self._last = None
+        self.period = None
+        self.nflips = 0
+        self.dropped = 0
+        self.events = 0
+
+
+    def flip(self, t):
+
+        """
+        Registers a flip, and checks whether frames were dropped since the
+        previous one.
+        
+        arguments
+        
+        t        --    the time of the flip in milliseconds
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        missed    --    the number of frames that were dropped before this
+                    flip
+        """
+
+        self.nflips += 1
+        last = self._last
+        self._last = t
+        if last is None:
+            return 0
+
+        interval = t - last
+        self._intervals[self._index] = interval
+        self._index = (self._index + 1) % self.nframes
+        self._count = min(self._count + 1, self.nframes)
+
+        # the median is robust against the dropped frames themselves; we
+        # do not sort the buffer on every flip, but only every so often
+        if self.period is None:
+            if self._count >= 10:
+                self.period = self._median()
+        elif self.nflips % 60 == 0:
+            self.period = self._median()
+
+        missed = 0
+        if self.period is not None and interval > self.threshold * self.period:
+            missed = int(round(interval / self.period)) - 1
+            self.dropped += missed
+            self.events += 1
+            if self.tracker is not None:
+                self.tracker.log("FRAME_DROPPED time=%.3f missed=%d interval=%.3f period=%.3f" \
+                    % (t, missed, interval, self.period))
+
+        return missed
+
+
+    def percentile(self, p):
+
+        """
+        Returns a percentile of the flip intervals in the ring buffer.
+        
+        arguments
+        
+        p        --    the percentile, a value between 0 and 100
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        interval    --    the flip interval in milliseconds, or None when
+                    no intervals were recorded yet
+        """
+
+        if self._count == 0:
+            return None
+        intervals = sorted(self._intervals[:self._count])
+        i = int(round((p / 100.0) * (self._count - 1)))
+        return intervals[min(max(i, 0), self._count - 1)]
+
+
+    def report(self, percentiles=(1, 5, 50, 95, 99)):
+
+        """
+        Summarizes the flip timing.
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        percentiles    --    the interval percentiles that should be
+                        reported (default = (1, 5, 50, 95, 99))
+        
+        returns
+        
+        report    --    a dict with the number of flips ("nflips"), the
+                    estimated refresh period in milliseconds ("period"),
+                    the total number of dropped frames ("dropped"), the
+                    number of flips that came too late ("events"), the
+                    longest interval in the buffer ("max_interval") and
+                    a dict of interval percentiles ("percentiles")
+        """
+
+        if self._count > 0:
+            period = self._median()
+            max_interval = max(self._intervals[:self._count])
+        else:
+            period = self.period
+            max_interval = None
+
+        return {
+            "nflips": self.nflips,
+            "period": period,
+            "dropped": self.dropped,
+            "events": self.events,
+            "max_interval": max_interval,
+            "percentiles": dict([(p, self.percentile(p)) for p in percentiles]),
+            }
+
+
+    def _median(self):
+
+        """Returns the median flip interval in the ring buffer"""
+
+        return self.percentile(50)
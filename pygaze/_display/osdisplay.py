@@ -60,7 +60,9 @@ class OSDisplay(BaseDisplay):
 
         # See _display.basedisplay.BaseDisplay for documentation
 
-        return self.canvas.show()
+        t = self.canvas.show()
+        self._flipped(t)
+        return t
 
     def show_part(self, rect, screen=None):
 
@@ -82,3 +84,32 @@ class OSDisplay(BaseDisplay):
         # See _display.basedisplay.BaseDisplay for documentation
 
         pass
+
+
+    def play_sequence(self, screens, frames_per_item=1, tracker=None):
+
+        # See _display.basedisplay.BaseDisplay for documentation
+
+        if type(frames_per_item) == int:
+            frames_per_item = [frames_per_item] * len(screens)
+        if len(frames_per_item) != len(screens):
+            raise osexception("Error in libscreen.Display.play_sequence: frames_per_item should be an integer, or a list with an integer for every screen!")
+
+        # OpenSesame canvases are already prepared for fast presentation
+        canvases = [screen.canvas for screen in screens]
+
+        onsets = []
+        for i, cnv in enumerate(canvases):
+            for frame in range(frames_per_item[i]):
+                t = cnv.show()
+                self._flipped(t)
+                if frame == 0:
+                    onsets.append(t)
+                    # queue the message, so that the tracker does not hold
+                    # up the next flip; it keeps the time it was queued at
+                    if tracker is not None:
+                        tracker.log_async("sequence_item %d" % i)
+        if len(canvases) > 0:
+            self.canvas = canvases[-1]
+
+        return onsets
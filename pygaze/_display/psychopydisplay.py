@@ -25,6 +25,7 @@ from pygaze._misc.misc import rgb2psychorgb
 from pygaze.libtime import clock
 from pygaze._display.basedisplay import BaseDisplay
 
+from psychopy.visual import BufferImageStim
 from psychopy.visual import Window
 
 # we try importing the copy_docstr function, but as we do not really need it
@@ -79,7 +80,9 @@ class PsychoPyDisplay(BaseDisplay):
         # See _display.basedisplay.BaseDisplay for documentation
 
         pygaze.expdisplay.flip()
-        return clock.get_time()
+        t = clock.get_time()
+        self._flipped(t)
+        return t
 
     def show_part(self, rect, screen=None):
 
@@ -113,3 +116,37 @@ class PsychoPyDisplay(BaseDisplay):
 
         pygaze.expdisplay.getMovieFrame(buffer="front")
         pygaze.expdisplay.saveMovieFrames(filename)
+
+
+    def play_sequence(self, screens, frames_per_item=1, tracker=None):
+
+        # See _display.basedisplay.BaseDisplay for documentation
+
+        if type(frames_per_item) == int:
+            frames_per_item = [frames_per_item] * len(screens)
+        if len(frames_per_item) != len(screens):
+            raise Exception("Error in libscreen.Display.play_sequence: frames_per_item should be an integer, or a list with an integer for every screen!")
+
+        # render every screen into a single texture up front, so that only
+        # one stimulus needs to be drawn for each frame of the sequence
+        images = []
+        for screen in screens:
+            images.append(BufferImageStim(pygaze.expdisplay, \
+                stim=screen.screen))
+            pygaze.expdisplay.clearBuffer()
+
+        onsets = []
+        for i, image in enumerate(images):
+            for frame in range(frames_per_item[i]):
+                image.draw()
+                pygaze.expdisplay.flip()
+                t = clock.get_time()
+                self._flipped(t)
+                if frame == 0:
+                    onsets.append(t)
+                    # queue the message, so that the tracker does not hold
+                    # up the next flip; it keeps the time it was queued at
+                    if tracker is not None:
+                        tracker.log_async("sequence_item %d" % i)
+
+        return onsets
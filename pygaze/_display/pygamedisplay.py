@@ -33,6 +33,7 @@ import pygame.draw
 import pygame.image
 
 from pygaze._display.basedisplay import BaseDisplay
+from pygaze._misc.pygameevents import dispatcher
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -83,13 +84,19 @@ class PyGameDisplay(BaseDisplay):
         else:
             pygaze.expdisplay.fill(self.bgc)
 
+        # read input events on a background Thread
+        if settings.INPUTTHREAD:
+            dispatcher.start()
+
 
     def show(self):
 
         # See _display.basedisplay.BaseDisplay for documentation
 
         pygame.display.flip()
-        return clock.get_time()
+        t = clock.get_time()
+        self._flipped(t)
+        return t
 
 
     def show_part(self, rect, screen=None):
@@ -130,6 +137,7 @@ class PyGameDisplay(BaseDisplay):
 
         # See _display.basedisplay.BaseDisplay for documentation
 
+        dispatcher.stop()
         pygame.display.quit()
 
 
@@ -138,3 +146,33 @@ class PyGameDisplay(BaseDisplay):
         # See _display.basedisplay.BaseDisplay for documentation
 
         pygame.image.save(pygaze.expdisplay, filename)
+
+
+    def play_sequence(self, screens, frames_per_item=1, tracker=None):
+
+        # See _display.basedisplay.BaseDisplay for documentation
+
+        if type(frames_per_item) == int:
+            frames_per_item = [frames_per_item] * len(screens)
+        if len(frames_per_item) != len(screens):
+            raise Exception("Error in libscreen.Display.play_sequence: frames_per_item should be an integer, or a list with an integer for every screen!")
+
+        # convert all screens to the pixel format of the display up front,
+        # so that blitting them during the sequence is as fast as possible
+        surfaces = [screen.screen.convert() for screen in screens]
+
+        onsets = []
+        for i, surface in enumerate(surfaces):
+            for frame in range(frames_per_item[i]):
+                pygaze.expdisplay.blit(surface, (0,0))
+                pygame.display.flip()
+                t = clock.get_time()
+                self._flipped(t)
+                if frame == 0:
+                    onsets.append(t)
+                    # queue the message, so that the tracker does not hold
+                    # up the next flip; it keeps the time it was queued at
+                    if tracker is not None:
+                        tracker.log_async("sequence_item %d" % i)
+
+        return onsets
@@ -1,12 +1,12 @@
 import os
 import sys
-import copy
 import time
 import datetime
 import ctypes
-from multiprocessing import Queue
 from threading import Event, Lock, Thread
 
+from pygaze._eyetracker.samplequeue import SampleQueue, SampleRing
+
 # Auto-detect whether we're running 32 or 64 bit, and decide which DLL to load.
 if sys.maxsize > 2**32:
     dll_name = "CEtAPIx64.dll"
@@ -419,12 +419,10 @@ class AleaTracker:
             self._log_consolidation_freq = 60
 
         # LOGGING THREAD
-        # Initialise a new Queue to push samples through.
-        self._logging_queue = Queue()
-        # Set an event that signals when DATA IS BEING logged. This is set
-        # by the logging Thread to signal that the Queue is empty.
-        self._logging_queue_empty = Event()
-        self._logging_queue_empty.set()
+        # Initialise a new Queue to push samples through. The logging
+        # Thread marks samples as done after writing them, so that other
+        # Threads can wait until the Queue is flushed.
+        self._logging_queue = SampleQueue(name="Alea log")
         # Set an event to signal when data SHOULD BE logged. This is set
         # to signal to the logging Thread that it should log or not.
         self._recording = Event()
@@ -438,11 +436,13 @@ class AleaTracker:
                 args=[])
 
         # STREAMING THREAD
-        # Create a placeholder for the most recent sample.
-        self._recent_sample = CAleaData()
-        # Create a Lock to prevent simultaneous access to the most recent
-        # sample by the streaming thread and the sample function.
-        self._recent_sample_lock = Lock()
+        # Create a preallocated ring buffer for recent samples. Only the
+        # streaming Thread writes to it, so the sample function and the
+        # logging Thread can read it without a Lock. Samples are passed on
+        # to the logging Thread by their sequence number in this ring.
+        self._sample_ring = SampleRing(CAleaData)
+        # Create a single struct for the API to write incoming data to.
+        self._incoming_sample = CAleaData()
         # Initialise the streaming Thread.
         self._streaming_thread = Thread( \
             target=self._stream_samples,
@@ -491,23 +491,18 @@ class AleaTracker:
         
         while self._connected.is_set():
             
-            # Check if the sample Queue is empty.
-            if self._logging_queue.empty():
-                # Signal to other Threads that the logging Queue is empty.
-                if not self._logging_queue_empty.is_set():
-                    self._logging_queue_empty.set()
+            # Wait for new objects in the Queue, and take all of them. (The
+            # timeout is there to regularly check whether we should stop.)
+            batch = self._logging_queue.get_batch(timeout=0.1)
             
             # Process samples from the Queue.
-            else:
-                # Signal to other Threads that the Queue isn't empty.
-                if self._logging_queue_empty.is_set():
-                    self._logging_queue_empty.clear()
-                # Get the next object from the Queue.
-                sample = self._logging_queue.get()
-                # Log the message string and/or the sample.
+            consolidate = False
+            for sample in batch:
+                # Log the message string and/or the sample (which is
+                # queued as its sequence number in the sample ring).
                 if type(sample) in [tuple, list]:
                     self._write_tuple(sample)
-                elif type(sample) == CAleaData:
+                elif type(sample) == int:
                     self._write_sample(sample)
                 else:
                     print("WARNING: Unrecognised object in log queue: '{}'".format( \
@@ -516,8 +511,30 @@ class AleaTracker:
                 self._log_counter += 1
                 # Check if the log file needs to be consolidated.
                 if self._log_counter % self._log_consolidation_freq == 0:
-                    # Consolidate the text file on the harddrive.
-                    self._flush_log_file()
+                    consolidate = True
+            # Consolidate the text file on the harddrive once per batch.
+            if consolidate:
+                self._flush_log_file()
+            # Signal to other Threads that the batch has been written.
+            if batch:
+                self._logging_queue.task_done(len(batch))
+    
+    
+    def _wait_for_logging_queue(self):
+        
+        # Wait until all queued samples and messages have been written to
+        # the log file. This does not need a fixed timeout: it only gives
+        # up if the logging Thread died, as it will then never finish.
+        if self._debug:
+            self._debug_log("Waiting for the logging Queue to be flushed")
+        while not self._logging_queue.wait_flushed(timeout=1.0):
+            if not self._logging_thread.is_alive():
+                print("WARNING: Logging Thread stopped before the log was flushed!")
+                if self._debug:
+                    self._debug_log("Logging Thread stopped before the log was flushed")
+                return
+        # Consolidate the text file on the harddrive.
+        self._flush_log_file()
     
     
     def _stream_samples(self):
@@ -525,31 +542,36 @@ class AleaTracker:
         while self._connected.is_set():
             
             # Wait for the next sample, or until 100 milliseconds have passed.
-            sample = self.api.WaitForData(100)
+            sample = self.api.WaitForData(100, sample=self._incoming_sample)
             
             # Check if there wasn't a timeout.
             if sample is not None:
                 if self._debug:
                     self._debug_log("WaitForData: sample obtained with timestamp {}".format( \
                         sample.rawDataTimeStamp))
-                # Update the most recent sample.
-                self._recent_sample_lock.acquire()
-                self._recent_sample = copy.deepcopy(sample)
-                self._recent_sample_lock.release()
+                # Copy the sample into the ring, which also makes it the
+                # most recent sample.
+                seq = self._sample_ring.write(ctypes.addressof(sample))
                 # Add the sample to the Queue, but only during recording.
                 if (not self._alea_logging) and self._recording.is_set():
-                    self._logging_queue.put(sample)
+                    self._logging_queue.put(seq)
             else:
                 if self._debug:
                     self._debug_log("WaitForData: timeout")
 
     
-    def _write_sample(self, sample):
+    def _write_sample(self, seq):
         
+        # Get the sample from the ring. If the logging Thread fell so far
+        # behind that it was overwritten, it is lost.
+        sample = self._sample_ring.read(seq)
+        if sample is None:
+            print("WARNING: Sample {} was overwritten before it was logged".format( \
+                seq))
+            return
         # Construct a list with the sample data.
         line = ["DAT"]
-        for var in self._log_vars:
-            line.append(sample.__getattribute__(var))
+        line.extend(sample[self._log_vars].item())
         # Log the sample to the log file.
         self._log_file_lock.acquire()
         self._log_file.write("\n" + self._sep.join(map(str, line)))
@@ -768,9 +790,7 @@ class AleaTracker:
         # Log a message in the PyAlea format.
         else:
             # Get current timestamp.
-            self._recent_sample_lock.acquire()
-            t = self._recent_sample.rawDataTimeStamp
-            self._recent_sample_lock.release()
+            t = int(self._sample_ring.newest()["rawDataTimeStamp"])
     
             # Construct a tuple, and add it to the queue.
             self._logging_queue.put(("MSG", t, message))
@@ -814,6 +834,10 @@ class AleaTracker:
         # signal to the sample processing Thread to stop queueing samples
         # for the logging Thread.
         self._recording.clear()
+        
+        # Wait until all recorded samples are in the log file.
+        if not self._alea_logging:
+            self._wait_for_logging_queue()
     
     
     def sample(self):
@@ -833,13 +857,12 @@ class AleaTracker:
         """
         
         # Copy data from the most recent sample.
-        self._recent_sample_lock.acquire()
-        t = copy.copy(self._recent_sample.rawDataTimeStamp)
-        x = copy.copy(self._recent_sample.intelliGazeX)
-        y = copy.copy(self._recent_sample.intelliGazeY)
-        l_size = copy.copy(self._recent_sample.pupilDiameterLeftEye)
-        r_size = copy.copy(self._recent_sample.pupilDiameterRightEye)
-        self._recent_sample_lock.release()
+        sample = self._sample_ring.newest()
+        t = int(sample["rawDataTimeStamp"])
+        x = float(sample["intelliGazeX"])
+        y = float(sample["intelliGazeY"])
+        l_size = float(sample["pupilDiameterLeftEye"])
+        r_size = float(sample["pupilDiameterRightEye"])
 
         # Compute the pupil size.
         if (l_size > 0) and (r_size > 0):
@@ -872,20 +895,17 @@ class AleaTracker:
         if self._recording.is_set():
             self.stop_recording()
         
-        # Wait until the Queue is empty, or until 60 seconds have passed.
+        # Wait until all queued data has been written to the log file.
         if not self._alea_logging:
-            if self._debug:
-                self._debug_log("Waiting for the logging Queue to empty")
-            queue_empty = self._logging_queue_empty.wait(timeout=60.0)
-            if not queue_empty:
-                print("WARNING: Logging Thread timeout occurred; something might have gone wrong!")
-                if self._debug:
-                    self._debug_log("Logging Queue failed to empty within 60 seconds")
+            self._wait_for_logging_queue()
         
-        # Signal to the Threads to stop.
+        # Signal to the Threads to stop, and wait for them to do so.
         if self._debug:
             self._debug_log("Signalling to Threads that the connection is closed")
         self._connected.clear()
+        self._streaming_thread.join()
+        if not self._alea_logging:
+            self._logging_thread.join()
         
         # Close the log file.
         if not self._alea_logging:
@@ -1052,7 +1072,7 @@ class AleaAPI:
             self._error(r)
     
     
-    def WaitForData(self, timeOutMilliseconds):
+    def WaitForData(self, timeOutMilliseconds, sample=None):
         
         """
         desc:
@@ -1065,6 +1085,13 @@ class AleaAPI:
                         on obtaining a sample or on timing out.
                 type:   int
         
+        keywords:
+            sample:
+                desc:   A CAleaData struct to write the incoming data to,
+                        which avoids allocating a new struct for every
+                        sample, or None to create a new one.
+                type:   ctypes.Structure
+        
         returns:
             desc:   The latest AleaData when it becomes available. This is a
                     CAleaData struct, or None if a timeout occurred.
@@ -1072,7 +1099,8 @@ class AleaAPI:
         """
 
         # Create a sample struct to write incoming data to.
-        sample = CAleaData()
+        if sample is None:
+            sample = CAleaData()
         dwMilliseconds = ctypes.c_int32(timeOutMilliseconds)
         # Make a call to the API, and save the result in a variable.
         r = etapi.WaitForData(ctypes.byref(sample), dwMilliseconds)
@@ -48,6 +48,13 @@
 #
 
 from pygaze.py3compat import *
+from pygaze.libtime import clock
+from pygaze._eyetracker.samplequeue import SampleQueue
+
+import threading
+import time
+
+import numpy
 
 class BaseEyeTracker:
 
@@ -56,6 +63,12 @@ class BaseEyeTracker:
         A generic Python library for eye tracking.
     """
 
+    # The minimum time in milliseconds between two messages that log_async
+    # forwards to the tracker, as some trackers drop messages that are sent
+    # back-to-back. Backends that can handle messages at any rate set this
+    # to 0.
+    message_interval = 2
+
     def __init__(self):
 
         """
@@ -179,8 +192,8 @@ class BaseEyeTracker:
 
         """
         desc: |
-            Neatly closes connection to tracker. Saves data and sets
-            `self.connected` to False.
+            Neatly closes connection to tracker. Forwards all queued
+            messages, saves data and sets `self.connected` to False.
         """
 
         pass
@@ -259,9 +272,10 @@ class BaseEyeTracker:
                 desc:    The maximal deviation from fixation in pixels.
                 type:    int
             reset_threshold:
-                desc:    If the horizontal or vertical distance in pixels between
-                        two consecutive samples is larger than this threshold,
-                        the sample collection is reset.
+                desc:    If the horizontal or vertical dispersion (maximum
+                        minus minimum) in pixels of the newest min_samples
+                        samples is larger than this threshold, they do not
+                        count as a fixation.
                 type:    int
 
         returns:
@@ -273,6 +287,139 @@ class BaseEyeTracker:
         pass
 
 
+    def _wait_for_drift_fixation(self, pos, min_samples, max_dev,
+        reset_threshold, timeout=None, keylist=['escape', 'q'],
+        check=None, check_interval=50):
+
+        """
+        desc: |
+            Waits until gaze rests on the drift correction target. This is
+            shared by the fix_triggered_drift_correction functions of all
+            backends: the newest min_samples samples from _drift_samples
+            are kept in a window, of which the dispersion and the average
+            position are computed. The keyboard (and the optional check
+            function) are only polled every check_interval milliseconds, so
+            that the samples can be read at the tracker's full rate.
+
+        arguments:
+            pos:
+                desc:    (x, y) position of the fixation dot.
+                type:    tuple
+            min_samples:
+                desc:    The number of samples in the window.
+                type:    int
+            max_dev:
+                desc:    The maximal distance in pixels between the average
+                        gaze position in the window and the fixation dot.
+                type:    int
+            reset_threshold:
+                desc:    The maximal horizontal and vertical dispersion
+                        (maximum minus minimum) in pixels of the samples in
+                        the window.
+                type:    int
+
+        keywords:
+            timeout:
+                desc:    The time in milliseconds after which waiting is
+                        given up on, or None to wait indefinitely.
+                type:    [int, float, NoneType]
+            keylist:
+                desc:    The keys that stop waiting.
+                type:    list
+            check:
+                desc:    A function that is called along with the keyboard
+                        check; waiting stops when it returns anything other
+                        than None.
+                type:    [function, NoneType]
+            check_interval:
+                desc:    The time in milliseconds between keyboard checks.
+                type:    [int, float]
+
+        returns:
+            desc:    'fixation' when gaze rests on the fixation dot, the
+                    name of the key that was pressed, 'timeout' after a
+                    timeout, or the value that was returned by check.
+            type:    [str, unicode]
+        """
+
+        # preallocated window of the newest samples
+        window = numpy.zeros((min_samples, 2), dtype=float)
+        n = 0
+        samples = self._drift_samples()
+
+        t0 = clock.get_time()
+        tcheck = t0
+        while True:
+
+            # check the keyboard (and anything else) at a low rate
+            t = clock.get_time()
+            if t >= tcheck:
+                key = self.kb.get_key(keylist=keylist, timeout=0)[0]
+                if key != None:
+                    return key
+                if check != None:
+                    result = check()
+                    if result != None:
+                        return result
+                tcheck = t + check_interval
+            if timeout != None and t - t0 > timeout:
+                return 'timeout'
+
+            # only use valid samples; wait a bit for a new sample rather
+            # than keeping a core busy
+            sample = next(samples)
+            if sample == None:
+                time.sleep(0.001)
+                continue
+            x, y = sample
+            if x == None or y == None or x < 0 or y < 0:
+                continue
+
+            # add the sample to the window
+            window[n % min_samples] = x, y
+            n += 1
+            if n < min_samples:
+                continue
+
+            # check whether gaze is stable, and close to the fixation dot
+            dispersion = window.max(axis=0) - window.min(axis=0)
+            if numpy.any(dispersion > reset_threshold):
+                continue
+            d = numpy.hypot(*(window.mean(axis=0) - pos))
+            if d < max_dev:
+                return 'fixation'
+
+
+    def _drift_samples(self):
+
+        """
+        desc: |
+            Yields the gaze samples that _wait_for_drift_fixation uses, as
+            (x, y) tuples, or None when there is no new sample yet. By
+            default, sample is polled once every `sampletime` milliseconds
+            (or at 60 Hz if the sampling rate is not known), and every poll
+            counts as a sample, so that the window lasts as long however
+            fast the caller loops, and a steady gaze position still counts.
+            Backends that buffer timestamped samples override this, to yield
+            every recorded sample once.
+
+        returns:
+            desc:    A generator of (x, y) tuples and None values.
+            type:    generator
+        """
+
+        interval = getattr(self, 'sampletime', None) or 1000.0 / 60
+        tnext = clock.get_time()
+        while True:
+            t = clock.get_time()
+            if t < tnext:
+                yield None
+                continue
+            # do not catch up on polls that were missed by a slow caller
+            tnext = max(tnext + interval, t)
+            yield self.sample()
+
+
     def get_eyetracker_clock_async(self):
 
         """
@@ -318,6 +465,143 @@ class BaseEyeTracker:
 
         self.log(u"var {} {}".format(safe_decode(var), safe_decode(val)))
 
+
+    def log_async(self, msg):
+
+        """
+        desc: |
+            Queues a message to be written to the log file, and returns
+            immediately. The message is stamped with the time of this call,
+            and a background Thread forwards queued messages to the tracker
+            at a rate it can handle (see `message_interval`). Backends that
+            can, log the message with the time at which it was queued;
+            others log it when it is forwarded.
+
+        arguments:
+            msg:
+                desc:    A message.
+                type:    [str, unicode]
+        """
+
+        if getattr(self, "_messages", None) is None:
+            self._messages = SampleQueue(name="message")
+            self._tlastmessage = None
+            self._messagethread = threading.Thread( \
+                target=self._forward_messages)
+            self._messagethread.daemon = True
+            self._messagethread.start()
+
+        self._messages.put((clock.get_time(), msg))
+
+
+    def log_var_async(self, var, val):
+
+        """
+        desc:
+            Queues a variable's name and value to be written to the log
+            file, and returns immediately; see log_async.
+
+        arguments:
+            var:
+                desc:    A variable name.
+                type:    [str, unicode]
+            val:
+                desc:    A variable value
+        """
+
+        self.log_async(u"var {} {}".format(safe_decode(var), \
+            safe_decode(val)))
+
+
+    def flush_messages(self, timeout=None):
+
+        """
+        desc:
+            Waits until all messages that were queued with log_async have
+            been forwarded to the tracker.
+
+        keywords:
+            timeout:
+                desc:    The maximum time in milliseconds to wait, or None to
+                        wait indefinitely.
+                type:    [int, float, NoneType]
+
+        returns:
+            desc:    True if all messages were forwarded, or False after a
+                    timeout.
+            type:    bool
+        """
+
+        if getattr(self, "_messages", None) is None:
+            return True
+        if timeout != None:
+            timeout = timeout / 1000.0
+
+        return self._messages.wait_flushed(timeout=timeout)
+
+
+    def _forward_messages(self):
+
+        """
+        desc:
+            Forwards queued messages to the tracker (runs on the message
+            Thread).
+        """
+
+        while True:
+            batch = self._messages.get_batch()
+            try:
+                self._send_messages(batch)
+            except Exception as e:
+                print("WARNING baseeyetracker.log_async: failed to log " \
+                    "messages; {}".format(e))
+            self._messages.task_done(len(batch))
+
+
+    def _send_messages(self, batch):
+
+        """
+        desc: |
+            Sends a batch of queued messages to the tracker, waiting at least
+            `message_interval` milliseconds between messages. Backends that
+            can send many messages at once override this.
+
+        arguments:
+            batch:
+                desc:    A list of (time, message) tuples, where time is the
+                        time at which log_async was called.
+                type:    list
+        """
+
+        for t, msg in batch:
+            if self.message_interval > 0 and self._tlastmessage != None:
+                wait = self._tlastmessage + self.message_interval \
+                    - clock.get_time()
+                if wait > 0:
+                    time.sleep(wait / 1000.0)
+            self._send_message(t, msg)
+            self._tlastmessage = clock.get_time()
+
+
+    def _send_message(self, t, msg):
+
+        """
+        desc: |
+            Sends a single queued message to the tracker. By default, the
+            message is simply logged; backends that can log a message with
+            an earlier time override this.
+
+        arguments:
+            t:
+                desc:    The time at which log_async was called.
+                type:    [int, float]
+            msg:
+                desc:    A message.
+                type:    [str, unicode]
+        """
+
+        self.log(msg)
+
     def pupil_size(self):
 
         """
@@ -477,7 +761,8 @@ class BaseEyeTracker:
         """
         desc:
             Stops recording. Sets `self.recording` to `False` when recording is
-            successfully stopped.
+            successfully stopped. Messages that are still queued by
+            `log_async` are sent first, so that they end up in the recording.
         """
 
         pass
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of PyGaze - the open-source toolbox for eye tracking
+#
+# PyGaze is a Python module for easily creating gaze contingent experiments
+# or other software (as well as non-gaze contingent experiments/software)
+# Copyright (C) 2012-2013 Edwin S. Dalmaijer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import numpy
+
+
+def deg2pix(cmdist, angle, pixpercm):
+
+    """Returns the value in pixels for given values (internal use)
+
+    arguments
+    cmdist    -- distance to display in centimeters
+    angle        -- size of stimulus in visual angle
+    pixpercm    -- amount of pixels per centimeter for display
+
+    returns
+    pixelsize    -- stimulus size in pixels (calculation based on size in
+               visual angle on display with given properties)
+    """
+
+    return pixpercm * numpy.tan(numpy.radians(angle)) * float(cmdist)
+
+
+def pix2deg(cmdist, pixelsize, pixpercm):
+
+    """Returns the value in degrees of visual angle for given values
+    (internal use)
+
+    arguments
+    cmdist    -- distance to display in centimeters
+    pixelsize    -- stimulus size in pixels
+    pixpercm    -- amount of pixels per centimeter for display
+
+    returns
+    angle        -- size of stimulus in visual angle
+    """
+
+    return numpy.degrees(numpy.arctan((pixelsize / pixpercm) / float(cmdist)))
+
+
+def window_quality(samples, target=None):
+
+    """Computes the quality of a window of gaze samples
+
+    arguments
+    samples    -- a sequence of (x, y) gaze positions in pixels; invalid
+               samples should be (nan, nan) or None
+
+    keyword arguments
+    target    -- (x, y) position in pixels that was looked at, or None if
+               accuracy should not be computed (default = None)
+
+    returns
+    quality    -- a dict with 'n' (the number of samples), 'data_loss'
+               (the proportion of invalid samples), 'rms_s2s' (x, y) (the
+               root mean square of the distances between successive
+               valid samples), 'sd' (x, y) (the standard deviation of the
+               valid samples), and if a target was given 'accuracy'
+               (x, y) (the mean absolute deviation from the target) and
+               'rms_error' (x, y) (the root mean square of the deviation
+               from the target); values that cannot be computed are nan
+    """
+
+    samples = numpy.array([(numpy.nan, numpy.nan) if s is None else s \
+        for s in samples], dtype=float).reshape(-1, 2)
+    valid = samples[numpy.all(numpy.isfinite(samples), axis=1)]
+
+    quality = {'n': len(samples)}
+    if len(samples) == 0:
+        quality['data_loss'] = numpy.nan
+    else:
+        quality['data_loss'] = 1.0 - len(valid) / float(len(samples))
+
+    with numpy.errstate(invalid='ignore'):
+        if len(valid) > 1:
+            quality['rms_s2s'] = _pair(numpy.sqrt(numpy.mean( \
+                numpy.diff(valid, axis=0)**2, axis=0)))
+        else:
+            quality['rms_s2s'] = (numpy.nan, numpy.nan)
+        if len(valid) > 0:
+            quality['sd'] = _pair(numpy.std(valid, axis=0))
+        else:
+            quality['sd'] = (numpy.nan, numpy.nan)
+        if target != None:
+            if len(valid) > 0:
+                dev = valid - numpy.array(target, dtype=float)
+                quality['accuracy'] = _pair(numpy.mean(numpy.abs(dev), axis=0))
+                quality['rms_error'] = _pair(numpy.sqrt(numpy.mean(dev**2, \
+                    axis=0)))
+            else:
+                quality['accuracy'] = (numpy.nan, numpy.nan)
+                quality['rms_error'] = (numpy.nan, numpy.nan)
+
+    return quality
+
+
+def _pair(values):
+
+    """Returns an (x, y) tuple of floats"""
+
+    return tuple(float(v) for v in values)
+
+
+def _nanmean(values):
+
+    """Returns the mean of all non-nan values (per column), or nan if there
+    are none"""
+
+    values = numpy.array(values, dtype=float)
+    if values.size == 0:
+        return (numpy.nan, numpy.nan)
+    valid = numpy.isfinite(values)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return _pair(numpy.sum(numpy.where(valid, values, 0), axis=0) / \
+            numpy.sum(valid, axis=0))
+
+
+class CalibrationQuality:
+
+    """Computes the quality of a calibration, and the event detection
+    thresholds that follow from it. All backends use this after their
+    calibration: sample windows are added for every validation point (for
+    each eye), and for the noise calibration, after which the report can be
+    written to the log file and used programmatically.
+    """
+
+    def __init__(self, screendist, pixpercm):
+
+        """Initializes a new CalibrationQuality
+
+        arguments
+        screendist    -- distance between participant and display in cm
+        pixpercm    -- amount of pixels per centimeter for display
+        """
+
+        self.screendist = screendist
+        self.pixpercm = pixpercm
+        self.points = []
+        self.noise = None
+        # accuracy in degrees and noise in pixels as reported by the
+        # tracker, if available
+        self.tracker_accuracy = None
+        self.tracker_precision = None
+
+    def add_point(self, target, left=None, right=None):
+
+        """Adds the samples of a validation point
+
+        arguments
+        target    -- (x, y) position of the validation point in pixels
+
+        keyword arguments
+        left        -- a sequence of (x, y) gaze positions of the left eye,
+                   with (nan, nan) or None for invalid samples, or None
+                   if the left eye was not recorded (default = None)
+        right        -- the same for the right eye (default = None)
+        """
+
+        point = {'target': tuple(target)}
+        if left is not None:
+            point['left'] = window_quality(left, target)
+        if right is not None:
+            point['right'] = window_quality(right, target)
+        self.points.append(point)
+
+    def add_noise(self, samples):
+
+        """Adds the samples of the noise calibration, during which the
+        participant looked at a single dot
+
+        arguments
+        samples    -- a sequence of (x, y) gaze positions, with (nan, nan) or
+                   None for invalid samples
+        """
+
+        self.noise = window_quality(samples)
+
+    def set_tracker_accuracy(self, left, right):
+
+        """Sets the accuracy as reported by the tracker, for trackers that
+        compute it themselves
+
+        arguments
+        left        -- (x, y) accuracy of the left eye in degrees
+        right        -- (x, y) accuracy of the right eye in degrees
+        """
+
+        self.tracker_accuracy = (tuple(left), tuple(right))
+
+    def set_tracker_precision(self, errors):
+
+        """Sets the noise as reported by the tracker, for trackers that
+        only report the mean error of every calibration point; the average
+        of these errors is used for both x and y
+
+        arguments
+        errors    -- a sequence of mean errors in pixels, one for every
+                   valid calibration point
+        """
+
+        errors = numpy.array(errors, dtype=float)
+        if errors.size == 0:
+            self.tracker_precision = (numpy.nan, numpy.nan)
+        else:
+            self.tracker_precision = (float(numpy.mean(errors)),) * 2
+
+    def eye_quality(self, eye):
+
+        """Returns the quality of an eye, averaged over all validation points
+
+        arguments
+        eye        -- 'left' or 'right'
+
+        returns
+        quality    -- a dict with the averages of 'accuracy', 'rms_error'
+                   (pooled), 'rms_s2s' and 'sd' (all (x, y) in pixels),
+                   'data_loss',
+                   and 'accuracy_deg' (x, y) in degrees; values are nan if
+                   there was no data
+        """
+
+        points = [p[eye] for p in self.points if eye in p]
+        quality = {}
+        for key in ['accuracy', 'rms_s2s', 'sd']:
+            quality[key] = _nanmean([p[key] for p in points])
+        # the root mean square error is pooled over all points
+        quality['rms_error'] = _pair(numpy.sqrt(_nanmean( \
+            [numpy.array(p['rms_error'])**2 for p in points])))
+        quality['data_loss'] = float(numpy.mean([p['data_loss'] \
+            for p in points])) if points else numpy.nan
+        if self.tracker_accuracy != None:
+            quality['accuracy_deg'] = self.tracker_accuracy[ \
+                ['left', 'right'].index(eye)]
+            quality['accuracy'] = _pair(deg2pix(self.screendist, \
+                numpy.array(quality['accuracy_deg']), self.pixpercm))
+        else:
+            quality['accuracy_deg'] = _pair(pix2deg(self.screendist, \
+                numpy.array(quality['accuracy']), self.pixpercm))
+
+        return quality
+
+    def precision(self, default=(numpy.nan, numpy.nan)):
+
+        """Returns the RMS noise (sample-to-sample) in pixels, which is used
+        as the intersample distance threshold for PyGaze event detection;
+        this is the noise reported by the tracker if there is any, or is
+        computed from the noise calibration, or from the deviations from the
+        validation points if there was no noise calibration
+
+        keyword arguments
+        default    -- (x, y) value that is used if the noise can not be
+                   computed (default = (nan, nan))
+
+        returns
+        precision    -- (x, y) RMS noise in pixels
+        """
+
+        if self.tracker_precision != None:
+            precision = self.tracker_precision
+        elif self.noise != None:
+            precision = self.noise['rms_s2s']
+        else:
+            precision = _nanmean([self.eye_quality(eye)['rms_error'] \
+                for eye in ['left', 'right']])
+
+        return tuple(float(p) if numpy.isfinite(p) else float(d) \
+            for p, d in zip(precision, default))
+
+    def thresholds(self, fixtresh, spdtresh, accthresh, errdist=None):
+
+        """Converts the event detection thresholds from degrees to pixels
+
+        arguments
+        fixtresh    -- fixation threshold in degrees
+        spdtresh    -- saccade velocity threshold in degrees per second
+        accthresh    -- saccade acceleration threshold in degrees per
+                   second**2
+
+        keyword arguments
+        errdist    -- error distance in degrees, or None (default = None)
+
+        returns
+        thresholds    -- a dict with 'pxfixtresh' (pixels), 'pxspdtresh'
+                   (pixels per millisecond), 'pxacctresh' (pixels per
+                   millisecond**2), and 'pxerrdist' (pixels) if errdist
+                   was passed
+        """
+
+        thresholds = {
+            'pxfixtresh': deg2pix(self.screendist, fixtresh, self.pixpercm),
+            'pxspdtresh': deg2pix(self.screendist, spdtresh / 1000.0, \
+                self.pixpercm),
+            'pxacctresh': deg2pix(self.screendist, accthresh / 1000.0, \
+                self.pixpercm),
+            }
+        if errdist != None:
+            thresholds['pxerrdist'] = deg2pix(self.screendist, errdist, \
+                self.pixpercm)
+
+        return thresholds
+
+    def report(self, thresholds=None, samplerate=None, sampletime=None,
+        precision=None):
+
+        """Returns a structured calibration report
+
+        keyword arguments
+        thresholds    -- a dict of thresholds as returned by thresholds,
+                   or None (default = None)
+        samplerate    -- the sampling rate in Hz, or None (default = None)
+        sampletime    -- the mean intersample time in ms, or None
+                   (default = None)
+        precision    -- (x, y) RMS noise in pixels, or None to use the
+                   value returned by precision (default = None)
+
+        returns
+        report    -- a dict with 'points' (per validation point and eye),
+                   'left' and 'right' (averaged over points, see
+                   eye_quality), 'noise' (see window_quality, or None),
+                   'precision', 'screendist', 'samplerate', 'sampletime'
+                   and 'thresholds'
+        """
+
+        if precision == None:
+            precision = self.precision()
+
+        return {
+            'points': self.points,
+            'left': self.eye_quality('left'),
+            'right': self.eye_quality('right'),
+            'noise': self.noise,
+            'precision': tuple(precision),
+            'screendist': self.screendist,
+            'samplerate': samplerate,
+            'sampletime': sampletime,
+            'thresholds': thresholds,
+            }
+
+    def report_lines(self, report, acclabel="acceleration"):
+
+        """Returns the lines of the calibration report for the log file
+
+        arguments
+        report    -- a report as returned by report
+
+        keyword arguments
+        acclabel    -- the name of the acceleration threshold in the report;
+                   the Tobii backends write "accuracy", which is kept so
+                   that existing log parsers keep working
+                   (default = "acceleration")
+
+        returns
+        lines        -- a list of strings, starting with "pygaze calibration
+                   report start" and ending with "pygaze calibration report
+                   end"
+        """
+
+        left = report['left']
+        right = report['right']
+        lines = ["pygaze calibration report start"]
+        if report['samplerate'] != None:
+            lines.append("samplerate: {} Hz".format(report['samplerate']))
+        if report['sampletime'] != None:
+            lines.append("sampletime: {} ms".format(report['sampletime']))
+        lines.append("accuracy (degrees): LX={}, LY={}, RX={}, RY={}".format( \
+            left['accuracy_deg'][0], left['accuracy_deg'][1], \
+            right['accuracy_deg'][0], right['accuracy_deg'][1]))
+        lines.append("accuracy (in pixels): LX={}, LY={}, RX={}, RY={}".format( \
+            left['accuracy'][0], left['accuracy'][1], \
+            right['accuracy'][0], right['accuracy'][1]))
+        lines.append("precision (RMS noise in pixels): X={}, Y={}".format( \
+            report['precision'][0], report['precision'][1]))
+        if report['noise'] != None:
+            lines.append("precision (SD in pixels): X={}, Y={}".format( \
+                report['noise']['sd'][0], report['noise']['sd'][1]))
+            lines.append("noise calibration data loss: {}".format( \
+                report['noise']['data_loss']))
+        for i, point in enumerate(report['points']):
+            for eye in ['left', 'right']:
+                if eye not in point:
+                    continue
+                q = point[eye]
+                lines.append(("validation point {} ({}, {}) {} eye: " \
+                    "accuracy X={}, Y={}; RMS-S2S X={}, Y={}; SD X={}, " \
+                    "Y={}; data loss {}").format(i, point['target'][0], \
+                    point['target'][1], eye, q['accuracy'][0], \
+                    q['accuracy'][1], q['rms_s2s'][0], q['rms_s2s'][1], \
+                    q['sd'][0], q['sd'][1], q['data_loss']))
+        lines.append("data loss: L={}, R={}".format(left['data_loss'], \
+            right['data_loss']))
+        lines.append("distance between participant and display: {} cm".format( \
+            report['screendist']))
+        if report['thresholds'] != None:
+            lines.append("fixation threshold: {} pixels".format( \
+                report['thresholds']['pxfixtresh']))
+            lines.append("speed threshold: {} pixels/ms".format( \
+                report['thresholds']['pxspdtresh']))
+            lines.append("{} threshold: {} pixels/ms**2".format(acclabel, \
+                report['thresholds']['pxacctresh']))
+        lines.append("pygaze calibration report end")
+
+        return lines
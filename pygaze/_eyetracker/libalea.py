@@ -24,6 +24,7 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.calibrationquality import CalibrationQuality
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -50,40 +51,6 @@ except:
         raise Exception("Could not import AleaTracker")
 
 
-def deg2pix(cmdist, angle, pixpercm):
-
-    """Returns the value in pixels for given values (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    pixelsize    -- stimulus size in pixels
-    """
-
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
-
-def pix2deg(cmdist, pixelsize, pixpercm):
-
-    """Converts a distance on the screen in pixels into degrees of visual
-    angle (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    pixelsize    -- stimulus size in pixels
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    angle        -- size of stimulus in visual angle
-    """
-    
-    cmsize = float(pixelsize) / pixpercm
-    return 2 * cmdist * math.tan(math.radians(cmsize) / 2.0)
-
-
 class AleaTracker(BaseEyeTracker):
 
     """A class for AleaTracker objects"""
@@ -271,9 +238,8 @@ class AleaTracker(BaseEyeTracker):
         # Wait for a keypress.
         key, keytime = self.kb.get_key(keylist=None, timeout=None, \
             flush=True)
-        # Start with empty lists.
-        err = {'LX':[], 'LY':[], 'RX':[], 'RY':[]}
-        var = {'LX':[], 'LY':[], 'RX':[], 'RY':[]}
+        # Start with an empty list.
+        samples = []
         # Start streaming data so that samples can be obtained.
         self.start_recording()
         self.log("noise_calibration_start")
@@ -291,62 +257,40 @@ class AleaTracker(BaseEyeTracker):
             gx, gy = self.sample()
             if (gx > 0) and (gy > 0):
                 i += 1
-                err["LX"].append(abs(float(x) - float(gx)))
-                err["LY"].append(abs(float(y) - float(gy)))
-                err["RX"].append(abs(float(x) - float(gx)))
-                err["RY"].append(abs(float(y) - float(gy)))
-                for k in var.keys():
-                    var[k].append(err[k][-1]**2)
+                samples.append((gx, gy))
                 clock.pause(int(self.sampletime))
         # Stop streaming.
         self.log("noise_calibration_stop")
         self.stop_recording()
 
-        # Compute the RMS noise for the calibration points.
-        xnoise = (math.sqrt(sum(var['LX']) / float(len(var['LX']))) + \
-            math.sqrt(sum(var['RX']) / float(len(var['RX'])))) / 2.0
-        ynoise = (math.sqrt(sum(var['LY']) / float(len(var['LY']))) + \
-            math.sqrt(sum(var['RY']) / float(len(var['RY'])))) / 2.0
-        self.pxdsttresh = (xnoise, ynoise)
-                
         # AFTERMATH
         # store some variables
         pixpercm = (self.dispsize[0] / float(self.screensize[0]) + \
             self.dispsize[1]/float(self.screensize[1])) / 2
         screendist = settings.SCREENDIST
+        # Compute the RMS noise for the calibration point, which is the RMS
+        # deviation from the central fixation. The samples are the gaze of
+        # both eyes, and are judged for each eye.
+        quality = CalibrationQuality(screendist, pixpercm)
+        quality.add_point((x, y), left=samples, right=samples)
+        self.pxdsttresh = quality.precision(default=(60.0, 90.0))
         # calculate thresholds based on tracker settings
-        self.accuracy = ( \
-            (pix2deg(screendist, sum(err['LX']) / float(len(err['LX'])), pixpercm), \
-            pix2deg(screendist, sum(err['LY']) / float(len(err['LY'])), pixpercm)), \
-            (pix2deg(screendist, sum(err['RX']) / float(len(err['RX'])), pixpercm), \
-            pix2deg(screendist, sum(err['RY']) / float(len(err['RY'])), pixpercm)))
-        self.pxerrdist = deg2pix(screendist, self.errdist, pixpercm)
-        self.pxfixtresh = deg2pix(screendist, self.fixtresh, pixpercm)
-        self.pxaccuracy = ( \
-            (sum(err['LX']) / float(len(err['LX'])), \
-            sum(err['LY']) / float(len(err['LY']))), \
-            (sum(err['RX']) / float(len(err['RX'])), \
-            sum(err['RY']) / float(len(err['RY']))))
-        self.pxspdtresh = deg2pix(screendist, self.spdtresh/1000.0, pixpercm) # in pixels per millisecond
-        self.pxacctresh = deg2pix(screendist, self.accthresh/1000.0, pixpercm) # in pixels per millisecond**2
+        left = quality.eye_quality('left')
+        right = quality.eye_quality('right')
+        self.accuracy = (left['accuracy_deg'], right['accuracy_deg'])
+        self.pxaccuracy = (left['accuracy'], right['accuracy'])
+        thresholds = quality.thresholds(self.fixtresh, self.spdtresh, \
+            self.accthresh, errdist=self.errdist)
+        self.pxerrdist = thresholds['pxerrdist']
+        self.pxfixtresh = thresholds['pxfixtresh']
+        self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecond
+        self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
 
         # calibration report
-        self.log("pygaze calibration report start")
-        self.log("accuracy (degrees): LX={}, LY={}, RX={}, RY={}".format( \
-            self.accuracy[0][0], self.accuracy[0][1], self.accuracy[1][0], \
-            self.accuracy[1][1]))
-        self.log("accuracy (in pixels): LX={}, LY={}, RX={}, RY={}".format( \
-            self.pxaccuracy[0][0], self.pxaccuracy[0][1], \
-            self.pxaccuracy[1][0], self.pxaccuracy[1][1]))
-        self.log("precision (RMS noise in pixels): X={}, Y={}".format( \
-            self.pxdsttresh[0],self.pxdsttresh[1]))
-        self.log("distance between participant and display: {} cm".format( \
-            screendist))
-        self.log("fixation threshold: {} pixels".format(self.pxfixtresh))
-        self.log("speed threshold: {} pixels/ms".format(self.pxspdtresh))
-        self.log("acceleration threshold: {} pixels/ms**2".format( \
-            self.pxacctresh))
-        self.log("pygaze calibration report end")
+        self.calibration_report = quality.report(thresholds=thresholds, \
+            precision=self.pxdsttresh)
+        for line in quality.report_lines(self.calibration_report):
+            self.log(line)
 
         return True
 
@@ -362,6 +306,9 @@ class AleaTracker(BaseEyeTracker):
         Nothing    -- saves data and sets self.connected to False
         """
 
+        # forward all queued messages
+        self.flush_messages()
+
         # close connection
         self.alea.close()
         self.connected = False        
@@ -476,37 +423,22 @@ class AleaTracker(BaseEyeTracker):
 
         self.draw_drift_correction_target(pos[0], pos[1])
         
-        t0 = clock.get_time()
-        consecutive_count = 0
-        while consecutive_count < min_samples:
+        # Wait until gaze rests on the target. The samples in the window
+        # should all be close to each other, and their average should be
+        # close to the target.
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            max_dev, timeout=timeout, keylist=["Escape", "escape", "q"])
 
-            # Get new sample.
-            x, y = self.sample()
-
-            # Ignore empty samples.
-            if (x is None) or (y is None):
-                continue
-
-            # Measure the distance to the target position.
-            d = ((x-pos[0])**2 + (y-pos[1])**2)**0.5
-            # Check whether the distance is below the allowed distance.
-            if d <= max_dev:
-                # Increment count.
-                consecutive_count += 1
-            else:
-                # Reset count.
-                consecutive_count = 0
-            
-            # Check for a timeout.
-            if clock.get_time() - t0 > timeout:
-                print("libalea.AleaTracker.fix_triggered_drift_correction: timeout during fixation-triggered drift check")
-                return self.calibrate()
+        # Check for a timeout.
+        if resp == "timeout":
+            print("libalea.AleaTracker.fix_triggered_drift_correction: timeout during fixation-triggered drift check")
+            return self.calibrate()
+
+        # Pressing escape enters the calibration screen.
+        elif resp in ["Escape", "escape", "q"]:
+            print("libalea.AleaTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate()
 
-            # Pressing escape enters the calibration screen.
-            if self.kb.get_key()[0] in ["Escape", "escape", "q"]:
-                print("libalea.AleaTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
-                return self.calibrate()
-        
         return True
 
 
@@ -637,6 +569,7 @@ class AleaTracker(BaseEyeTracker):
                    successfully started
         """
 
+        self.flush_messages()
         self.alea.stop_recording()
         self.recording = False
     
@@ -156,6 +156,7 @@ class DumbDummy(BaseEyeTracker):
 
         """Dummy for stopping recording, messages what would have been the recording end"""
 
+        self.flush_messages()
         self.recording = False
 
         message("Recording would have stopped now")
@@ -165,6 +166,7 @@ class DumbDummy(BaseEyeTracker):
 
         """Dummy for closing connection with eyetracker, messages what would have been connection closing time"""
 
+        self.flush_messages()
         if self.recording:
             self.stop_recording()
 
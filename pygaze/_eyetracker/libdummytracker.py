@@ -145,47 +145,18 @@ class Dummy(DumbDummy):
         # show fixation dot
         self.draw_drift_correction_target(pos[0], pos[1])
 
-        while True:
-            # loop until we have sufficient samples
-            lx = []
-            ly = []
-            while len(lx) < min_samples:
-    
-                # pressing escape enters the calibration screen
-                if self.kb.get_key(keylist=["escape", "q"], timeout=0)[0] != None:
-                    self.recording = False
-                    print("libeyetracker.libeyetracker.fix_triggered_drift_correction(): 'q' pressed")
-                    self.simulator.set_visible(visible=False)
-                    return False
-    
-                # collect a sample
-                x, y = self.sample()
-    
-                if len(lx) == 0 or x != lx[-1] or y != ly[-1]:
-    
-                    # if present sample deviates too much from previous sample, reset counting
-                    if len(lx) > 0 and (abs(x - lx[-1]) > reset_threshold or abs(y - ly[-1]) > reset_threshold):
-                        lx = []
-                        ly = []
-    
-                    # collect samples
-                    else:
-                        lx.append(x)
-                        ly.append(y)
+        # wait until gaze rests on the target; pressing escape enters the
+        # calibration screen
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            reset_threshold)
+        if resp in ['escape', 'q']:
+            self.recording = False
+            print("libeyetracker.libeyetracker.fix_triggered_drift_correction(): 'q' pressed")
+            self.simulator.set_visible(visible=False)
+            return False
 
-                # check if samples are within max. deviation
-                if len(lx) == min_samples:
-    
-                    avg_x = sum(lx) / len(lx)
-                    avg_y = sum(ly) / len(ly)
-                    d = ((avg_x - pos[0]) ** 2 + (avg_y - pos[1]) ** 2)**0.5
-    
-                    if d < max_dev:
-                        self.simulator.set_visible(visible=False)
-                        return True
-                    else:
-                        lx = []
-                        ly = []
+        self.simulator.set_visible(visible=False)
+        return True
                         
 
     def start_recording(self):
@@ -204,6 +175,7 @@ class Dummy(DumbDummy):
 
         """Dummy for stopping recording, prints what would have been the recording end"""
 
+        self.flush_messages()
         self.simulator.set_visible(visible=False)
         dumrectime = clock.get_time()
 
@@ -216,6 +188,7 @@ class Dummy(DumbDummy):
 
         """Dummy for closing connection with eyetracker, prints what would have been connection closing time"""
 
+        self.flush_messages()
         if self.recording:
             self.stop_recording()
         
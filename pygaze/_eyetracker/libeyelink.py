@@ -28,6 +28,8 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 from pygaze._eyetracker.eyelinkgraphics import EyelinkGraphics
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.samplequeue import SampleQueue, SampleBuffer
+from pygaze._eyetracker.calibrationquality import CalibrationQuality
 
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
@@ -50,26 +52,37 @@ import pylink
 import copy
 import math
 import sys
+import time
 import os.path
+import collections
+from threading import Thread, RLock
 
 _eyelink = None
 
-def deg2pix(cmdist, angle, pixpercm):
 
-    """Returns the value in pixels for given values (internal use)
+class _SerializedEyeLink:
 
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-
-    returns
-    pixelsize    -- stimulus size in pixels (calculation based on size in
-               visual angle on display with given properties)
     """
+    Calls methods of the EyeLink connection (pylink.getEYELINK()) one at a
+    time. While recording, the link is read on a background Thread, messages
+    may be sent on another Thread, and everything else happens on the main
+    Thread; pylink is not documented to be thread-safe, so every call goes
+    through a single lock.
+    """
+
+    def __init__(self):
+
+        self.lock = RLock()
+
+    def __getattr__(self, name):
 
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
+        method = getattr(pylink.getEYELINK(), name)
+        def call(*args, **kwargs):
+            with self.lock:
+                return method(*args, **kwargs)
+        return call
+
+_link = _SerializedEyeLink()
 
 class libeyelink(BaseEyeTracker):
 
@@ -127,6 +140,22 @@ class libeyelink(BaseEyeTracker):
         self.prevsample = (-1,-1)
         self.prevps = -1
 
+        # link data; while recording, a background Thread reads all samples
+        # and events from the link, adds samples to the sample buffer, and
+        # passes events on to all subscribers (see subscribe_events)
+        self.samples = SampleBuffer()
+        self._event_subscribers = []
+        # the most recent events, for waiters that subscribe just after an
+        # event was read
+        self._recent_events = collections.deque(maxlen=256)
+        self._eventlock = RLock()
+        self._reader = None
+        self._reading = False
+        # the difference between tracker time and PyGaze time is cached, and
+        # refreshed by the reader Thread every clock_offset_interval ms
+        self.clock_offset_interval = 1000
+        self._clock_offset = 0
+
         # event detection properties
         # degrees; maximal distance from fixation start (if gaze wanders beyond
         # this, fixation has stopped)
@@ -159,9 +188,9 @@ class libeyelink(BaseEyeTracker):
                     "connect to the tracker!")
         # determine software version of tracker
         self.tracker_software_ver = 0
-        self.eyelink_ver = pylink.getEYELINK().getTrackerVersion()
+        self.eyelink_ver = _link.getTrackerVersion()
         if self.eyelink_ver == 3:
-            tvstr = pylink.getEYELINK().getTrackerVersionString()
+            tvstr = _link.getTrackerVersionString()
             vindex = tvstr.find("EYELINK CL")
             self.tracker_software_ver = int(float(tvstr[(vindex + \
                 len("EYELINK CL")):].strip()))
@@ -174,7 +203,7 @@ class libeyelink(BaseEyeTracker):
         else:
             self.eyelink_model = 'EyeLink (model unknown)'
         # Open graphics
-        self.eyelink_graphics = EyelinkGraphics(self, _eyelink)
+        self.eyelink_graphics = EyelinkGraphics(self, _link)
         pylink.openGraphicsEx(self.eyelink_graphics)
         # Optionally force drift correction. For some reason this must be done
         # as (one of) the first things, otherwise a segmentation fault occurs.
@@ -185,16 +214,16 @@ class libeyelink(BaseEyeTracker):
                 print('Failed to force drift correction (EyeLink 1000 only)')
         # Set pupil-size mode
         if self.pupil_size_mode == 'area':
-            pylink.getEYELINK().setPupilSizeDiameter(False)
+            _link.setPupilSizeDiameter(False)
         elif self.pupil_size_mode == 'diameter':
-            pylink.getEYELINK().setPupilSizeDiameter(True)
+            _link.setPupilSizeDiameter(True)
         else:
             raise Exception(
                 "pupil_size_mode should be 'area' or 'diameter', not {}".format( \
                 self.pupil_size_mode))
-        pylink.getEYELINK().openDataFile(self.eyelink_data_file)
+        _link.openDataFile(self.eyelink_data_file)
         pylink.flushGetkeyQueue()
-        pylink.getEYELINK().setOfflineMode()
+        _link.setOfflineMode()
         # notify eyelink of display resolution
         self.send_command("screen_pixel_coords = 0 0 {} {}".format( \
             self.resolution[0], self.resolution[1]))
@@ -237,26 +266,38 @@ class libeyelink(BaseEyeTracker):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
-        pylink.getEYELINK().sendCommand(cmd)
+        _link.sendCommand(cmd)
 
     def log(self, msg):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
-        pylink.getEYELINK().sendMessage(msg)
+        _link.sendMessage(msg)
+
+    def _send_message(self, t, msg):
+
+        """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
+
+        # the EyeLink subtracts a number at the start of a message from the
+        # message's timestamp, so queued messages keep the time at which
+        # they were queued
+        delay = int(round(clock.get_time() - t))
+        if delay > 0:
+            msg = "{} {}".format(delay, msg)
+        _link.sendMessage(msg)
 
     def status_msg(self, msg):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
         print('status message: {}'.format(msg))
-        pylink.getEYELINK().sendCommand("record_status_message '{}'".format(msg))
+        _link.sendCommand("record_status_message '{}'".format(msg))
 
     def connected(self):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
-        return pylink.getEYELINK().isConnected()
+        return _link.isConnected()
 
     def calibrate(self):
 
@@ -274,7 +315,7 @@ class libeyelink(BaseEyeTracker):
             # attempt calibrate; confirm abort when esc pressed
             while True:
                 self.eyelink_graphics.esc_pressed = False
-                pylink.getEYELINK().doTrackerSetup()
+                _link.doTrackerSetup()
                 if not self.eyelink_graphics.esc_pressed:
                     break
                 self.confirm_abort_experiment()
@@ -329,23 +370,26 @@ class libeyelink(BaseEyeTracker):
                 self.log("PYGAZE RMS CALIBRATION END")
                 self.stop_recording()
         
-                # calculate RMS noise
-                Xvar = []
-                Yvar = []
-                for i in range(2,len(sl)):
-                    Xvar.append((sl[i][0]-sl[i-1][0])**2)
-                    Yvar.append((sl[i][1]-sl[i-1][1])**2)
-                if Xvar and Yvar: # check if properly recorded to avoid risk of division by zero error
-                    XRMS = (sum(Xvar) / len(Xvar))**0.5
-                    YRMS = (sum(Yvar) / len(Yvar))**0.5
-                    self.pxdsttresh = (XRMS, YRMS)
+                # calculate RMS noise (the first sample is ignored)
+                quality = CalibrationQuality(self.screendist, self.pixpercm)
+                quality.add_noise(sl[1:])
+                precision = quality.precision()
+                # check if properly recorded (nan if too few samples)
+                if not any(math.isnan(p) for p in precision):
+                    self.pxdsttresh = precision
         
                     # recalculate thresholds (degrees to pixels)
-                    self.pxfixtresh = deg2pix(self.screendist, self.fixtresh, self.pixpercm)
-                    self.pxspdtresh = deg2pix(self.screendist, self.spdtresh,
-                        self.pixpercm)/1000.0 # in pixels per millisecons
-                    self.pxacctresh = deg2pix(self.screendist, self.accthresh,
-                        self.pixpercm)/1000.0 # in pixels per millisecond**2
+                    thresholds = quality.thresholds(self.fixtresh, \
+                        self.spdtresh, self.accthresh)
+                    self.pxfixtresh = thresholds['pxfixtresh']
+                    self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecons
+                    self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
+
+                    # calibration report
+                    self.calibration_report = quality.report( \
+                        thresholds=thresholds, precision=self.pxdsttresh)
+                    for line in quality.report_lines(self.calibration_report):
+                        self.log(line)
                     return
                 else: # if nothing recorded, display message saying so
                     self.display.fill()
@@ -396,7 +440,7 @@ class libeyelink(BaseEyeTracker):
         try:
             # The 0 parameters indicate that the display should not be cleared
             # and we should not be allowed to fall back to the set-up screen.
-            error = pylink.getEYELINK().doDriftCorrect(
+            error = _link.doDriftCorrect(
                 int(pos[0]),
                 int(pos[1]),
                 0,
@@ -422,7 +466,7 @@ class libeyelink(BaseEyeTracker):
         # start collecting samples in drift correction mode
         self.send_command("heuristic_filter = ON")
         self.send_command("drift_correction_targets = {} {}".format(pos[0], pos[1]))
-        pylink.getEYELINK().dataSwitch(pylink.RECORD_LINK_SAMPLES)
+        _link.dataSwitch(pylink.RECORD_LINK_SAMPLES)
         self.send_command("start_drift_correction data = 0 0 1 0")
         pylink.msecDelay(50)
 
@@ -442,24 +486,27 @@ class libeyelink(BaseEyeTracker):
         self.prepare_drift_correction(pos)
         self.draw_drift_correction_target(pos[0], pos[1])
 
-        # loop until we have enough samples
-        lx = []
-        ly = []
-        while len(lx) < min_samples:
+        # Check whether the EyeLink is put into set-up mode on the EyeLink PC
+        # while waiting.
+        def in_setup_mode():
+            if _link.getCurrentMode() == pylink.IN_SETUP_MODE:
+                return 'setup'
+
+        # loop until the EyeLink accepts the drift correction
+        while True:
 
-            # Check whether the EyeLink is put into set-up mode on the EyeLink
-            # PC and, if so, jump to the calibration menu.
-            if pylink.getEYELINK().getCurrentMode() == pylink.IN_SETUP_MODE:
+            # wait until gaze rests on the target; pressing escape enters the
+            # calibration screen
+            resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+                reset_threshold, check=in_setup_mode)
+            if resp == 'setup':
                 self.recording = False
                 self.calibrate()
                 print(
                     "libeyelink.libeyelink.fix_triggered_drift_correction(): "
                     "'q' pressed")
                 return False
-
-            # pressing escape enters the calibration screen
-            resp = self.kb.get_key(keylist=["escape", "q"], timeout=1)[0]
-            if resp == 'escape':
+            elif resp == 'escape':
                 self.recording = False
                 self.confirm_abort_experiment()
                 print(
@@ -473,50 +520,32 @@ class libeyelink(BaseEyeTracker):
                     "libeyelink.libeyelink.fix_triggered_drift_correction(): "
                     "'q' pressed")
                 return False
-            # collect a sample
-            x, y = self.sample()
-            if x < 0 or y < 0:
-                continue
-            if len(lx) == 0 or x != lx[-1] or y != ly[-1]:
-                # if present sample deviates too much from previous sample,
-                # start from scratch.
-                if len(lx) > 0 and (abs(x - lx[-1]) > reset_threshold or \
-                    abs(y - ly[-1]) > reset_threshold):
-                    lx = []
-                    ly = []
-                # Collect a sample
-                else:
-                    lx.append(x)
-                    ly.append(y)
-            # If we have enough samples to perform a drift correction ...
-            if len(lx) == min_samples:
-                avg_x = sum(lx) / len(lx)
-                avg_y = sum(ly) / len(ly)
-                d = ((avg_x - pos[0]) ** 2 + (avg_y - pos[1]) ** 2)**0.5
-                # emulate spacebar press on succes
-                pylink.getEYELINK().sendKeybutton(32, 0, pylink.KB_PRESS)
-                # getCalibrationResult() returns 0 on success and an exception
-                # or a non-zero value otherwise
-                result = -1
+
+            # emulate spacebar press on succes
+            _link.sendKeybutton(32, 0, pylink.KB_PRESS)
+            # getCalibrationResult() returns 0 on success and an exception
+            # or a non-zero value otherwise
+            accepted = True
+            result = -1
+            try:
+                result = _link.getCalibrationResult()
+            except:
+                accepted = False
+                print(
+                    "libeyelink.libeyelink.fix_triggered_drift_correction(): "
+                    "try again")
+            if result != 0:
                 try:
-                    result = pylink.getEYELINK().getCalibrationResult()
+                    result = _link.getCalibrationResult()
                 except:
-                    lx = []
-                    ly = []
+                    accepted = False
                     print(
                         "libeyelink.libeyelink.fix_triggered_drift_correction(): "
                         "try again")
-                if result != 0:
-                    try:
-                        result = pylink.getEYELINK().getCalibrationResult()
-                    except:
-                        lx = []
-                        ly = []
-                        print(
-                            "libeyelink.libeyelink.fix_triggered_drift_correction(): "
-                            "try again")
+            if accepted:
+                break
         # apply drift correction
-        pylink.getEYELINK().applyDriftCorrect()
+        _link.applyDriftCorrect()
         self.recording = False
         print("libeyelink.libeyelink.fix_triggered_drift_correction(): success")
         return True
@@ -530,7 +559,7 @@ class libeyelink(BaseEyeTracker):
         while True:
             # params: write samples, write event, send samples, send events
             print(u'starting recording ...')
-            error = pylink.getEYELINK().startRecording(1, 1, 1, 1)
+            error = _link.startRecording(1, 1, 1, 1)
             print(u'returned {}'.format(error))
             if not error:
                 break
@@ -550,20 +579,26 @@ class libeyelink(BaseEyeTracker):
         # wait a bit until samples start coming in
         print(u'Wait for block start ...')
         pylink.msecDelay(100)
-        if not pylink.getEYELINK().waitForBlockStart(100, 1, 0):
+        if not _link.waitForBlockStart(100, 1, 0):
             raise Exception(
                 "Error in libeyelink.libeyelink.start_recording(): Failed to "
                 "start recording (waitForBlockStart error)!")
+        # start reading samples and events from the link
+        if self.eye_used == None:
+            self.set_eye_used()
+        self._start_reader()
         print(u'done ...')
 
     def stop_recording(self):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
+        self.flush_messages()
         print(u'stopping recording ...')
         self.recording = False
+        self._stop_reader()
         pylink.endRealTimeMode()
-        pylink.getEYELINK().setOfflineMode()
+        _link.setOfflineMode()
         pylink.msecDelay(500)
         print(u'done ...')
 
@@ -571,12 +606,13 @@ class libeyelink(BaseEyeTracker):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
+        self.flush_messages()
         self.eyelink_graphics.close()
         if self.recording:
             self.stop_recording()
         # close data file and transfer it to the experimental PC
         print(u"libeyelink.libeyelink.close(): Closing data file")
-        pylink.getEYELINK().closeDataFile()
+        _link.closeDataFile()
         pylink.msecDelay(500)
         print(u"libeyelink.libeyelink.close(): Transferring {} to {}".format( \
             self.eyelink_data_file, self.local_data_file))
@@ -584,19 +620,19 @@ class libeyelink(BaseEyeTracker):
         _out = sys.stdout
         with open(os.devnull, 'w') as fd:
             sys.stdout = fd
-            pylink.getEYELINK().receiveDataFile(self.eyelink_data_file,
+            _link.receiveDataFile(self.eyelink_data_file,
                 self.local_data_file)
             sys.stdout = _out
         pylink.msecDelay(500)
         print(u"libeyelink.libeyelink.close(): Closing eyelink")
-        pylink.getEYELINK().close();
+        _link.close();
         pylink.msecDelay(500)
 
     def set_eye_used(self):
 
         """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
 
-        self.eye_used = pylink.getEYELINK().eyeAvailable()
+        self.eye_used = _link.eyeAvailable()
         if self.eye_used == self.right_eye:
             self.log_var("eye_used", "right")
         elif self.eye_used == self.left_eye or self.eye_used == self.binocular:
@@ -617,8 +653,14 @@ class libeyelink(BaseEyeTracker):
                 "not started before collecting eyelink data!")
         if self.eye_used == None:
             self.set_eye_used()
+        # while recording, the newest sample is in the sample buffer
+        if self._reading:
+            s = self.samples.latest()
+            if s != None:
+                self.prevps = s[3]
+            return self.prevps
         # get newest sample
-        s = pylink.getEYELINK().getNewestSample()
+        s = _link.getNewestSample()
         # check if sample is new
         if s != None:
             # right eye
@@ -647,7 +689,13 @@ class libeyelink(BaseEyeTracker):
                 "started before collecting eyelink data!")
         if self.eye_used == None:
             self.set_eye_used()
-        s = pylink.getEYELINK().getNewestSample()
+        # while recording, the newest sample is in the sample buffer
+        if self._reading:
+            s = self.samples.latest()
+            if s != None:
+                self.prevsample = s[1:3]
+            return self.prevsample[:]
+        s = _link.getNewestSample()
         if s != None:
             if self.eye_used == self.right_eye and s.isRightSample():
                 gaze = s.getRightEye().getGaze()
@@ -681,7 +729,178 @@ class libeyelink(BaseEyeTracker):
         Returns:
         The tracker time minus the clock time
         """
-        return pylink.getEYELINK().trackerTime() -  clock.get_time()
+        return _link.trackerTime() -  clock.get_time()
+
+    def get_eyetracker_clock_async(self):
+
+        """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
+
+        # while recording, the reader Thread keeps the difference up to date
+        if self._reading:
+            return self._clock_offset
+        return self._get_eyelink_clock_async()
+
+    def subscribe_events(self):
+
+        """
+        Subscribes to native EyeLink events. While recording, every event
+        (STARTSACC, ENDSACC, STARTFIX, ENDFIX, STARTBLINK, ENDBLINK) that is
+        read from the link is put in the returned queue, until
+        unsubscribe_events is called.
+
+        Returns:
+        A SampleQueue of (event type, time, float data) tuples, with the time
+        in milliseconds on the PyGaze clock
+        """
+
+        queue = SampleQueue(name="EyeLink event")
+        with self._eventlock:
+            self._event_subscribers = self._event_subscribers + [queue]
+        return queue
+
+    def unsubscribe_events(self, queue):
+
+        """
+        Stops putting native EyeLink events in a queue that was returned by
+        subscribe_events.
+
+        Arguments:
+        queue        --    the SampleQueue of the subscriber
+        """
+
+        with self._eventlock:
+            self._event_subscribers = [q for q in self._event_subscribers \
+                if q is not queue]
+
+    def _start_reader(self):
+
+        """Starts the Thread that reads link data while recording"""
+
+        self._clock_offset = self._get_eyelink_clock_async()
+        self._reading = True
+        self._reader = Thread(target=self._read_link_data, \
+            name='PyGaze_EyeLink_reader', args=[])
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _stop_reader(self):
+
+        """Stops the Thread that reads link data"""
+
+        self._reading = False
+        if self._reader != None:
+            self._reader.join()
+            self._reader = None
+
+    def _read_link_data(self):
+
+        """
+        Reads all samples and events from the link while recording (this runs
+        on a background Thread). Samples of the eye that is used are added to
+        the sample buffer, and eye movement events are passed on to all
+        subscribers, with their timestamps converted to the PyGaze clock.
+        """
+
+        # every call on the link is serialized with the other Threads
+        el = _link
+        events = (pylink.STARTSACC, pylink.ENDSACC, pylink.STARTFIX,
+            pylink.ENDFIX, pylink.STARTBLINK, pylink.ENDBLINK)
+        refresh_time = clock.get_time() + self.clock_offset_interval
+        while self._reading:
+            # the tracker clock may drift, so refresh its difference with
+            # the PyGaze clock every now and then
+            if clock.get_time() >= refresh_time:
+                self._clock_offset = self._get_eyelink_clock_async()
+                refresh_time += self.clock_offset_interval
+            d = el.getNextData()
+            # sleep a bit when all data has been read
+            if not d:
+                time.sleep(0.0005)
+                continue
+            if d == pylink.SAMPLE_TYPE:
+                s = el.getFloatData()
+                if self.eye_used == self.right_eye and s.isRightSample():
+                    e = s.getRightEye()
+                    gaze = e.getGaze()
+                    ps = e.getPupilSize()
+                elif self.eye_used == self.left_eye and s.isLeftSample():
+                    e = s.getLeftEye()
+                    gaze = e.getGaze()
+                    ps = e.getPupilSize()
+                else:
+                    gaze = (-1,-1)
+                    ps = -1
+                self.samples.append(s.getTime() - self._clock_offset, \
+                    gaze[0], gaze[1], ps)
+            elif d in events:
+                float_data = el.getFloatData()
+                event = (d, float_data.getTime() - self._clock_offset, \
+                    float_data)
+                with self._eventlock:
+                    self._recent_events.append(event)
+                    for queue in self._event_subscribers:
+                        queue.put(event)
+
+    def _new_samples(self):
+
+        """
+        Yields every sample that is added to the sample buffer from now on.
+
+        Returns:
+        A generator of (time, (x, y)) tuples, with the time in milliseconds
+        on the PyGaze clock
+        """
+
+        seq = self.samples.nwritten
+        while True:
+            # samples are only added while recording
+            if not self._reading:
+                raise Exception(
+                    "Error in libeyelink.libeyelink.sample(): Recording was not "
+                    "started before collecting eyelink data!")
+            if not self.samples.wait(seq, timeout=0.1):
+                continue
+            seq, samples = self.samples.read(seq)
+            seq += len(samples)
+            for t, x, y, ps in samples.tolist():
+                yield t, (x, y)
+
+    def _drift_samples(self):
+
+        """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
+
+        if self.eye_used == None:
+            self.set_eye_used()
+        tlast = None
+        # while recording, every sample is in the sample buffer
+        if self._reading:
+            seq = self.samples.nwritten
+            while self._reading:
+                seq, samples = self.samples.read(seq)
+                seq += len(samples)
+                if tlast != None:
+                    samples = samples[samples[:, 0] > tlast]
+                if len(samples) == 0:
+                    yield None
+                    continue
+                tlast = samples[-1, 0]
+                for t, x, y, ps in samples.tolist():
+                    yield x, y
+        # otherwise, only the newest sample can be read from the link, which
+        # is new if its timestamp is
+        tlast = None
+        while True:
+            s = _link.getNewestSample()
+            if s == None or s.getTime() == tlast:
+                yield None
+                continue
+            tlast = s.getTime()
+            if self.eye_used == self.right_eye and s.isRightSample():
+                yield tuple(s.getRightEye().getGaze())
+            elif self.eye_used == self.left_eye and s.isLeftSample():
+                yield tuple(s.getLeftEye().getGaze())
+            else:
+                yield -1, -1
 
     def wait_for_event(self, event):
 
@@ -695,17 +914,28 @@ class libeyelink(BaseEyeTracker):
         if self.eye_used == None:
             self.set_eye_used()
         if self.eventdetection == 'native':
-            # since the link buffer was not have been polled, old data has
-            # accumulated in the buffer -- so ignore events that are old:
+            # events are passed on by the reader Thread; since an event may
+            # only reach the link after some delay, recent events are checked
+            # as well -- but ignore events that are old:
             t0 = clock.get_time() # time of call
-            while True:
-                d = pylink.getEYELINK().getNextData()
-                if d == event:
-                    float_data  = pylink.getEYELINK().getFloatData()
-                    # corresponding clock_time
-                    tc = float_data.getTime() - self._get_eyelink_clock_async()
-                    if tc > t0:
-                        return tc, float_data
+            with self._eventlock:
+                queue = self.subscribe_events()
+                events = list(self._recent_events)
+            try:
+                while True:
+                    for d, tc, float_data in events:
+                        if d == event and tc > t0:
+                            return tc, float_data
+                    # events are only read while recording, which may be
+                    # stopped from another Thread
+                    if not self._reading:
+                        raise Exception(
+                            "Error in libeyelink.libeyelink.wait_for_event(): "
+                            "Recording was stopped before the event occurred!")
+                    # wait for new events
+                    events = queue.get_batch(timeout=0.1)
+            finally:
+                self.unsubscribe_events(queue)
 
         if event == 5:
             outcome = self.wait_for_saccade_start()
@@ -740,12 +970,13 @@ class libeyelink(BaseEyeTracker):
 
         else:
 
+            # every sample from the link, with its timestamp
+            samples = self._new_samples()
             # get starting position (no blinks)
-            newpos = self.sample()
+            t0, newpos = next(samples)
             while not self.is_valid_sample(newpos):
-                newpos = self.sample()
-            # get starting time, position, intersampledistance, and velocity
-            t0 = clock.get_time()
+                t0, newpos = next(samples)
+            # get starting position, intersampledistance, and velocity
             prevpos = newpos[:]
             s = 0
             v0 = 0
@@ -754,9 +985,9 @@ class libeyelink(BaseEyeTracker):
             saccadic = False
             while not saccadic:
                 # get new sample
-                newpos = self.sample()
-                t1 = clock.get_time()
-                if self.is_valid_sample(newpos) and newpos != prevpos:
+                t1, newpos = next(samples)
+                if self.is_valid_sample(newpos) and newpos != prevpos and \
+                    t1 > t0:
                     # check if distance is larger than precision error
                     sx = newpos[0]-prevpos[0]; sy = newpos[1]-prevpos[1]
                     # weigthed distance: (sx/tx)**2 + (sy/ty)**2 > 1 means
@@ -775,7 +1006,7 @@ class libeyelink(BaseEyeTracker):
                         if v1 > self.pxspdtresh or a > self.pxacctresh:
                             saccadic = True
                             spos = prevpos[:]
-                            stime = clock.get_time()
+                            stime = t1
                         # update previous values
                         t0 = copy.copy(t1)
                         v0 = copy.copy(v1)
@@ -802,12 +1033,13 @@ class libeyelink(BaseEyeTracker):
 
             # get starting position (no blinks)
             t0, spos = self.wait_for_saccade_start()
+            # every sample from the link, with its timestamp
+            samples = self._new_samples()
             # get valid sample
-            prevpos = self.sample()
-            while not self.is_valid_sample(prevpos):
-                prevpos = self.sample()
-            # get starting time, intersample distance, and velocity
-            t1 = clock.get_time()
+            t1, prevpos = next(samples)
+            while not self.is_valid_sample(prevpos) or t1 <= t0:
+                t1, prevpos = next(samples)
+            # get starting intersample distance, and velocity
             # = intersample distance = speed in px/sample
             s = ((prevpos[0]-spos[0])**2 + (prevpos[1]-spos[1])**2)**0.5
             v0 = s / (t1-t0)
@@ -815,9 +1047,9 @@ class libeyelink(BaseEyeTracker):
             saccadic = True
             while saccadic:
                 # get new sample
-                newpos = self.sample()
-                t1 = clock.get_time()
-                if self.is_valid_sample(newpos) and newpos != prevpos:
+                t1, newpos = next(samples)
+                if self.is_valid_sample(newpos) and newpos != prevpos and \
+                    t1 > t0:
                     # calculate distance
                     # = speed in pixels/sample
                     s = ((newpos[0]-prevpos[0])**2 + \
@@ -833,7 +1065,7 @@ class libeyelink(BaseEyeTracker):
                         a < 0):
                         saccadic = False
                         epos = newpos[:]
-                        etime = clock.get_time()
+                        etime = t1
                     # update previous values
                     t0 = copy.copy(t1)
                     v0 = copy.copy(v1)
@@ -862,19 +1094,19 @@ class libeyelink(BaseEyeTracker):
             # function assumes a 'fixation' has started when gaze position
             # remains reasonably stable for self.fixtimetresh
 
-            # get starting position
-            spos = self.sample()
-            while not self.is_valid_sample(spos):
-                spos = self.sample()
+            # every sample from the link, with its timestamp
+            samples = self._new_samples()
 
-            # get starting time
-            t0 = clock.get_time()
+            # get starting position and time
+            t0, spos = next(samples)
+            while not self.is_valid_sample(spos):
+                t0, spos = next(samples)
 
             # wait for reasonably stable position
             moving = True
             while moving:
                 # get new sample
-                npos = self.sample()
+                t1, npos = next(samples)
                 # check if sample is valid
                 if self.is_valid_sample(npos):
                     # check if new sample is too far from starting position
@@ -882,11 +1114,9 @@ class libeyelink(BaseEyeTracker):
                         self.pxfixtresh**2: # Pythagoras
                         # if not, reset starting position and time
                         spos = copy.copy(npos)
-                        t0 = clock.get_time()
+                        t0 = t1
                     # if new sample is close to starting sample
                     else:
-                        # get timestamp
-                        t1 = clock.get_time()
                         # check if fixation time threshold has been surpassed
                         if t1 - t0 >= self.fixtimetresh:
                             # return time and starting position
@@ -915,11 +1145,13 @@ class libeyelink(BaseEyeTracker):
 
             # get starting time and position
             stime, spos = self.wait_for_fixation_start()
+            # every sample from the link, with its timestamp
+            samples = self._new_samples()
 
             # loop until fixation has ended
             while True:
                 # get new sample
-                npos = self.sample() # get newest sample
+                t1, npos = next(samples)
                 # check if sample is valid
                 if self.is_valid_sample(npos):
                     # check if sample deviates to much from starting position
@@ -928,7 +1160,7 @@ class libeyelink(BaseEyeTracker):
                         # break loop if deviation is too high
                         break
 
-            return clock.get_time(), spos
+            return t1, spos
 
     def wait_for_blink_start(self):
 
@@ -948,21 +1180,21 @@ class libeyelink(BaseEyeTracker):
         else:
 
             blinking = False
+            # every sample from the link, with its timestamp
+            samples = self._new_samples()
 
             # loop until there is a blink
             while not blinking:
-                # get newest sample
-                gazepos = self.sample()
-                # check if it's a valid sample
-                if not self.is_valid_sample(gazepos):
-                    # get timestamp for possible blink start
-                    t0 = clock.get_time()
-                    # loop until a blink is determined, or a valid sample occurs
-                    while not self.is_valid_sample(self.sample()):
-                        # check if time has surpassed 150 ms
-                        if clock.get_time()-t0 >= self.blink_threshold:
-                            # return timestamp of blink start
-                            return t0
+                # get next sample, and its timestamp for possible blink start
+                t0, gazepos = next(samples)
+                t1 = t0
+                # loop until a blink is determined, or a valid sample occurs
+                while not self.is_valid_sample(gazepos):
+                    # check if time has surpassed 150 ms
+                    if t1-t0 >= self.blink_threshold:
+                        # return timestamp of blink start
+                        return t0
+                    t1, gazepos = next(samples)
 
     def wait_for_blink_end(self):
 
@@ -982,18 +1214,20 @@ class libeyelink(BaseEyeTracker):
         else:
 
             blinking = True
+            # every sample from the link, with its timestamp
+            samples = self._new_samples()
 
             # loop while there is a blink
             while blinking:
-                # get newest sample
-                gazepos = self.sample()
+                # get next sample
+                t1, gazepos = next(samples)
                 # check if it's valid
                 if self.is_valid_sample(gazepos):
                     # if it is a valid sample, blinking has stopped
                     blinking = False
 
             # return timestamp of blink end
-            return clock.get_time()
+            return t1
 
     def set_draw_calibration_target_func(self, func):
 
@@ -27,9 +27,11 @@ from pygaze.screen import Screen
 from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.samplequeue import SampleQueue, SampleRing
+from pygaze._eyetracker.calibrationquality import CalibrationQuality
 from threading import Event, Lock, Thread
-from multiprocessing import Queue
 import copy
+import ctypes
 import math
 
 try:
@@ -78,87 +80,18 @@ def errorstringCalibrate(returncode):
     else:
         return "unknown calibration error"
 
-def deg2pix(cmdist, angle, pixpercm):
-    """Returns the value in pixels for given values (internal use)
-
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-
-    returns
-    pixelsize    -- stimulus size in pixels (calculation based on size in
-               visual angle on display with given properties)
-    """
-
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
-
-def pix2deg(cmdist, pixelsize, pixpercm):
-    """Converts a distance on the screen in pixels into degrees of visual
-    angle (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    pixelsize    -- stimulus size in pixels
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    angle        -- size of stimulus in visual angle
-    """
-    
-    cmsize = float(pixelsize) / pixpercm
-    return 2 * cmdist * math.tan(math.radians(cmsize) / 2.)
-
 g_api = None
 
 @GazeSampleCallback
 def gazeSampleCallback(sample = POINTER(ELGazeSample)):
     if g_api is None:
         return
-    g_api.sampleLock.acquire()
-    scaleX = g_api.dispsize[0] / g_api.rawResolution[0]
-    scaleY = g_api.dispsize[1] / g_api.rawResolution[1]
-
-    g_api.lastSample = ELGazeSample()
-    g_api.lastSample.timestampMicroSec = sample.contents.timestampMicroSec
-    g_api.lastSample.index = sample.contents.index
-    if (sample.contents.porRawX == ELInvalidValue):
-        g_api.lastSample.porRawX = ELInvalidValue
-        g_api.lastSample.porRawY = ELInvalidValue
-    else:
-        g_api.lastSample.porRawX = sample.contents.porRawX * scaleX
-        g_api.lastSample.porRawY = sample.contents.porRawY * scaleY
-    if (sample.contents.porFilteredX == ELInvalidValue):
-        g_api.lastSample.porFilteredX = ELInvalidValue
-        g_api.lastSample.porFilteredY = ELInvalidValue
-    else:
-        g_api.lastSample.porFilteredX = sample.contents.porFilteredX * scaleX
-        g_api.lastSample.porFilteredY = sample.contents.porFilteredY * scaleY
-    if (sample.contents.porLeftX == ELInvalidValue):
-        g_api.lastSample.porLeftX = ELInvalidValue
-        g_api.lastSample.porLeftY = ELInvalidValue
-    else:
-        g_api.lastSample.porLeftX = sample.contents.porLeftX * scaleX
-        g_api.lastSample.porLeftY = sample.contents.porLeftY * scaleY
-    g_api.lastSample.eyePositionLeftX = sample.contents.eyePositionLeftX
-    g_api.lastSample.eyePositionLeftY = sample.contents.eyePositionLeftY
-    g_api.lastSample.eyePositionLeftZ = sample.contents.eyePositionLeftZ
-    g_api.lastSample.pupilRadiusLeft = sample.contents.pupilRadiusLeft
-    if (sample.contents.porRightX == ELInvalidValue):
-        g_api.lastSample.porRightX = ELInvalidValue
-        g_api.lastSample.porRightY = ELInvalidValue
-    else:
-        g_api.lastSample.porRightX = sample.contents.porRightX * scaleX
-        g_api.lastSample.porRightY = sample.contents.porRightY * scaleY
-    g_api.lastSample.eyePositionRightX = sample.contents.eyePositionRightX
-    g_api.lastSample.eyePositionRightY = sample.contents.eyePositionRightY
-    g_api.lastSample.eyePositionRightZ = sample.contents.eyePositionRightZ
-    g_api.lastSample.pupilRadiusRight = sample.contents.pupilRadiusRight
-    gs = copy.copy(g_api.lastSample)
-    g_api.sampleLock.release()
+    # Only copy the raw sample into the preallocated ring, so that we return
+    # to the API as quickly as possible. Gaze coordinates are scaled to the
+    # display resolution when samples are read from the ring.
+    seq = g_api._sample_ring.write(ctypes.cast(sample, ctypes.c_void_p).value)
     if g_api._recording.is_set():
-        g_api._logging_queue.put(gs)
+        g_api._logging_queue.put(seq)
 
 @EventCallback
 def eventCallback(eventId):
@@ -187,6 +120,10 @@ def eventCallback(eventId):
 ## A class for EyeLogic eye tracker objects.
 class EyeLogicTracker(BaseEyeTracker):
 
+## Messages are queued for the log file, so there is no need to wait
+## between them.
+    message_interval = 0
+
 ## Initializes the EyeTracker object.
     def __init__(self, display,
         logfile=settings.LOGFILE, \
@@ -230,8 +167,7 @@ class EyeLogicTracker(BaseEyeTracker):
         self._calibrated = Event()
         self._calibrated.clear()
         self.eye_used = 2 # 0=left, 1=right, 2=binocular
-        self.sampleLock = Lock()
-        self.lastSample = None
+        self._sample_ring = SampleRing(ELGazeSample)
         self.maxtries = 100 # number of samples obtained before giving up (for obtaining accuracy and tracker distance information, as well as starting or stopping recording)
 
         # event detection properties
@@ -269,9 +205,7 @@ class EyeLogicTracker(BaseEyeTracker):
         self._log_file.write("Sep="+self._sep+"\n")
         self._log_file.write(self._sep.join(map(str, header)))
         # Create a lock to prevent simultaneous access to the log file.
-        self._logging_queue = Queue()
-        self._logging_queue_empty = Event()
-        self._logging_queue_empty.set()
+        self._logging_queue = SampleQueue(name="EyeLogic log")
         self._connected = Event()
         self._connected.set()
         self._log_counter = 0
@@ -333,23 +267,19 @@ class EyeLogicTracker(BaseEyeTracker):
     def loggingThread(self):
         while self._connected.is_set():
             
-            # Check if the sample Queue is empty.
-            if self._logging_queue.empty():
-                # Signal to other Threads that the logging Queue is empty.
-                if not self._logging_queue_empty.is_set():
-                    self._logging_queue_empty.set()
+            # Wait for new objects in the Queue, and take all of them. (The
+            # timeout is there to regularly check whether we should stop.)
+            batch = self._logging_queue.get_batch(timeout=0.1)
+            if not batch:
+                continue
             
             # Process data from the Queue.
-            else:
-                # Signal to other Threads that the Queue isn't empty.
-                if self._logging_queue_empty.is_set():
-                    self._logging_queue_empty.clear()
-                # Get the next object from the Queue.
-                sample = self._logging_queue.get()
+            consolidate = False
+            for sample in batch:
                 # Log the message string and/or the sample.
                 if type(sample) in [tuple, list]:
                     self._write_tuple(sample)
-                elif type(sample) == ELGazeSample:
+                elif type(sample) == int:
                     self._write_sample(sample)
                 else:
                     print("WARNING = Unrecognised object in log queue = '{}'".format( \
@@ -358,17 +288,60 @@ class EyeLogicTracker(BaseEyeTracker):
                 self._log_counter += 1
                 # Check if the log file needs to be consolidated.
                 if self._log_counter % self._log_consolidation_freq == 0:
-                    # Internal buffer to RAM.
-                    self._log_file.flush()
-                    # RAM to disk.
-                    os.fsync(self._log_file.fileno())
-                    # Release the log file lock.
+                    consolidate = True
+            # Consolidate the log file once per batch.
+            if consolidate:
+                # Internal buffer to RAM.
+                self._log_file.flush()
+                # RAM to disk.
+                os.fsync(self._log_file.fileno())
+            # Signal to other Threads that the batch has been written.
+            self._logging_queue.task_done(len(batch))
+
+    def _wait_for_logging_queue(self):
+        # Wait until all queued samples and messages have been written to
+        # the log file. This only gives up if the logging Thread died, as
+        # it will then never finish.
+        while not self._logging_queue.wait_flushed(timeout=1.0):
+            if not self._logging_thread.is_alive():
+                print("WARNING = Logging Thread stopped before the log was flushed!")
+                return
+        # Internal buffer to RAM.
+        self._log_file.flush()
+        # RAM to disk.
+        os.fsync(self._log_file.fileno())
     
-    def _write_sample(self, sample):
+    def _last_sample(self):
+        # Returns the newest sample from the ring, or None if no samples
+        # came in yet.
+        if self._sample_ring.nwritten == 0:
+            return None
+        return self._scale_sample(self._sample_ring.newest())
+
+    def _scale_sample(self, sample):
+        # Scales the gaze coordinates of a sample (a copy from the ring)
+        # from the raw screen resolution to the display resolution.
+        scaleX = self.dispsize[0] / self.rawResolution[0]
+        scaleY = self.dispsize[1] / self.rawResolution[1]
+        for x, y in (("porRawX", "porRawY"), ("porFilteredX", "porFilteredY"), \
+            ("porLeftX", "porLeftY"), ("porRightX", "porRightY")):
+            if sample[x] != ELInvalidValue:
+                sample[x] *= scaleX
+                sample[y] *= scaleY
+        return sample
+
+    def _write_sample(self, seq):
+        # Get the sample from the ring. If the logging Thread fell so far
+        # behind that it was overwritten, it is lost.
+        sample = self._sample_ring.read(seq)
+        if sample is None:
+            print("WARNING = Sample {} was overwritten before it was logged".format( \
+                seq))
+            return
+        sample = self._scale_sample(sample)
         # Construct a list with the sample data.
         line = ["DAT"]
-        for var in self._log_vars:
-            line.append(sample.__getattribute__(var))
+        line.extend(sample[self._log_vars].item())
         # Log the sample to the log file.
         self._log_file.write("\n" + self._sep.join(map(str, line)))
 
@@ -429,13 +402,12 @@ class EyeLogicTracker(BaseEyeTracker):
         i = 0
         while screendist == 0 and i < self.maxtries:
             i = i+1
-            self.sampleLock.acquire()
-            if (self.lastSample is not None):
-                if self.eye_used != 1 and self.lastSample.eyePositionLeftZ != ELInvalidValue:
-                    screendist = self.lastSample.eyePositionLeftZ / 10.0 # eyePositionZ is in mm; screendist is in cm
-                elif self.eye_used != 0 and self.lastSample.eyePositionRightZ != ELInvalidValue:
-                    screendist = self.lastSample.eyePositionRightZ / 10.0
-            self.sampleLock.release()
+            lastSample = self._last_sample()
+            if (lastSample is not None):
+                if self.eye_used != 1 and lastSample["eyePositionLeftZ"] != ELInvalidValue:
+                    screendist = lastSample["eyePositionLeftZ"] / 10.0 # eyePositionZ is in mm; screendist is in cm
+                elif self.eye_used != 0 and lastSample["eyePositionRightZ"] != ELInvalidValue:
+                    screendist = lastSample["eyePositionRightZ"] / 10.0
             clock.pause(int(self.sampleTime))
         if i >= self.maxtries:
             self.api.unrequestTracking()
@@ -455,49 +427,35 @@ class EyeLogicTracker(BaseEyeTracker):
                 self.api.unrequestTracking()
             return False
 
-        # calculate RMS noise
-        Xvar = []
-        Yvar = []
-        Xmean = 0.
-        Ymean = 0.
-        for i in range(2,len(sl)):
-            Xvar.append((sl[i][0]-sl[i-1][0])**2)
-            Yvar.append((sl[i][1]-sl[i-1][1])**2)
-            Xmean += sl[i][0]
-            Ymean += sl[i][1]
-        XRMS = (sum(Xvar) / len(Xvar))**0.5
-        YRMS = (sum(Yvar) / len(Yvar))**0.5
-        Xmean = Xmean / (len(sl)-2)
-        Ymean = Ymean / (len(sl)-2)
-        self.pxdsttresh = (XRMS, YRMS)
-
         # calculate pixels per cm
         pixpercm = (self.dispsize[0]/float(self.screensize[0]) + self.dispsize[1]/float(self.screensize[1])) / 2
 
+        # calculate RMS noise and accuracy (the first sample is ignored);
+        # sample returns the gaze of the used eye(s), which is judged for
+        # both eyes
+        quality = CalibrationQuality(screendist, pixpercm)
+        quality.add_noise(sl[1:])
+        quality.add_point((x, y), left=sl[1:], right=sl[1:])
+        self.pxdsttresh = quality.precision(default=(60.0, 90.0))
+
         # get accuracy
-        accuracyPxX = abs( Xmean - x )
-        accuracyPxY = abs( Ymean - y )
-        self.accuracy = ( pix2deg(screendist, accuracyPxX, pixpercm), \
-                          pix2deg(screendist, accuracyPxY, pixpercm) )
+        gaze = quality.eye_quality('left')
+        self.accuracy = gaze['accuracy_deg']
+        self.pxaccuracy = gaze['accuracy']
 
         # calculate thresholds based on tracker settings
-        self.pxfixtresh = deg2pix(screendist, self.fixtresh, pixpercm)
-        self.pxaccuracy = (accuracyPxX, accuracyPxY )
-        self.pxspdtresh = deg2pix(screendist, self.spdtresh/1000.0, pixpercm) # in pixels per millisecond
-        self.pxacctresh = deg2pix(screendist, self.accthresh/1000.0, pixpercm) # in pixels per millisecond**2
+        thresholds = quality.thresholds(self.fixtresh, self.spdtresh, \
+            self.accthresh)
+        self.pxfixtresh = thresholds['pxfixtresh']
+        self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecond
+        self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
 
         ## log
-        self.log("pygaze calibration")
-        self.log("accuracy (degrees) = X={}, Y={}".format( \
-            self.accuracy[0], self.accuracy[1] ))
-        self.log("accuracy (in pixels) = X={}, Y={}".format( \
-            self.pxaccuracy[0], self.pxaccuracy[1]))
-        self.log("precision (RMS noise in pixels) = X={}, Y={}".format( \
-            self.pxdsttresh[0], self.pxdsttresh[1]))
-        self.log("distance between participant and display = {} cm".format(screendist))
-        self.log("fixation threshold = {} pixels".format(self.pxfixtresh))
-        self.log("speed threshold = {} pixels/ms".format(self.pxspdtresh))
-        self.log("acceleration threshold = {} pixels/ms**2".format(self.pxacctresh))
+        self.calibration_report = quality.report(thresholds=thresholds, \
+            samplerate=self.sampleRate, sampletime=self.sampleTime, \
+            precision=self.pxdsttresh)
+        for line in quality.report_lines(self.calibration_report):
+            self.log(line)
         
         if (not self._recording.is_set()):
             self.api.unrequestTracking()
@@ -505,16 +463,18 @@ class EyeLogicTracker(BaseEyeTracker):
 
 ## Neatly closes connection to tracker.
     def close(self):
+        # Forward all messages that were queued with log_async.
+        self.flush_messages()
+
         if self._recording.is_set():
             self.stop_recording()
             
-        # Wait until the Queue is empty, or until 60 seconds have passed.
-        queue_empty = self._logging_queue_empty.wait(timeout=15.0)
-        if not queue_empty:
-            print("WARNING = Logging Thread timeout occurred; something might have gone wrong!")
+        # Wait until all queued data has been written to the log file.
+        self._wait_for_logging_queue()
         
-        # Signal to the Threads to stop.
+        # Signal to the Threads to stop, and wait for them to do so.
         self._connected.clear()
+        self._logging_thread.join()
         
         # Close the log file.
         self._log_file.close()
@@ -534,13 +494,61 @@ class EyeLogicTracker(BaseEyeTracker):
 
 ## Performs a drift check
     def drift_correction(self, pos=None, fix_triggered=False):
+        if fix_triggered:
+            return self.fix_triggered_drift_correction(pos)
         return True
 
+## Draws the drift-correction target.
+    def draw_drift_correction_target(self, x, y):
+        self.screen.clear()
+        self.screen.draw_fixation(fixtype='dot', colour=settings.FGC, pos=(x,y),
+            pw=0, diameter=12)
+        self.disp.fill(self.screen)
+        self.disp.show()
+
 ## Performs a fixation triggered drift correction by collecting
 #  a number of samples and calculating the average distance from the
-#  fixation position.
+#  fixation position. The tracker does not correct drift itself, so this
+#  only checks that gaze rests on the target.
     def fix_triggered_drift_correction(self, pos=None, min_samples=10, max_dev=60, reset_threshold=30):
-        pass
+        if pos == None:
+            pos = (int(self.dispsize[0] / 2), int(self.dispsize[1] / 2))
+
+        # Samples only come in while tracking.
+        tracking = self._recording.is_set()
+        if (not tracking):
+            resultTracking = self.api.requestTracking(0)
+            if (resultTracking != ELApi.ReturnStart.SUCCESS):
+                raise Exception("unable to start eye tracker")
+
+        self.draw_drift_correction_target(pos[0], pos[1])
+        # Wait until gaze rests on the target; pressing escape or q enters
+        # the calibration screen.
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            reset_threshold)
+
+        if (not tracking):
+            self.api.unrequestTracking()
+        if resp in ['escape', 'q']:
+            print("libeyelogic.EyeLogicTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate()
+        return True
+
+## Yields every sample that comes into the ring from now on, for the
+#  fixation triggered drift correction.
+    def _drift_samples(self):
+        seq = self._sample_ring.nwritten
+        while True:
+            if seq >= self._sample_ring.nwritten:
+                yield None
+                continue
+            sample = self._sample_ring.read(seq)
+            seq += 1
+            # Skip samples that were overwritten before they were read.
+            if sample is None:
+                seq = self._sample_ring.nwritten
+                continue
+            yield self._por(self._scale_sample(sample))
 
 ## Returns the difference between tracker time and PyGaze time,
 #  which can be used to synchronize timing
@@ -550,12 +558,10 @@ class EyeLogicTracker(BaseEyeTracker):
 ## Writes a message to the log file.
     def log(self, msg):
         # Get current timestamp.
-        self.sampleLock.acquire()
-        if self.lastSample is None:
+        if self._sample_ring.nwritten == 0:
             t = 0
         else:
-            t = self.lastSample.timestampMicroSec
-        self.sampleLock.release()
+            t = int(self._sample_ring.newest()["timestampMicroSec"])
 
         # Construct a tuple, and add it to the queue.
         self._logging_queue.put(("MSG", t, msg))
@@ -566,30 +572,33 @@ class EyeLogicTracker(BaseEyeTracker):
 
 ## Returns the newest pupil size sample
     def pupil_size(self):
-        self.sampleLock.acquire()
+        lastSample = self._last_sample()
         pupilSize = -1
-        if (self.lastSample is not None):
+        if (lastSample is not None):
             if self.eye_used == 0:
-                pupilSize = 2.*self.lastSample.pupilRadiusLeft;
+                pupilSize = 2.*float(lastSample["pupilRadiusLeft"]);
             elif self.eye_used == 1:
-                pupilSize = 2.*self.lastSample.pupilRadiusRight;
+                pupilSize = 2.*float(lastSample["pupilRadiusRight"]);
             elif self.eye_used == 2:
-                pupilSize = self.lastSample.pupilRadiusLeft + self.lastSample.pupilRadiusRight;
-        self.sampleLock.release()
+                pupilSize = float(lastSample["pupilRadiusLeft"] + lastSample["pupilRadiusRight"]);
         return pupilSize
 
 ## Returns newest available gaze position.
     def sample(self):
-        self.sampleLock.acquire()
+        lastSample = self._last_sample()
+        if (lastSample is None):
+            return (-1, -1)
+        return self._por(lastSample)
+
+    def _por(self, sample):
+        # Returns the gaze position of the used eye(s) in a (scaled) sample.
         por = (-1, -1)
-        if (self.lastSample is not None):
-            if self.eye_used == 0:
-                por = (self.lastSample.porLeftX, self.lastSample.porLeftY)
-            elif self.eye_used == 1:
-                por = (self.lastSample.porRightX, self.lastSample.porRightY)
-            elif self.eye_used == 2:
-                por = (self.lastSample.porFilteredX, self.lastSample.porFilteredY)
-        self.sampleLock.release()
+        if self.eye_used == 0:
+            por = (float(sample["porLeftX"]), float(sample["porLeftY"]))
+        elif self.eye_used == 1:
+            por = (float(sample["porRightX"]), float(sample["porRightY"]))
+        elif self.eye_used == 2:
+            por = (float(sample["porFilteredX"]), float(sample["porFilteredY"]))
         return por
 
 # Directly sends a command to the eye tracker.
@@ -628,8 +637,11 @@ class EyeLogicTracker(BaseEyeTracker):
 
 ## Stops recording.
     def stop_recording(self):
+        self.flush_messages()
         self.api.unrequestTracking()
         self._recording.clear()
+        # Wait until all recorded samples are in the log file.
+        self._wait_for_logging_queue()
 
 ## Waits for an event.
     def wait_for_event(self, event):
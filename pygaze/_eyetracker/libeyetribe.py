@@ -30,6 +30,7 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.calibrationquality import CalibrationQuality
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -47,24 +48,6 @@ import random
 from pygaze._eyetracker.pytribe import EyeTribe
 
 
-def deg2pix(cmdist, angle, pixpercm):
-
-    """Returns the value in pixels for given values (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    pixelsize    -- stimulus size in pixels (calculation based on size in
-               visual angle on display with given properties)
-    """
-
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
-
-
 # class
 class EyeTribeTracker(BaseEyeTracker):
 
@@ -344,45 +327,37 @@ class EyeTribeTracker(BaseEyeTracker):
         if quited:
             return False
 
-        # NOISE CALIBRATION
-        # get all error estimates (pixels)
-        var = []
-        for p in calibresult['calibpoints']:
-            # only draw the point if data was obtained
-            if p['state'] > 0:
-                var.append(p['mepix'])
-        noise = sum(var) / float(len(var)) if var else float('inf')
-        self.pxdsttresh = (noise, noise)
-                
-        # AFTERMATH
         # store some variables
         pixpercm = (self.dispsize[0]/float(self.screensize[0]) + self.dispsize[1]/float(self.screensize[1])) / 2
         screendist = settings.SCREENDIST
+        quality = CalibrationQuality(screendist, pixpercm)
+
+        # NOISE CALIBRATION
+        # the tracker reports the mean error (pixels) of every point; only
+        # use the point if data was obtained
+        quality.set_tracker_precision([p['mepix'] for p in \
+            calibresult['calibpoints'] if p['state'] > 0])
+        self.pxdsttresh = quality.precision(default=(60.0, 90.0))
+                
+        # AFTERMATH
         # calculate thresholds based on tracker settings
-        self.accuracy = ((calibresult['Ldeg'],calibresult['Ldeg']), (calibresult['Rdeg'],calibresult['Rdeg'])) 
-        self.pxerrdist = deg2pix(screendist, self.errdist, pixpercm)
-        self.pxfixtresh = deg2pix(screendist, self.fixtresh, pixpercm)
-        self.pxaccuracy = ((deg2pix(screendist, self.accuracy[0][0], pixpercm),deg2pix(screendist, self.accuracy[0][1], pixpercm)), (deg2pix(screendist, self.accuracy[1][0], pixpercm),deg2pix(screendist, self.accuracy[1][1], pixpercm)))
-        self.pxspdtresh = deg2pix(screendist, self.spdtresh/1000.0, pixpercm) # in pixels per millisecond
-        self.pxacctresh = deg2pix(screendist, self.accthresh/1000.0, pixpercm) # in pixels per millisecond**2
+        quality.set_tracker_accuracy((calibresult['Ldeg'],calibresult['Ldeg']), (calibresult['Rdeg'],calibresult['Rdeg']))
+        left = quality.eye_quality('left')
+        right = quality.eye_quality('right')
+        self.accuracy = (left['accuracy_deg'], right['accuracy_deg'])
+        self.pxaccuracy = (left['accuracy'], right['accuracy'])
+        thresholds = quality.thresholds(self.fixtresh, self.spdtresh, \
+            self.accthresh, errdist=self.errdist)
+        self.pxerrdist = thresholds['pxerrdist']
+        self.pxfixtresh = thresholds['pxfixtresh']
+        self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecond
+        self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
 
         # calibration report
-        self.log("pygaze calibration report start")
-        self.log("accuracy (degrees): LX={}, LY={}, RX={}, RY={}".format(
-            self.accuracy[0][0], self.accuracy[0][1], self.accuracy[1][0], \
-            self.accuracy[1][1]))
-        self.log("accuracy (in pixels): LX={}, LY={}, RX={}, RY={}".format( \
-            self.pxaccuracy[0][0], self.pxaccuracy[0][1], \
-            self.pxaccuracy[1][0], self.pxaccuracy[1][1]))
-        self.log("precision (RMS noise in pixels): X={}, Y={}".format( \
-            self.pxdsttresh[0], self.pxdsttresh[1]))
-        self.log("distance between participant and display: {} cm".format( \
-            screendist))
-        self.log("fixation threshold: {} pixels".format(self.pxfixtresh))
-        self.log("speed threshold: {} pixels/ms".format(self.pxspdtresh))
-        self.log("acceleration threshold: {} pixels/ms**2".format( \
-            self.pxacctresh))
-        self.log("pygaze calibration report end")
+        self.calibration_report = quality.report(thresholds=thresholds, \
+            precision=self.pxdsttresh)
+        for line in quality.report_lines(self.calibration_report):
+            self.log(line)
 
         return True
 
@@ -398,6 +373,9 @@ class EyeTribeTracker(BaseEyeTracker):
         Nothing    -- saves data and sets self.connected to False
         """
 
+        # forward all queued messages
+        self.flush_messages()
+
         # close connection
         self.eyetribe.close()
         self.connected = False        
@@ -502,10 +480,11 @@ class EyeTribeTracker(BaseEyeTracker):
                        average deviation is calculated (default = 10)
         max_dev        -- maximal deviation from fixation in pixels
                        (default = 60)
-        reset_threshold    -- if the horizontal or vertical distance in
-                       pixels between two consecutive samples is
-                       larger than this threshold, the sample
-                       collection is reset (default = 30)
+        reset_threshold    -- if the horizontal or vertical dispersion
+                       (maximum minus minimum) in pixels of the
+                       newest min_samples samples is larger than
+                       this threshold, they do not count as a
+                       fixation (default = 30)
         
         returns
         checked        -- Boolaan indicating if drift check is ok (True)
@@ -517,42 +496,15 @@ class EyeTribeTracker(BaseEyeTracker):
         if pos == None:
             pos = self.dispsize[0] / 2, self.dispsize[1] / 2
 
-        # loop until we have sufficient samples
-        lx = []
-        ly = []
-        while len(lx) < min_samples:
-
-            # pressing escape enters the calibration screen
-            if self.kb.get_key()[0] in ['escape','q']:
-                print("libeyetribe.EyeTribeTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
-                return self.calibrate()
-
-            # collect a sample
-            x, y = self.sample()
-
-            if len(lx) == 0 or x != lx[-1] or y != ly[-1]:
-
-                # if present sample deviates too much from previous sample, reset counting
-                if len(lx) > 0 and (abs(x - lx[-1]) > reset_threshold or abs(y - ly[-1]) > reset_threshold):
-                    lx = []
-                    ly = []
-
-                # collect samples
-                else:
-                    lx.append(x)
-                    ly.append(y)
-
-            if len(lx) == min_samples:
-
-                avg_x = sum(lx) / len(lx)
-                avg_y = sum(ly) / len(ly)
-                d = ((avg_x - pos[0]) ** 2 + (avg_y - pos[1]) ** 2)**0.5
+        # wait until gaze rests on the target; pressing escape enters the
+        # calibration screen
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            reset_threshold)
+        if resp in ['escape','q']:
+            print("libeyetribe.EyeTribeTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate()
 
-                if d < max_dev:
-                    return True
-                else:
-                    lx = []
-                    ly = []            
+        return True
 
     def get_eyetracker_clock_async(self):
 
@@ -687,6 +639,7 @@ class EyeTribeTracker(BaseEyeTracker):
                    successfully started
         """
 
+        self.flush_messages()
         self.eyetribe.stop_recording()
         self.recording = False
     
@@ -24,6 +24,7 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.calibrationquality import CalibrationQuality
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -46,40 +47,6 @@ except ImportError:  # Python 2 fallback
 from pygaze._eyetracker.opengaze import OpenGazeTracker as OpenGaze
 
 
-def deg2pix(cmdist, angle, pixpercm):
-
-    """Returns the value in pixels for given values (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    pixelsize    -- stimulus size in pixels
-    """
-
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
-
-def pix2deg(cmdist, pixelsize, pixpercm):
-
-    """Converts a distance on the screen in pixels into degrees of visual
-    angle (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    pixelsize    -- stimulus size in pixels
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    angle        -- size of stimulus in visual angle
-    """
-    
-    cmsize = float(pixelsize) / pixpercm
-    return 2 * cmdist * math.tan(math.radians(cmsize) / 2.0)
-
-
 class OpenGazeTracker(BaseEyeTracker):
 
     """A class for OpenGazeTracker objects"""
@@ -472,80 +439,46 @@ class OpenGazeTracker(BaseEyeTracker):
             return False
 
         # NOISE CALIBRATION
+        # store some variables
+        pixpercm = (self.dispsize[0] / float(self.screensize[0]) + \
+            self.dispsize[1]/float(self.screensize[1])) / 2
+        screendist = settings.SCREENDIST
         # Get all error estimates (distance between the real and the
-        # estimated points in pixels).
-        err = {'LX':[], 'LY':[], 'RX':[], 'RY':[]}
-        var = {'LX':[], 'LY':[], 'RX':[], 'RY':[]}
+        # estimated points in pixels). Only use the point if it was valid.
+        quality = CalibrationQuality(screendist, pixpercm)
         for p in calibresult:
-            # Only use the point if it was valid.
+            estimates = {}
             for eye in ['L', 'R']:
-                for dim in ['X', 'Y']:
-                    if p['{}V'.format(eye)]:
-                        # Compute the distance between the points.
-                        d = p['{}{}'.format(eye, dim)] - \
-                            p['CAL{}'.format(dim)]
-                        # Store the distance.
-                        err['{}{}'.format(eye, dim)].append(abs(d))
-                        # Store the squared distance.
-                        var['{}{}'.format(eye, dim)].append(d**2)
+                if p['{}V'.format(eye)]:
+                    estimates[eye] = [(p['{}X'.format(eye)], \
+                        p['{}Y'.format(eye)])]
+                else:
+                    estimates[eye] = [None]
+            quality.add_point((p['CALX'], p['CALY']), left=estimates['L'], \
+                right=estimates['R'])
         # Compute the RMS noise for the calibration points, while taking into
         # account that in monocular tracking we only have data from one eye.
-        xnoise = []
-        ynoise = []
-        if var['LX'] and var['LY']:
-            xnoise.append(math.sqrt(mean(var['LX'])))
-            ynoise.append(math.sqrt(mean(var['LY'])))
-        if var['RX'] and var['RY']:
-            xnoise.append(math.sqrt(mean(var['RX'])))
-            ynoise.append(math.sqrt(mean(var['RY'])))
-        xnoise = mean(xnoise)
-        ynoise = mean(ynoise)
-        self.pxdsttresh = (xnoise, ynoise)
+        self.pxdsttresh = quality.precision(default=(60.0, 90.0))
                 
         # AFTERMATH
-        # store some variables
-        pixpercm = (self.dispsize[0] / float(self.screensize[0]) + \
-            self.dispsize[1]/float(self.screensize[1])) / 2
-        screendist = settings.SCREENDIST
         # calculate thresholds based on tracker settings
-        self.accuracy = []
-        self.pxaccuracy = []
-        if err['LX'] and err['LY']:
-            self.accuracy.append([
-                (pix2deg(screendist, mean(err['LX']), pixpercm)),
-                (pix2deg(screendist, mean(err['LY']), pixpercm))])
-            self.pxaccuracy.append([mean(err['LX']), mean(err['LY'])])
-        else:  # no data for left eye
-            self.accuracy.append([0, 0])
-            self.pxaccuracy.append([0, 0])
-        if err['RX'] and err['RY']:
-            self.accuracy.append([
-                (pix2deg(screendist, mean(err['RX']), pixpercm)),
-                (pix2deg(screendist, mean(err['RY']), pixpercm))])
-            self.pxaccuracy.append([mean(err['RX']), mean(err['RY'])])
-        else:  # no data for right eye
-            self.accuracy.append([0, 0])
-            self.pxaccuracy.append([0, 0])
-        self.pxerrdist = deg2pix(screendist, self.errdist, pixpercm)
-        self.pxfixtresh = deg2pix(screendist, self.fixtresh, pixpercm)
-        self.pxspdtresh = deg2pix(screendist, self.spdtresh/1000.0, pixpercm) # in pixels per millisecond
-        self.pxacctresh = deg2pix(screendist, self.accthresh/1000.0, pixpercm) # in pixels per millisecond**2
+        left = quality.eye_quality('left')
+        right = quality.eye_quality('right')
+        self.accuracy = [list(left['accuracy_deg']), \
+            list(right['accuracy_deg'])]
+        self.pxaccuracy = [list(left['accuracy']), list(right['accuracy'])]
+        thresholds = quality.thresholds(self.fixtresh, self.spdtresh, \
+            self.accthresh, errdist=self.errdist)
+        self.pxerrdist = thresholds['pxerrdist']
+        self.pxfixtresh = thresholds['pxfixtresh']
+        self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecond
+        self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
 
         # calibration report
-        self._elog("pygaze calibration report start")
-        self._elog("accuracy (degrees): LX={}, LY={}, RX={}, RY={}".format( \
-            self.accuracy[0][0], self.accuracy[0][1], \
-            self.accuracy[1][0], self.accuracy[1][1]))
-        self._elog("accuracy (in pixels): LX={}, LY={}, RX={}, RY={}".format( \
-            self.pxaccuracy[0][0], self.pxaccuracy[0][1], \
-            self.pxaccuracy[1][0], self.pxaccuracy[1][1]))
-        self._elog("precision (RMS noise in pixels): X={}, Y={}".format( \
-            self.pxdsttresh[0],self.pxdsttresh[1]))
-        self._elog("distance between participant and display: {} cm".format(screendist))
-        self._elog("fixation threshold: {} pixels".format(self.pxfixtresh))
-        self._elog("speed threshold: {} pixels/ms".format(self.pxspdtresh))
-        self._elog("acceleration threshold: {} pixels/ms**2".format(self.pxacctresh))
-        self._elog("pygaze calibration report end")
+        self.calibration_report = quality.report(thresholds=thresholds, \
+            precision=self.pxdsttresh)
+        for line in quality.report_lines(self.calibration_report):
+            self._elog(line)
 
         return True
 
@@ -561,6 +494,9 @@ class OpenGazeTracker(BaseEyeTracker):
         Nothing    -- saves data and sets self.connected to False
         """
 
+        # Forward all queued messages.
+        self.flush_messages()
+
         # Close additional log file.
         self.extralogfile.close()
 
@@ -684,38 +620,22 @@ class OpenGazeTracker(BaseEyeTracker):
 
         self.draw_drift_correction_target(pos[0], pos[1])
         
-        t0 = clock.get_time()
-        consecutive_count = 0
-        while consecutive_count < min_samples:
+        # Wait until gaze rests on the target. The samples in the window
+        # should all be close to each other, and their average should be
+        # close to the target.
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            max_dev, timeout=timeout, keylist=['escape', 'q'])
 
-            # Get new sample.
-            x, y = self.sample()
+        # Check for a timeout.
+        if resp == "timeout":
+            print("libopengaze.OpenGazeTracker.fix_triggered_drift_correction: timeout during fixation-triggered drift check")
+            return self.calibrate()
 
-            # Ignore empty samples.
-            if (x is None) or (y is None):
-                continue
+        # Pressing escape enters the calibration screen.
+        elif resp in ["Escape", "escape", "q"]:
+            print("libopengaze.OpenGazeTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate()
 
-            # Measure the distance to the target position.
-            d = ((x-pos[0])**2 + (y-pos[1])**2)**0.5
-            # Check whether the distance is below the allowed distance.
-            if d <= max_dev:
-                # Increment count.
-                consecutive_count += 1
-            else:
-                # Reset count.
-                consecutive_count = 0
-            
-            # Check for a timeout.
-            if clock.get_time() - t0 > timeout:
-                print("libopengaze.OpenGazeTracker.fix_triggered_drift_correction: timeout during fixation-triggered drift check")
-                return self.calibrate()
-                
-
-            # Pressing escape enters the calibration screen.
-            if self.kb.get_key()[0] in ['escape','q']:
-                print("libopengaze.OpenGazeTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
-                return self.calibrate()
-        
         return True
 
 
@@ -849,6 +769,7 @@ class OpenGazeTracker(BaseEyeTracker):
                    successfully started
         """
 
+        self.flush_messages()
         self.opengaze.stop_recording()
         self.recording = False
     
@@ -28,6 +28,7 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.calibrationquality import CalibrationQuality
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -101,24 +102,6 @@ def errorstring(returncode):
         return codes['unknown']
 
 
-def deg2pix(cmdist, angle, pixpercm):
-
-    """Returns the value in pixels for given values (internal use)
-
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-
-    returns
-    pixelsize    -- stimulus size in pixels (calculation based on size in
-               visual angle on display with given properties)
-    """
-
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
-
-
 # class
 class SMItracker(BaseEyeTracker):
 
@@ -334,15 +317,6 @@ class SMItracker(BaseEyeTracker):
                     s = self.sample() # sample
                     if s != sl[-1] and s != (-1,-1) and s != (0,0):
                         sl.append(s)
-                # calculate RMS noise
-                Xvar = []
-                Yvar = []
-                for i in range(2,len(sl)):
-                    Xvar.append((sl[i][0]-sl[i-1][0])**2)
-                    Yvar.append((sl[i][1]-sl[i-1][1])**2)
-                XRMS = (sum(Xvar) / len(Xvar))**0.5
-                YRMS = (sum(Yvar) / len(Yvar))**0.5
-                self.pxdsttresh = (XRMS, YRMS)
 
                 # calculate pixels per cm
                 pixpercm = (self.dispsize[0]/float(self.screensize[0]) + self.dispsize[1]/float(self.screensize[1])) / 2
@@ -372,28 +346,25 @@ class SMItracker(BaseEyeTracker):
                     print("WARNING libsmi.SMItracker.calibrate: failed to obtain screen distance; {}".format(err))
                     screendist = settings.SCREENDIST
                     print("libsmi.SMItracker.calibrate: As an estimate, the screendistance was set to it's default value of 57 cm")
+                # calibration quality: the accuracy is computed by the
+                # tracker, and the RMS noise from the samples (the first
+                # sample is ignored)
+                quality = CalibrationQuality(screendist, pixpercm)
+                quality.set_tracker_accuracy(self.accuracy[0], self.accuracy[1])
+                quality.add_noise(sl[1:])
+                self.pxdsttresh = quality.precision(default=(60.0, 90.0))
                 # calculate thresholds based on tracker settings
-                self.pxerrdist = deg2pix(screendist, self.errdist, pixpercm)
-                self.pxfixtresh = deg2pix(screendist, self.fixtresh, pixpercm)
-                self.pxaccuracy = ((deg2pix(screendist, self.accuracy[0][0], pixpercm),deg2pix(screendist, self.accuracy[0][1], pixpercm)), (deg2pix(screendist, self.accuracy[1][0], pixpercm),deg2pix(screendist, self.accuracy[1][1], pixpercm)))
-                self.pxspdtresh = deg2pix(screendist, self.spdtresh/1000.0, pixpercm) # in pixels per millisecond
-                self.pxacctresh = deg2pix(screendist, self.accthresh/1000.0, pixpercm) # in pixels per millisecond**2
+                thresholds = quality.thresholds(self.fixtresh, self.spdtresh, self.accthresh, errdist=self.errdist)
+                self.pxerrdist = thresholds['pxerrdist']
+                self.pxfixtresh = thresholds['pxfixtresh']
+                self.pxaccuracy = (quality.eye_quality('left')['accuracy'], quality.eye_quality('right')['accuracy'])
+                self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecond
+                self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
 
                 # calibration report
-                self.log("pygaze calibration report start")
-                self.log("accuracy (degrees): LX={}, LY={}, RX={}, RY={}".format( \
-                    self.accuracy[0][0], self.accuracy[0][1], \
-                    self.accuracy[1][0], self.accuracy[1][1]))
-                self.log("accuracy (in pixels): LX={}, LY={}, RX={}, RY={}".format( \
-                    self.pxaccuracy[0][0], self.pxaccuracy[0][1], \
-                    self.pxaccuracy[1][0], self.pxaccuracy[1][1]))
-                self.log("precision (RMS noise in pixels): X={}, Y={}".format( \
-                    self.pxdsttresh[0], self.pxdsttresh[1]))
-                self.log("distance between participant and display: {} cm".format(screendist))
-                self.log("fixation threshold: {} pixels".format(self.pxfixtresh))
-                self.log("speed threshold: {} pixels/ms".format(self.pxspdtresh))
-                self.log("acceleration threshold: {} pixels/ms**2".format(self.pxacctresh))
-                self.log("pygaze calibration report end")
+                self.calibration_report = quality.report(thresholds=thresholds, precision=self.pxdsttresh)
+                for line in quality.report_lines(self.calibration_report):
+                    self.log(line)
 
                 return True
 
@@ -419,6 +390,9 @@ class SMItracker(BaseEyeTracker):
         Nothing    -- saves data and sets self.connected to False
         """
 
+        # forward all queued messages
+        self.flush_messages()
+
         # save data
         res = iViewXAPI.iV_SaveData(str(self.outputfile), str(self.description), str(self.participant), 1)
         if res != 1:
@@ -509,10 +483,11 @@ class SMItracker(BaseEyeTracker):
                        average deviation is calculated (default = 10)
         max_dev        -- maximal deviation from fixation in pixels
                        (default = 60)
-        reset_threshold    -- if the horizontal or vertical distance in
-                       pixels between two consecutive samples is
-                       larger than this threshold, the sample
-                       collection is reset (default = 30)
+        reset_threshold    -- if the horizontal or vertical dispersion
+                       (maximum minus minimum) in pixels of the
+                       newest min_samples samples is larger than
+                       this threshold, they do not count as a
+                       fixation (default = 30)
 
         returns
         checked        -- Boolaan indicating if drift check is ok (True)
@@ -523,42 +498,15 @@ class SMItracker(BaseEyeTracker):
         if pos == None:
             pos = self.dispsize[0] / 2, self.dispsize[1] / 2
 
-        # loop until we have sufficient samples
-        lx = []
-        ly = []
-        while len(lx) < min_samples:
-
-            # pressing escape enters the calibration screen
-            if self.kb.get_key()[0] in ['escape','q']:
-                print("libsmi.SMItracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
-                return self.calibrate(calibrate=True, validate=True)
+        # wait until gaze rests on the target; pressing escape enters the
+        # calibration screen
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            reset_threshold)
+        if resp in ['escape','q']:
+            print("libsmi.SMItracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate(calibrate=True, validate=True)
 
-            # collect a sample
-            x, y = self.sample()
-
-            if len(lx) == 0 or x != lx[-1] or y != ly[-1]:
-
-                # if present sample deviates too much from previous sample, reset counting
-                if len(lx) > 0 and (abs(x - lx[-1]) > reset_threshold or abs(y - ly[-1]) > reset_threshold):
-                    lx = []
-                    ly = []
-
-                # collect samples
-                else:
-                    lx.append(x)
-                    ly.append(y)
-
-            if len(lx) == min_samples:
-
-                avg_x = sum(lx) / len(lx)
-                avg_y = sum(ly) / len(ly)
-                d = ((avg_x - pos[0]) ** 2 + (avg_y - pos[1]) ** 2)**0.5
-
-                if d < max_dev:
-                    return True
-                else:
-                    lx = []
-                    ly = []
+        return True
 
     def get_eyetracker_clock_async(self):
 
@@ -776,6 +724,7 @@ class SMItracker(BaseEyeTracker):
                    successfully started
         """
 
+        self.flush_messages()
         res = 0; i = 0
         while res != 1 and i < self.maxtries:
             res = iViewXAPI.iV_StopRecording()
@@ -6,18 +6,24 @@ import time
 import os
 import math
 import copy
+import numpy
 import tobii_research as tr
 
 from pygaze import settings
 from pygaze.screen import Screen
 from pygaze.keyboard import Keyboard
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.calibrationquality import CalibrationQuality, deg2pix
 from pygaze.libtime import clock
 
 
 class TobiiProTracker(BaseEyeTracker):
     """A class for Tobii Pro EyeTracker objects"""
 
+    # messages are written to the data file, so there is no need to wait
+    # between them
+    message_interval = 0
+
     def __init__(self, display, logfile=settings.LOGFILE,
                  eventdetection=settings.EVENTDETECTION,
                  saccade_velocity_threshold=35,
@@ -98,7 +104,7 @@ class TobiiProTracker(BaseEyeTracker):
         self.pixpercm = (self.disp.dispsize[0] / float(self.screensize[0]) +
                          self.disp.dispsize[1] / float(self.screensize[1])) / 2.0
         self.errdist = 2  # degrees; maximal error for drift correction
-        self.pxerrdist = self._deg2pix(self.screendist, self.errdist, self.pixpercm)
+        self.pxerrdist = deg2pix(self.screendist, self.errdist, self.pixpercm)
 
         self.event_data = []
 
@@ -133,9 +139,6 @@ class TobiiProTracker(BaseEyeTracker):
             a = [s for s in array if s is not None]
             return sum(a) / float(len(a))
 
-    def _deg2pix(self, cmdist, angle, pixpercm):
-        return pixpercm * math.tan(math.radians(angle)) * float(cmdist)
-
     def log_var(self, var, val):
         """Writes a variable to the log file
 
@@ -218,6 +221,7 @@ class TobiiProTracker(BaseEyeTracker):
         Nothing	-- sets self.recording to False when recording is
                    successfully started
         """
+        self.flush_messages()
         if self.recording:
             self.eyetracker.unsubscribe_from(tr.EYETRACKER_GAZE_DATA)
             self.recording = False
@@ -489,8 +493,8 @@ class TobiiProTracker(BaseEyeTracker):
             # # # # # #
             # # validation
 
-            # # # arrays for data storage
-            lxacc, lyacc, rxacc, ryacc = [], [], [], []
+            # # # calibration quality
+            quality = CalibrationQuality(self.screendist, self.pixpercm)
 
             # # loop through all calibration positions
             for pos in self.points_to_calibrate:
@@ -503,40 +507,30 @@ class TobiiProTracker(BaseEyeTracker):
                 # allow user some time to gaze at dot
                 clock.pause(1000)
 
-                lxsamples, lysamples, rxsamples, rysamples = [], [], [], []
-                for sample in self.gaze:
+                # collect samples for a bit (this also slows down the
+                # validation process a bit)
+                n0 = len(self.gaze)
+                clock.pause(1000)
+                lsamples, rsamples = [], []
+                for sample in self.gaze[n0:]:
                     if sample["left_gaze_point_validity"]:
-                        gaze_point = self._norm_2_px(sample["left_gaze_point_on_display_area"])
-                        lxsamples.append(abs(gaze_point[0] - pos[0]))
-                        lysamples.append(abs(gaze_point[1] - pos[1]))
+                        lsamples.append(self._norm_2_px(sample["left_gaze_point_on_display_area"]))
+                    else:
+                        lsamples.append(None)
                     if sample["right_gaze_point_validity"]:
-                        gaze_point = self._norm_2_px(sample["right_gaze_point_on_display_area"])
-                        rxsamples.append(abs(gaze_point[0] - pos[0]))
-                        rysamples.append(abs(gaze_point[1] - pos[1]))
-
-                # calculate mean deviation
-                lxacc.append(self._mean(lxsamples))
-                lyacc.append(self._mean(lysamples))
-                rxacc.append(self._mean(rxsamples))
-                ryacc.append(self._mean(rysamples))
-
-                # wait for a bit to slow down validation process a bit
-                clock.pause(1000)
+                        rsamples.append(self._norm_2_px(sample["right_gaze_point_on_display_area"]))
+                    else:
+                        rsamples.append(None)
+                quality.add_point(pos, left=lsamples, right=rsamples)
 
             # calculate mean accuracy
-            self.pxaccuracy = [(self._mean(lxacc), self._mean(lyacc)), (self._mean(rxacc), self._mean(ryacc))]
+            self.pxaccuracy = [quality.eye_quality('left')['accuracy'],
+                               quality.eye_quality('right')['accuracy']]
 
             # sample rate
-            # calculate intersample times
-            timestamps = []
-            gaze_samples = copy.copy(self.gaze)
-            for i in range(0, len(gaze_samples) - 1):
-                next_sample = gaze_samples[i + 1]['system_time_stamp']
-                current_sample = gaze_samples[i]['system_time_stamp']
-                timestamps.append((next_sample - current_sample) / 1000.0)
-
             # mean intersample time
-            self.sampletime = self._mean(timestamps)
+            timestamps = numpy.array([sample['system_time_stamp'] for sample in self.gaze])
+            self.sampletime = numpy.mean(numpy.diff(timestamps)) / 1000.0
             self.samplerate = int(1000.0 / self.sampletime)
 
             # # # # # #
@@ -574,51 +568,25 @@ class TobiiProTracker(BaseEyeTracker):
                 if s != sl[-1] and self.is_valid_sample(s) and s != (0, 0):
                     sl.append(s)
 
-            # # calculate RMS noise
-            Xvar, Yvar = [], []
-            for i in range(2, len(sl)):
-                Xvar.append((sl[i][0] - sl[i - 1][0])**2)
-                Yvar.append((sl[i][1] - sl[i - 1][1])**2)
-            if len(Xvar) == 0:
-                XRMS = 60.0
-            else:
-                XRMS = (self._mean(Xvar))**0.5
-            if len(Yvar) == 0:
-                YRMS = 90.0
-            else:
-                YRMS = (self._mean(Yvar))**0.5
-            self.pxdsttresh = (XRMS, YRMS)
+            # # calculate RMS noise (the first sample is ignored)
+            quality.add_noise(sl[1:])
+            self.pxdsttresh = quality.precision(default=(60.0, 90.0))
 
             # # # # # # #
             # # # calibration report
 
             # # # # recalculate thresholds (degrees to pixels)
-            self.pxfixtresh = self._deg2pix(self.screendist, self.fixtresh, self.pixpercm)
-            # in pixels per millisecons
-            self.pxspdtresh = self._deg2pix(self.screendist, self.spdtresh / 1000.0, self.pixpercm)
-            # in pixels per millisecond**2
-            self.pxacctresh = self._deg2pix(self.screendist, self.accthresh / 1000.0, self.pixpercm)
-
-            data_to_write = ''
-            data_to_write += "pygaze calibration report start\n"
-            data_to_write += "samplerate: {} Hz\n".format(self.samplerate)
-            data_to_write += "sampletime: {} ms\n".format(self.sampletime)
-            data_to_write += "accuracy (in pixels): LX={}, LY={}, RX={}, RY={}\n".format( \
-                self.pxaccuracy[0][0],
-                self.pxaccuracy[0][1],
-                self.pxaccuracy[1][0],
-                self.pxaccuracy[1][1])
-            data_to_write += "precision (RMS noise in pixels): X={}, Y={}\n".format( \
-                self.pxdsttresh[0], self.pxdsttresh[1])
-            data_to_write += "distance between participant and display: {} cm\n".format( \
-                self.screendist)
-            data_to_write += "fixation threshold: {} pixels\n".format( \
-                self.pxfixtresh)
-            data_to_write += "speed threshold: {} pixels/ms\n".format( \
-                self.pxspdtresh)
-            data_to_write += "accuracy threshold: {} pixels/ms**2\n".format( \
-                self.pxacctresh)
-            data_to_write += "pygaze calibration report end\n"
+            thresholds = quality.thresholds(self.fixtresh, self.spdtresh, self.accthresh)
+            self.pxfixtresh = thresholds['pxfixtresh']
+            self.pxspdtresh = thresholds['pxspdtresh']
+            self.pxacctresh = thresholds['pxacctresh']
+
+            self.calibration_report = quality.report(thresholds=thresholds,
+                                                     samplerate=self.samplerate,
+                                                     sampletime=self.sampletime,
+                                                     precision=self.pxdsttresh)
+            data_to_write = ''.join([line + '\n' for line in quality.report_lines(self.calibration_report,
+                                                                                 acclabel="accuracy")])
 
             # # # # write report to log
             self.datafile.write(data_to_write)
@@ -651,10 +619,11 @@ class TobiiProTracker(BaseEyeTracker):
                        average deviation is calculated (default = 10)
         max_dev		-- maximal deviation from fixation in pixels
                        (default = 60)
-        reset_threshold	-- if the horizontal or vertical distance in
-                       pixels between two consecutive samples is
-                       larger than this threshold, the sample
-                       collection is reset (default = 30)
+        reset_threshold	-- if the horizontal or vertical dispersion
+                       (maximum minus minimum) in pixels of the
+                       newest min_samples samples is larger than
+                       this threshold, they do not count as a
+                       fixation (default = 30)
 
         returns
         checked		-- Boolean indicating if drift check is ok (True)
@@ -671,46 +640,17 @@ class TobiiProTracker(BaseEyeTracker):
         else:
             stoprec = False
 
-        # loop until we have sufficient samples
-        lx = []
-        ly = []
-        while len(lx) < min_samples:
-
-            # pressing escape enters the calibration screen
-            if self.kb.get_key()[0] in ['escape', 'q']:
-                print("libtobii.TobiiTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
-                return self.calibrate(calibrate=True, validate=True)
-
-            # collect a sample
-            x, y = self.sample()
-
-            if len(lx) == 0 or (x, y) != (lx[-1], ly[-1]):
-
-                # if present sample deviates too much from previous sample, reset counting
-                if len(lx) > 0 and (abs(x - lx[-1]) > reset_threshold or abs(y - ly[-1]) > reset_threshold):
-                    lx = []
-                    ly = []
+        # wait until gaze rests on the target; pressing escape enters the
+        # calibration screen
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            reset_threshold)
+        if resp in ['escape', 'q']:
+            print("libtobii.TobiiTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate(calibrate=True, validate=True)
 
-                # collect samples
-                else:
-                    lx.append(x)
-                    ly.append(y)
-
-            if len(lx) == min_samples:
-
-                avg_x = self._mean(lx)
-                avg_y = self._mean(ly)
-                d = ((avg_x - pos[0]) ** 2 + (avg_y - pos[1]) ** 2)**0.5
-
-                if d < max_dev:
-                    if stoprec:
-                        self.stop_recording()
-                    return True
-                else:
-                    lx = []
-                    ly = []
         if stoprec:
             self.stop_recording()
+        return True
 
     def drift_correction(self, pos=None, fix_triggered=False):
         """Performs a drift check
@@ -1149,12 +1089,31 @@ class TobiiProTracker(BaseEyeTracker):
         Nothing	-- uses native log function to include a line
                    in the log file
         """
+        self._write_messages([(tr.get_system_time_stamp(), msg)])
+
+    def _send_messages(self, batch):
+        """See pygaze._eyetracker.baseeyetracker.BaseEyeTracker"""
+        # all queued messages are written at once, with the tracker time
+        # at which they were queued
         t = tr.get_system_time_stamp()
+        now = clock.get_time()
+        self._write_messages([(t - (now - tcall) * 1000, msg) for tcall, msg in batch])
+
+    def _write_messages(self, messages):
+        """Writes messages to the data file
+
+        arguments
+        messages	-- a list of (tracker time, message) tuples
+
+        returns
+        Nothing	-- writes all messages to the data file at once
+        """
         if not self.t0:
-            self.t0 = t
+            self.t0 = messages[0][0]
             self._write_header()
 
-        self.datafile.write("{}\t{}\n".format(round((t - self.t0) / 1000.0, ndigits=4), msg))
+        self.datafile.write("".join(["{}\t{}\n".format(round((t - self.t0) / 1000.0, ndigits=4), msg)
+                                     for t, msg in messages]))
 
     def _flush_to_file(self):
         # write data to disk
@@ -1230,4 +1189,5 @@ class TobiiProTracker(BaseEyeTracker):
         returns
         None		--	closes the log file.
         """
+        self.flush_messages()
         self.datafile.close()
@@ -34,6 +34,7 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.samplequeue import SampleQueue
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -67,6 +68,21 @@ warnings.filterwarnings("ignore", category=numpy.VisibleDeprecationWarning)
 
 from tobiiglasses.tobiiglassescontroller import TobiiGlassesController
 
+# Data streams that can be logged, for each of the keys that can be passed to
+# TobiiGlassesTracker.start_logging: (packet key, eye, number of values)
+LOG_STREAMS = {
+    "mems": [("ac", None, 3), ("gy", None, 3)],
+    "gp": [("gp", None, 2)],
+    "gp3": [("gp3", None, 3)],
+    "left_eye": [("pc", "left", 3), ("pd", "left", 1), ("gd", "left", 3)],
+    "right_eye": [("pc", "right", 3), ("pd", "right", 1), ("gd", "right", 3)],
+    }
+
+# Packets from different streams with the same timestamp are merged into a
+# single log row. As packets can arrive slightly out of order, rows are only
+# written once a packet comes in that is this much newer (in microseconds).
+LOG_MERGE_WINDOW = 50000
+
 
 
 # # # # #
@@ -155,111 +171,33 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
         self.close()
 
-    def __get_log_row__(self, keys, triggers):
-
-        row = ""
-        ac = [None, None, None]
-        gy = [None, None, None]
-        if "mems" in keys:
-
-            try:
-                for i in range(0,3):
-                    ac[i] = self.tobiiglasses.data['mems']['ac']['ac'][i]
-            except:
-                pass
-
-            try:
-                for i in range(0,3):
-                    gy[i] = self.tobiiglasses.data['mems']['gy']['gy'][i]
-            except:
-                pass
-
-            row += ("{}; {}; {}; {}; {}; {}; ".format(ac[0], ac[1], ac[2], gy[0], gy[1], gy[2]))
-
-
-        gp = [None, None]
-        if "gp" in keys:
-
-            try:
-                for i in range(0,2):
-                    gp[i] = self.tobiiglasses.data['gp']['gp'][i]
-            except:
-                pass
-
-            row += ("{}; {}; ".format(gp[0], gp[1]))
-
-
-        gp3 = [None, None, None]
-        if "gp3" in keys:
-
-            try:
-                for i in range(0,3):
-                    gp3[i] = self.tobiiglasses.data['gp3']['gp3'][i]
-            except:
-                pass
-
-            row += ("{}; {}; {}; ".format(gp3[0], gp3[1], gp3[2]))
-
-
-        pc = [None, None, None]
-        pd = None
-        gd = [None, None, None]
-        if "left_eye" in keys:
-
-            try:
-                for i in range(0,3):
-                    pc[i] = self.tobiiglasses.data['left_eye']['pc']['pc'][i]
-            except:
-                pass
-
-            try:
-                pd = self.tobiiglasses.data['left_eye']['pd']['pd']
-            except:
-                pass
+    def __get_log_columns__(self, keys):
 
-            try:
-                for i in range(0,3):
-                    gd[i] = self.tobiiglasses.data['left_eye']['gd']['gd'][i]
-            except:
-                pass
+        # Find where the values of each logged stream go in a row.
+        columns = {}
+        ncols = 0
+        for key in ["mems", "gp", "gp3", "left_eye", "right_eye"]:
+            if key in keys:
+                for name, eye, n in LOG_STREAMS[key]:
+                    columns[(name, eye)] = (ncols, n)
+                    ncols += n
 
+        return columns, ncols
 
-            row += ("{}; {}; {}; {}; {}; {}; {}; ".format(pc[0], pc[1], pc[2], pd, gd[0], gd[1], gd[2]))
+    def __get_log_row__(self, ts, values, triggers):
 
-        pc = [None, None, None]
-        pd = None
-        gd = [None, None, None]
-        if "right_eye" in keys:
-
-            try:
-                for i in range(0,3):
-                    pc[i] = self.tobiiglasses.data['right_eye']['pc']['pc'][i]
-            except:
-                pass
-
-            try:
-                pd = self.tobiiglasses.data['right_eye']['pd']['pd']
-            except:
-                pass
-
-            try:
-                for i in range(0,3):
-                    gd[i] = self.tobiiglasses.data['right_eye']['gd']['gd'][i]
-            except:
-                pass
-
-            row += ("{}; {}; {}; {}; {}; {}; {}; ".format(pc[0], pc[1], pc[2], pd, gd[0], gd[1], gd[2]))
-
-        if len(triggers) > 0:
-            for trigger in triggers:
-                row += ("{}; ".format(self.triggers_values[trigger]))
+        row = "{}; ".format(ts)
+        for value in values:
+            row += "{}; ".format(value)
+        for value in triggers:
+            row += "{}; ".format(value)
 
         row = row[:-2]
         return row
 
     def __get_log_header__(self, keys, triggers):
 
-        header = "ts; "
+        header = "ts [us]; "
 
         if "mems" in keys:
             header+="ac_x [m/s^2]; ac_y [m/s^2]; ac_z [m/s^2]; gy_x [°/s]; gy_y [°/s]; gy_z [°/s]; "
@@ -269,7 +207,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
             header+="gp3_x [mm]; gp3_y [mm]; gp3_z [mm]; "
         if "left_eye" in keys:
             header+="left_pc_x [mm]; left_pc_y [mm]; left_pc_z [mm]; left_pd [mm]; left_gd_x; left_gd_y; left_gd_z; "
-        if "left_eye" in keys:
+        if "right_eye" in keys:
             header+="right_pc_x [mm]; right_pc_y [mm]; right_pc_z [mm]; right_pd [mm]; right_gd_x; right_gd_y; right_gd_z; "
 
         if len(triggers) > 0:
@@ -282,20 +220,59 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
 
 
-    def __data_logger__(self, logfile, frequency, keys, triggers, time_offset):
+    def __data_logger__(self, logfile, keys, triggers, packets):
+
+        columns, ncols = self.__get_log_columns__(keys)
 
         with open(logfile, 'a') as f:
 
             header = self.__get_log_header__(keys, triggers)
             f.write(header + "\n")
 
-            while self.logging:
-
-                row = self.__get_log_row__(keys, triggers)
-                f.write("{}; {} \n".format(time_offset, row))
-                time_period = float(1.0/float(frequency))
-                time_offset += int(time_period*1000)
-                time.sleep(time_period)
+            # Rows that may still receive packets, by device timestamp.
+            # Each row is a list of values and a list of trigger values,
+            # which are taken when the first packet of a row comes in.
+            pending = {}
+            newest = None
+            running = True
+            while running:
+
+                # Stop after the final batch, which is taken after the
+                # controller stopped passing on packets.
+                running = self.logging
+                batch = packets.get_batch(timeout=0.1)
+
+                # Put the values of every packet in its row.
+                for packet in batch:
+                    if packet.get('s', 1) != 0 or 'ts' not in packet:
+                        continue
+                    for name in packet:
+                        if (name, packet.get('eye')) in columns:
+                            break
+                    else:
+                        continue
+                    offset, n = columns[(name, packet.get('eye'))]
+                    ts = packet['ts']
+                    if ts not in pending:
+                        pending[ts] = ([None] * ncols, \
+                            [self.triggers_values[trigger] for trigger in triggers])
+                    if n == 1:
+                        pending[ts][0][offset] = packet[name]
+                    else:
+                        pending[ts][0][offset:offset+n] = packet[name][:n]
+                    if newest is None or ts > newest:
+                        newest = ts
+
+                # Write all rows that are complete, in order of their
+                # timestamps (or all rows, when we're stopping).
+                lines = []
+                for ts in sorted(pending.keys()):
+                    if running and ts > newest - LOG_MERGE_WINDOW:
+                        break
+                    values, trigger_values = pending.pop(ts)
+                    lines.append(self.__get_log_row__(ts, values, trigger_values) + " \n")
+                if lines:
+                    f.write("".join(lines))
 
 
     def start_capturing(self):
@@ -373,10 +350,15 @@ class TobiiGlassesTracker(BaseEyeTracker):
         return calibration_id
 
 
-    def start_logging(self, logfile, frequency, keys = ["mems", "gp", "gp3", "left_eye", "right_eye"], triggers = [], time_offset=0):
+    def start_logging(self, logfile, frequency=None, keys = ["mems", "gp", "gp3", "left_eye", "right_eye"], triggers = [], time_offset=0):
 
+        # Every incoming packet is logged with its device timestamp, so
+        # frequency and time_offset are no longer used; they are only kept
+        # for backwards compatibility.
         if not self.logging:
-            self.logger = threading.Timer(0, self.__data_logger__, [logfile, frequency, keys, triggers, time_offset])
+            self.logger_packets = SampleQueue(name="Tobii Glasses packet")
+            self.tobiiglasses.add_packet_queue(self.logger_packets)
+            self.logger = threading.Timer(0, self.__data_logger__, [logfile, keys, triggers, self.logger_packets])
             self.logging = True
             self.logger.start()
             log.debug("Start logging selected data in file " + logfile + " ...")
@@ -397,6 +379,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
     def stop_logging(self):
 
         if self.logging:
+            self.tobiiglasses.remove_packet_queue(self.logger_packets)
             self.logging = False
             self.logger.join()
             log.debug("Stop logging!")
@@ -417,6 +400,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
         """
 
+        self.flush_messages()
         if self.logging:
             self.stop_logging()
 
@@ -692,6 +676,7 @@ class TobiiGlassesTracker(BaseEyeTracker):
 
         """
 
+        self.flush_messages()
         if self.current_recording_id is None:
             log.error("There is no recordings started!")
 
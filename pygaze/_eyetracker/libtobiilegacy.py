@@ -23,6 +23,10 @@
 # TobiiTracker
 import copy
 import math
+import time
+import heapq
+import itertools
+import collections
 import numpy
 
 from pygaze import settings
@@ -33,6 +37,8 @@ from pygaze.keyboard import Keyboard
 from pygaze.sound import Sound
 
 from pygaze._eyetracker.baseeyetracker import BaseEyeTracker
+from pygaze._eyetracker.samplequeue import SampleQueue
+from pygaze._eyetracker.calibrationquality import CalibrationQuality, deg2pix
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -51,6 +57,7 @@ from tobii.eye_tracking_io.basic import EyetrackerException
 
 import os
 import datetime
+from threading import Thread
 
 import tobii.eye_tracking_io.mainloop
 import tobii.eye_tracking_io.browsing
@@ -75,27 +82,6 @@ except:
         print("Failed to import PIL.")
 
 
-# # # # #
-# functions
-
-def deg2pix(cmdist, angle, pixpercm):
-
-    """Returns the value in pixels for given values (internal use)
-    
-    arguments
-    cmdist    -- distance to display in centimeters
-    angle        -- size of stimulus in visual angle
-    pixpercm    -- amount of pixels per centimeter for display
-    
-    returns
-    pixelsize    -- stimulus size in pixels (calculation based on size in
-               visual angle on display with given properties)
-    """
-
-    cmsize = math.tan(math.radians(angle)) * float(cmdist)
-    return cmsize * pixpercm
-
-
 # # # # #
 # classes
 
@@ -103,6 +89,10 @@ class TobiiTracker(BaseEyeTracker):
     
     """A class for Tobii EyeTracker objects"""
     
+    # messages are queued for the data file, so there is no need to wait
+    # between them
+    message_interval = 0
+    
     def __init__(self, display, logfile=settings.LOGFILE,
         eventdetection=settings.EVENTDETECTION, saccade_velocity_threshold=35,
         saccade_acceleration_threshold=9500, blink_threshold=settings.BLINKTHRESH, **args):
@@ -249,11 +239,8 @@ class TobiiTracker(BaseEyeTracker):
         # start recording
         self.start_recording()
         
-        # arrays for data storage
-        lxacc = numpy.zeros(len(calpos))
-        lyacc = numpy.zeros(len(calpos))
-        rxacc = numpy.zeros(len(calpos))
-        ryacc = numpy.zeros(len(calpos))
+        # calibration quality
+        quality = CalibrationQuality(self.screendist, self.pixpercm)
         
         # loop through all calibration positions
         for pos in calpos:
@@ -264,37 +251,30 @@ class TobiiTracker(BaseEyeTracker):
             self.screen.clear()
             # allow user some time to gaze at dot
             clock.pause(1000)
-            # collect samples
-            lxsamples = numpy.zeros(self.nvalsamples)
-            lysamples = numpy.zeros(self.nvalsamples)
-            rxsamples = numpy.zeros(self.nvalsamples)
-            rysamples = numpy.zeros(self.nvalsamples)
-            prevsample = ()
-            for i in range(0,self.nvalsamples):
-                # add new sample to list
-                newsample = self.controller.getCurrentGazePosition()
-                if newsample != prevsample and newsample != (None,None,None,None):
-                    lx, ly, rx, ry = newsample
-                    lxsamples[i] = lx
-                    lysamples[i] = ly
-                    rxsamples[i] = rx
-                    rysamples[i] = ry
-                    prevsample = newsample[:]
-            # calculate mean deviation
-            lxdev = numpy.mean(abs(lxsamples-pos[0]))
-            lydev = numpy.mean(abs(lysamples-pos[1]))
-            rxdev = numpy.mean(abs(rxsamples-pos[0]))
-            rydev = numpy.mean(abs(rysamples-pos[1]))
-            i = calpos.index(pos)
-            lxacc[i] = lxdev
-            lyacc[i] = lydev
-            rxacc[i] = rxdev
-            ryacc[i] = rydev
+            # collect new samples (at most self.nvalsamples, for at most a
+            # second); samples of an eye that was not detected are invalid
+            lsamples = []
+            rsamples = []
+            prevsample = None
+            t0 = clock.get_time()
+            while len(lsamples) < self.nvalsamples and clock.get_time() - t0 < 1000:
+                # wait a bit for a new sample, rather than keeping a core
+                # busy
+                if len(self.controller.gazeData) == 0 or \
+                    self.controller.gazeData[-1] is prevsample:
+                    time.sleep(0.001)
+                    continue
+                newsample = self.controller.gazeData[-1]
+                lx, ly, rx, ry = self.controller.getGazePosition(newsample)
+                lsamples.append((lx, ly) if newsample.LeftValidity != 4 else None)
+                rsamples.append((rx, ry) if newsample.RightValidity != 4 else None)
+                prevsample = newsample
+            quality.add_point(pos, left=lsamples, right=rsamples)
             # wait for a bit to slow down validation process a bit
             clock.pause(1000)
 
         # calculate mean accuracy
-        self.pxaccuracy = [(numpy.mean(lxacc), numpy.mean(lyacc)), (numpy.mean(rxacc), numpy.mean(ryacc))]
+        self.pxaccuracy = [quality.eye_quality('left')['accuracy'], quality.eye_quality('right')['accuracy']]
         
 
         # # # # #
@@ -327,25 +307,17 @@ class TobiiTracker(BaseEyeTracker):
             if s != sl[-1] and s != (-1,-1) and s != (0,0):
                 sl.append(s)
 
-        # calculate RMS noise
-        Xvar = []
-        Yvar = []
-        for i in range(2,len(sl)):
-            Xvar.append((sl[i][0]-sl[i-1][0])**2)
-            Yvar.append((sl[i][1]-sl[i-1][1])**2)
-        XRMS = (sum(Xvar) / len(Xvar))**0.5
-        YRMS = (sum(Yvar) / len(Yvar))**0.5
-        self.pxdsttresh = (XRMS, YRMS)
+        # calculate RMS noise (the first sample is ignored)
+        quality.add_noise(sl[1:])
+        self.pxdsttresh = quality.precision(default=(60.0, 90.0))
         
         
         # # # # #
         # sample rate
         
         # calculate intersample times
-        t0 = self.controller.gazeData[0].Timestamp
-        ist = numpy.zeros(len(self.controller.gazeData)-1)
-        for i in range(0,len(self.controller.gazeData)-1):
-            ist[i] = (self.controller.gazeData[i+1].Timestamp - self.controller.gazeData[i].Timestamp) / 1000.0
+        timestamps = numpy.array([gaze.Timestamp for gaze in self.controller.gazeData])
+        ist = numpy.diff(timestamps) / 1000.0
         
         # mean intersample time
         self.sampletime = numpy.mean(ist)
@@ -354,7 +326,7 @@ class TobiiTracker(BaseEyeTracker):
         # stop recording WITHOUT saving gaze data
         self.controller.eyetracker.StopTracking()
         self.controller.eyetracker.events.OnGazeDataReceived -= self.controller.on_gazedata
-        self.controller.gazeData = []
+        self.controller.gazeData.clear()
         self.controller.eventData = []
         self.recording = False
 
@@ -363,30 +335,18 @@ class TobiiTracker(BaseEyeTracker):
         # calibration report
 
         # recalculate thresholds (degrees to pixels)
-        self.pxfixtresh = deg2pix(self.screendist, self.fixtresh, self.pixpercm)
-        self.pxspdtresh = deg2pix(self.screendist, self.spdtresh/1000.0, self.pixpercm) # in pixels per millisecons
-        self.pxacctresh = deg2pix(self.screendist, self.accthresh/1000.0, self.pixpercm) # in pixels per millisecond**2
+        thresholds = quality.thresholds(self.fixtresh, self.spdtresh, self.accthresh)
+        self.pxfixtresh = thresholds['pxfixtresh']
+        self.pxspdtresh = thresholds['pxspdtresh'] # in pixels per millisecons
+        self.pxacctresh = thresholds['pxacctresh'] # in pixels per millisecond**2
         
         # write report to log
-        self.controller.datafile.write("pygaze calibration report start\n")
-        self.controller.datafile.write("samplerate: {} Hz\n".format( \
-            self.samplerate))
-        self.controller.datafile.write("sampletime: {} ms\n".format( \
-            self.sampletime))
-        self.controller.datafile.write("accuracy (in pixels): LX={}, LY={}, RX={}, RY={}\n".format( \
-            self.pxaccuracy[0][0], self.pxaccuracy[0][1], \
-            self.pxaccuracy[1][0], self.pxaccuracy[1][1]))
-        self.controller.datafile.write("precision (RMS noise in pixels): X={}, Y={}\n".format( \
-            self.pxdsttresh[0], self.pxdsttresh[1]))
-        self.controller.datafile.write("distance between participant and display: {} cm\n".format( \
-            self.screendist))
-        self.controller.datafile.write("fixation threshold: {} pixels\n".format( \
-            self.pxfixtresh))
-        self.controller.datafile.write("speed threshold: {} pixels/ms\n".format( \
-            self.pxspdtresh))
-        self.controller.datafile.write("accuracy threshold: {} pixels/ms**2\n".format( \
-            self.pxacctresh))
-        self.controller.datafile.write("pygaze calibration report end\n")
+        self.calibration_report = quality.report(thresholds=thresholds, \
+            samplerate=self.samplerate, sampletime=self.sampletime, \
+            precision=self.pxdsttresh)
+        for line in quality.report_lines(self.calibration_report, \
+            acclabel="accuracy"):
+            self.controller.datafile.write(line + "\n")
 
         return True
 
@@ -402,6 +362,9 @@ class TobiiTracker(BaseEyeTracker):
         None        --    saves data and sets self.connected to False
         """
 
+        # forward all queued messages
+        self.flush_messages()
+
         # stop tracking
         if self.recording:
             self.stop_recording()
@@ -480,7 +443,7 @@ class TobiiTracker(BaseEyeTracker):
         if stoprec:
             self.controller.eyetracker.StopTracking()
             self.controller.eyetracker.events.OnGazeDataReceived -= self.controller.on_gazedata
-            self.controller.gazeData = []
+            self.controller.gazeData.clear()
             self.controller.eventData = []
             self.recording = False
 
@@ -503,10 +466,11 @@ class TobiiTracker(BaseEyeTracker):
                        average deviation is calculated (default = 10)
         max_dev        -- maximal deviation from fixation in pixels
                        (default = 60)
-        reset_threshold    -- if the horizontal or vertical distance in
-                       pixels between two consecutive samples is
-                       larger than this threshold, the sample
-                       collection is reset (default = 30)
+        reset_threshold    -- if the horizontal or vertical dispersion
+                       (maximum minus minimum) in pixels of the
+                       newest min_samples samples is larger than
+                       this threshold, they do not count as a
+                       fixation (default = 30)
         
         returns
         checked        -- Boolaan indicating if drift check is ok (True)
@@ -517,42 +481,15 @@ class TobiiTracker(BaseEyeTracker):
         if pos == None:
             pos = self.dispsize[0] / 2, self.dispsize[1] / 2
 
-        # loop until we have sufficient samples
-        lx = []
-        ly = []
-        while len(lx) < min_samples:
-
-            # pressing escape enters the calibration screen
-            if self.kb.get_key()[0] in ['escape','q']:
-                print("libtobii.TobiiTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
-                return self.calibrate(calibrate=True, validate=True)
-
-            # collect a sample
-            x, y = self.sample()
-
-            if len(lx) == 0 or x != lx[-1] or y != ly[-1]:
-
-                # if present sample deviates too much from previous sample, reset counting
-                if len(lx) > 0 and (abs(x - lx[-1]) > reset_threshold or abs(y - ly[-1]) > reset_threshold):
-                    lx = []
-                    ly = []
-
-                # collect samples
-                else:
-                    lx.append(x)
-                    ly.append(y)
-
-            if len(lx) == min_samples:
+        # wait until gaze rests on the target; pressing escape enters the
+        # calibration screen
+        resp = self._wait_for_drift_fixation(pos, min_samples, max_dev,
+            reset_threshold)
+        if resp in ['escape','q']:
+            print("libtobii.TobiiTracker.fix_triggered_drift_correction: 'q' or 'escape' pressed")
+            return self.calibrate(calibrate=True, validate=True)
 
-                avg_x = sum(lx) / len(lx)
-                avg_y = sum(ly) / len(ly)
-                d = ((avg_x - pos[0]) ** 2 + (avg_y - pos[1]) ** 2)**0.5
-
-                if d < max_dev:
-                    return True
-                else:
-                    lx = []
-                    ly = []
+        return True
 
     
     def get_eyetracker_clock_async(self):
@@ -585,6 +522,14 @@ class TobiiTracker(BaseEyeTracker):
         """
         
         self.controller.recordEvent(msg)
+
+
+    def _send_message(self, t, msg):
+
+        # see pygaze._eyetracker.baseeyetracker.BaseEyeTracker
+
+        # the event is recorded with the time at which it was queued
+        self.controller.recordEvent(msg, delay=clock.get_time() - t)
     
     
     def log_var(self, var, val):
@@ -745,6 +690,7 @@ class TobiiTracker(BaseEyeTracker):
                    successfully started
         """
         
+        self.flush_messages()
         if self.recording:
             try:
                 self.controller.stopTracking()
@@ -1232,9 +1178,22 @@ class TobiiController:
         # eye tracking
         self.eyetracker = None
         self.eyetrackers = {}
-        self.gazeData = []
+        # only the most recent gaze data is kept in memory (about two
+        # minutes at 300 Hz); all data is written to the data file while
+        # tracking
+        self.gazeData = collections.deque(maxlen=36000)
         self.eventData = []
         self.datafile = None
+        self.tracking = False
+        
+        # data writing; gaze data and events are queued while tracking,
+        # and written to the data file by a background Thread
+        self.writeQueue = SampleQueue(name="Tobii data")
+        self.writing = True
+        self.writer = Thread(target=self.writeData, \
+            name='PyGaze_TobiiController_writer', args=[])
+        self.writer.daemon = True
+        self.writer.start()
         
         # initialize communications
         tobii.eye_tracking_io.init()
@@ -1322,6 +1281,10 @@ class TobiiController:
         self.browser = None
         self.mainloop_thread.stop()
         
+        # stop the writer Thread after it has written all queued data
+        self.writing = False
+        self.writer.join()
+        
         
     ############################################################################
     # activation methods
@@ -1727,8 +1690,10 @@ class TobiiController:
                     calls self.eyetracker.StartTracking()
         """
         
-        self.gazeData = []
+        self.gazeData.clear()
         self.eventData = []
+        self.writeQueue.put(('start',))
+        self.tracking = True
         self.eyetracker.events.OnGazeDataReceived += self.on_gazedata
         self.eyetracker.StartTracking()
 
@@ -1747,14 +1712,17 @@ class TobiiController:
         None        --    calls self.eyetracker.StopTracking(), then unsets
                     TobiiTracker.on_gazedata as an event callback for 
                     self.eyetracker.events.OnGazeDataReceived, and
-                    calls TobiiTracker.flushData before resetting both
-                    self.gazeData and self.eventData
+                    signals the writer Thread that the block of data
+                    has ended before resetting both self.gazeData and
+                    self.eventData; this does not wait for the data
+                    to be written (see TobiiController.flushData)
         """
         
         self.eyetracker.StopTracking()
         self.eyetracker.events.OnGazeDataReceived -= self.on_gazedata
-        self.flushData()
-        self.gazeData = []
+        self.tracking = False
+        self.writeQueue.put(('stop',))
+        self.gazeData.clear()
         self.eventData = []
     
     def on_gazedata(self,error,gaze):
@@ -1769,10 +1737,13 @@ class TobiiController:
         None
         
         returns
-        None        --    appends gaze to self.gazeData list
+        None        --    appends gaze to self.gazeData, and queues it for
+                    the data file while tracking
         """
         
         self.gazeData.append(gaze)
+        if self.tracking:
+            self.writeQueue.put(gaze)
 
     def getPupilSize(self,gaze):
 
@@ -1900,7 +1871,7 @@ class TobiiController:
         self.datafile = None
     
     
-    def recordEvent(self,event):
+    def recordEvent(self,event,delay=0):
         
         """Adds an event to the event data
         
@@ -1908,20 +1879,24 @@ class TobiiController:
         event        --    a string containing an event description
         
         keyword arguments
-        None
+        delay        --    time in milliseconds since the event occurred
+                    (default = 0)
         
         returns
         None        --    appends a (timestamp,event) tuple to
-                    self.eventData
+                    self.eventData, and queues it for the data file
         """
         
-        t = self.syncmanager.convert_from_local_to_remote(self.clock.get_time())
+        t = self.syncmanager.convert_from_local_to_remote( \
+            self.clock.get_time() - int(delay * 1000))
         self.eventData.append((t,event))
+        self.writeQueue.put(('event', t, event))
     
     
     def flushData(self):
         
-        """
+        """Waits until all queued gaze data and events have been written to
+        the data file
         
         arguments
         None
@@ -1933,70 +1908,161 @@ class TobiiController:
         None
         """
         
-        # return if there is no datafile or no data
-        if self.datafile == None:
-            print("WARNING! libtobii.TobiiController.flushData: data file is not set.")
-            return
+        # the writer can only finish while it is running
+        if self.writer.is_alive():
+            self.writeQueue.wait_flushed()
         
-        if len(self.gazeData)==0:
-            print("WARNING! libtobii.TobiiController.flushData: no data to write to file.")
-            return
+        # write data to disk
+        if self.datafile != None:
+            self.datafile.flush() # internal buffer to RAM
+            os.fsync(self.datafile.fileno()) # RAM file cache to disk
+    
+    
+    def formatGaze(self, g, timeStampStart):
         
-        # write header
-        self.datafile.write('\t'.join(['TimeStamp',
-                                       'GazePointXLeft',
-                                       'GazePointYLeft',
-                                       'ValidityLeft',
-                                       'GazePointXRight',
-                                       'GazePointYRight',
-                                       'ValidityRight',
-                                       'GazePointX',
-                                       'GazePointY',
-                                       'Event'])+'\n')
-        
-        # time of the first event
-        timeStampStart = self.gazeData[0].Timestamp
-        
-        # loop through all data points
-        for g in self.gazeData:
-            
-            # write timestamp and gaze position for both eyes to the datafile
-            self.datafile.write('{}\t{}\t{}\t{}\t{}\t{}\t{}'.format(
-                round((g.Timestamp-timeStampStart)/1000.0, ndigits=1),
-                round(g.LeftGazePoint2D.x*self.disp.dispsize[0] if g.LeftValidity!=4 else -1.0, ndigits=4),
-                round(g.LeftGazePoint2D.y*self.disp.dispsize[1] if g.LeftValidity!=4 else -1.0, ndigits=4),
-                g.LeftValidity,
-                round(g.RightGazePoint2D.x*self.disp.dispsize[0] if g.RightValidity!=4 else -1.0, ndigits=4),
-                round(g.RightGazePoint2D.y*self.disp.dispsize[1] if g.RightValidity!=4 else -1.0, ndigits=4),
-                g.RightValidity))
-            
-            # if no correct sample is available, data is missing
-            if g.LeftValidity == 4 and g.RightValidity == 4: #not detected
-                ave = (-1.0,-1.0)
-            # if the right sample is unavailable, use left sample
-            elif g.LeftValidity == 4:
-                ave = (g.RightGazePoint2D.x,g.RightGazePoint2D.y)
-            # if the left sample is unavailable, use right sample
-            elif g.RightValidity == 4:
-                ave = (g.LeftGazePoint2D.x,g.LeftGazePoint2D.y)
-            # if we have both samples, use both samples
-            else:
-                ave = ((g.LeftGazePoint2D.x + g.RightGazePoint2D.x) / 2.0,
-                       (g.LeftGazePoint2D.y + g.RightGazePoint2D.y) / 2.0)
-            
-            # write gaze position to the datafile, based on the selected sample(s)
-            self.datafile.write('\t{}\t{}\t'.format(\
-                round(ave[0], ndigits=4), round(ave[1], ndigits=4)))
-            self.datafile.write('\n')
+        """Returns a line for the data file
+        
+        arguments
+        g            --    Tobii gaze data struct
+        timeStampStart    --    timestamp of the first gaze data of the
+                        current block of data
+        
+        keyword arguments
+        None
+        
+        returns
+        line        --    a string with the timestamp, gaze positions of
+                    both eyes and their validity, and the gaze
+                    position of the selected sample(s)
+        """
+        
+        w, h = self.disp.dispsize
+        lx, ly = g.LeftGazePoint2D.x, g.LeftGazePoint2D.y
+        rx, ry = g.RightGazePoint2D.x, g.RightGazePoint2D.y
+        
+        # if no correct sample is available, data is missing
+        if g.LeftValidity == 4 and g.RightValidity == 4: #not detected
+            ave = (-1.0,-1.0)
+        # if the right sample is unavailable, use left sample
+        elif g.LeftValidity == 4:
+            ave = (rx,ry)
+        # if the left sample is unavailable, use right sample
+        elif g.RightValidity == 4:
+            ave = (lx,ly)
+        # if we have both samples, use both samples
+        else:
+            ave = ((lx + rx) / 2.0, (ly + ry) / 2.0)
+        
+        # timestamp, gaze position for both eyes, and the gaze position
+        # based on the selected sample(s)
+        return '%.1f\t%.4f\t%.4f\t%d\t%.4f\t%.4f\t%d\t%.4f\t%.4f\t\n' % (
+            (g.Timestamp-timeStampStart)/1000.0,
+            lx*w if g.LeftValidity!=4 else -1.0,
+            ly*h if g.LeftValidity!=4 else -1.0,
+            g.LeftValidity,
+            rx*w if g.RightValidity!=4 else -1.0,
+            ry*h if g.RightValidity!=4 else -1.0,
+            g.RightValidity,
+            ave[0], ave[1])
+    
+    
+    def writeData(self):
+        
+        """Continuously writes queued gaze data and events to the data
+        file, with events merged in by their timestamps (this runs on a
+        background Thread)
         
+        arguments
+        None
+        
+        keyword arguments
+        None
+        
+        returns
+        None
+        """
+        
+        # header of a block of data
+        header = '\t'.join(['TimeStamp',
+                            'GazePointXLeft',
+                            'GazePointYLeft',
+                            'ValidityLeft',
+                            'GazePointXRight',
+                            'GazePointYRight',
+                            'ValidityRight',
+                            'GazePointX',
+                            'GazePointY',
+                            'Event'])+'\n'
         # general format of an event string
         formatstr = '{}'+'\t'*9+'{}\n'
         
-        # write all events to the datafile, using the formatstring
-        for e in self.eventData:
-            self.datafile.write(formatstr.format( \
-                round((e[0]-timeStampStart)/1000.0, ndigits=4), e[1]))
+        # events that have not been written yet, as a heap of (timestamp,
+        # counter, event) tuples (the counter keeps events with the same
+        # timestamp in order)
+        events = []
+        counter = itertools.count()
+        # time of the first gaze data in the current block
+        timeStampStart = None
         
-        # write data to disk
-        self.datafile.flush() # internal buffer to RAM
-        os.fsync(self.datafile.fileno()) # RAM file cache to disk
+        running = True
+        while running:
+            
+            # stop after the final batch
+            running = self.writing
+            batch = self.writeQueue.get_batch(timeout=0.1)
+            if not batch:
+                continue
+            
+            lines = []
+            for item in batch:
+                
+                # a single bad item should not stop the writer, as all
+                # data after it would be lost
+                try:
+                    
+                    # events and the start and end of a block are tuples
+                    if type(item) == tuple:
+                        if item[0] == 'event':
+                            heapq.heappush(events, (item[1], next(counter), item[2]))
+                        elif item[0] == 'start':
+                            events = []
+                            timeStampStart = None
+                        elif item[0] == 'stop':
+                            if timeStampStart == None:
+                                print("WARNING! libtobii.TobiiController.writeData: no gaze data to write to file.")
+                                # write the events relative to the first one
+                                if events:
+                                    timeStampStart = events[0][0]
+                                    lines.append(header)
+                            # write all remaining events
+                            while events:
+                                t, i, e = heapq.heappop(events)
+                                lines.append(formatstr.format( \
+                                    round((t-timeStampStart)/1000.0, ndigits=4), e))
+                            timeStampStart = None
+                        continue
+                    
+                    # write the header before the first gaze data of a block
+                    if timeStampStart == None:
+                        timeStampStart = item.Timestamp
+                        lines.append(header)
+                    # write all events that happened before this gaze data
+                    while events and events[0][0] <= item.Timestamp:
+                        t, i, e = heapq.heappop(events)
+                        lines.append(formatstr.format( \
+                            round((t-timeStampStart)/1000.0, ndigits=4), e))
+                    lines.append(self.formatGaze(item, timeStampStart))
+                
+                except Exception as e:
+                    print("WARNING! libtobii.TobiiController.writeData: could not write {}; {}".format(item, e))
+            
+            # write the whole batch at once
+            try:
+                if self.datafile == None:
+                    print("WARNING! libtobii.TobiiController.writeData: data file is not set.")
+                elif lines:
+                    self.datafile.write(''.join(lines))
+            except Exception as e:
+                print("WARNING! libtobii.TobiiController.writeData: could not write to the data file; {}".format(e))
+            finally:
+                self.writeQueue.task_done(len(batch))
@@ -11,9 +11,18 @@ import copy
 import time
 import socket
 import datetime
+import selectors
+import collections
 import lxml.etree
-from multiprocessing import Queue
-from threading import Event, Lock, Thread
+from threading import Condition, Event, Lock, Thread
+
+from pygaze._eyetracker.samplequeue import SampleQueue
+
+# Regular expressions to tokenize the attributes of flat OpenGaze messages,
+# such as '<REC CNT="1" FPOGX="0.5" FPOGY="0.5" />'. These do not require
+# whitespace between attributes, which GazePoint sometimes omits.
+_ATTRIBUTE_PATTERN = re.compile(r'([A-Za-z0-9_]+)="([^"]*)"')
+_VALUE_PATTERN = re.compile(r'="([^"]*)"')
 
 # TODO: OpenGazeConnection
 # Thread that monitors whether the other threads are still alive, and that
@@ -68,17 +77,20 @@ class OpenGazeTracker:
         # Save the ip and port numbers.
         self.host = ip
         self.port = port
-        # Start a new TCP/IP socket. It is curcial that it has a timeout,
-        # as timeout exceptions will be handled gracefully, and are in fact
-        # necessary to prevent the incoming Thread from freezing.
+        # Start a new TCP/IP socket. After connecting, it is set to
+        # non-blocking, as all sending and receiving is multiplexed in a
+        # single Thread that waits for the socket to become ready.
         self._debug_print("Connecting to {} ({})...".format(self.host, self.port))
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._sock.connect((self.host, self.port))
-        self._sock.settimeout(1.0)
+        self._sock.setblocking(False)
         self._debug_print("Successfully connected!")
         self._maxrecvsize = 4096
-        # Create a socket Lock to prevent simultaneous access.
-        self._socklock = Lock()
+        # Create a pair of connected sockets that other Threads can use to
+        # wake up the I/O Thread when there are new outgoing messages.
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
         # Create an event that should remain set until the connection is
         # closed. (This is what keeps the Threads running.)
         self._connected = Event()
@@ -111,8 +123,10 @@ class OpenGazeTracker:
         # be set to None, to never consolidate automatically.
         self._logcounter = 0
         self._log_consolidation_freq = 60
-        # Start a Queue for samples that need to be logged.
-        self._logqueue = Queue()
+        # Start a Queue for samples that need to be logged. This only
+        # hands samples from the I/O Thread to the logging Thread, so it
+        # does not need to cross processes.
+        self._logqueue = SampleQueue(name="OpenGaze log")
         # Set an event that is set while samples should be logged, and
         # unset while they shouldn't.
         self._logging = Event()
@@ -133,36 +147,41 @@ class OpenGazeTracker:
         self._incoming = {}
         self._acknowledgements = {}
         # Create a Lock for the incoming message and acknowledgement dicts.
+        # Both come with a Condition, which is notified when a new
+        # acknowledgement or (non-sample) message comes in, so that
+        # functions that wait for them do not have to poll.
         self._inlock = Lock()
+        self._incond = Condition(self._inlock)
         self._acklock = Lock()
+        self._ackcond = Condition(self._acklock)
         # Create an empty string for the current unfinished message. This
         # is to prevent half a message being parsed when it is cut off
         # between two 'self._sock.recv' calls.
         self._unfinished = ''
-        # Start a new Thread that processes the incoming messages.
-        self._inthread = Thread( \
-            target=self._process_incoming, \
-            name='PyGaze_OpenGazeConnection_incoming', \
-            args=[])
+        # The field names of the most recent REC message, in the order in
+        # which the server sends them. This only changes when data fields
+        # are enabled or disabled, so that REC messages can be parsed by
+        # only extracting their values.
+        self._rec_fields = None
         
         # OUTGOING
-        # Start a new outgoing Queue (Thread safe, woop!).
-        self._outqueue = Queue()
+        # Start a new outgoing queue. This is a plain deque, as appending
+        # and popping are atomic, and the messages never leave this
+        # process.
+        self._outqueue = collections.deque()
         # Set an event that is set when all queued outgoing messages have
         # been processed.
         self._sock_ready_for_closing = Event()
         self._sock_ready_for_closing.clear()
-        # Create a new Thread that processes the outgoing queue.
-        self._outthread = Thread( \
-            target=self._process_outgoing, \
-            name='PyGaze_OpenGazeConnection_outgoing', \
+        
+        # I/O
+        # Start a new Thread that sends outgoing and processes incoming
+        # messages. It sleeps until the socket has new data, or until it
+        # is woken up because there are new outgoing messages.
+        self._iothread = Thread( \
+            target=self._process_io, \
+            name='PyGaze_OpenGazeConnection_io', \
             args=[])
-        # Create a dict that will keep track of at what time which command
-        # was sent.
-        self._outlatest = {}
-        # Create a Lock to prevent simultaneous access to the outlatest
-        # dict.
-        self._outlock = Lock()
         
         # RUN THREADS
         # Set a signal that will kill all Threads when they receive it.
@@ -170,14 +189,8 @@ class OpenGazeTracker:
         # Start the threads.
         self._debug_print("Starting the logging thread.")
         self._logthread.start()
-        self._debug_print("Starting the incoming thread.")
-        self._inthread.start()
-        self._debug_print("Starting the outgoing thread.")
-        self._outthread.start()
-        # Wait for a bit to allow the Threads to start.
-        while (not self._logthread.is_alive() or not self._inthread.is_alive()
-               or not self._outthread.is_alive()):
-            time.sleep(.005)
+        self._debug_print("Starting the I/O thread.")
+        self._iothread.start()
         # Enable the tracker to send ALL the things.
         self.enable_send_counter(True)
         self.enable_send_cursor(True)
@@ -322,6 +335,12 @@ class OpenGazeTracker:
 
     def _parse_msg(self, xml):
         
+        # REC messages come in at the full sampling rate, and are always
+        # flat (a single tag with only attributes), so they do not need a
+        # full XML parser.
+        if xml.startswith('<REC'):
+            return ('REC', self._parse_rec(xml))
+
 #        # Fix for GazePoint API bug.
 #          if xml == '<ACK ID="USER_DATA" VALUE="0"DUR="0" />':
 #            xml = '<ACK ID="USER_DATA" VALUE="0" DUR="0" />'
@@ -335,6 +354,25 @@ class OpenGazeTracker:
         e = lxml.etree.fromstring(xml)
     
         return (e.tag, e.attrib)
+
+    def _parse_rec(self, xml):
+        
+        # Extract all the values from the message. If these match the
+        # field names of the previous message (same number of values, and
+        # the same first field), we can simply pair them up.
+        values = _VALUE_PATTERN.findall(xml)
+        fields = self._rec_fields
+        if fields is not None and len(fields) == len(values) and \
+            xml.startswith(fields[0], 5):
+            return dict(zip(fields, values))
+        
+        # Otherwise, tokenize both field names and values, and remember
+        # the field names for the next message.
+        pairs = _ATTRIBUTE_PATTERN.findall(xml)
+        if len(pairs) > 0:
+            self._rec_fields = tuple([par for par, val in pairs])
+        
+        return dict(pairs)
     
     def _process_logging(self):
         
@@ -342,87 +380,141 @@ class OpenGazeTracker:
         
         while not self._log_ready_for_closing.is_set():
 
-            # Get a new sample from the Queue.
-            sample = self._logqueue.get()
-            
-            # Check if this is the shutdown signal.
-            if sample == self._thread_shutdown_signal:
-                # Signal that we're done logging all samples.
-                self._log_ready_for_closing.set()
-                # Break the while loop.
-                break
+            # Get all new samples from the Queue.
+            batch = self._logqueue.get_batch()
             
-            # Log the sample.
-            self._log_sample(sample)
+            consolidate = False
+            for sample in batch:
+                # Check if this is the shutdown signal.
+                if sample == self._thread_shutdown_signal:
+                    # Signal that we're done logging all samples.
+                    self._log_ready_for_closing.set()
+                    # Break the for loop.
+                    break
+                
+                # Log the sample.
+                self._log_sample(sample)
+                
+                # Check if the log should be consolidated.
+                if self._logcounter % self._log_consolidation_freq == 0:
+                    consolidate = True
+
+                # Increment the counter.
+                self._logcounter += 1
             
-            # Consolidate the log if necessary.
-            if self._logcounter % self._log_consolidation_freq == 0:
+            # Consolidate the log once per batch, if necessary.
+            if consolidate:
                 self._log_consolidation()
-
-            # Increment the counter.
-            self._logcounter += 1
         
         self._debug_print("Logging Thread ended.")
         return
     
-    def _process_incoming(self):
-        
-        self._debug_print("Incoming Thread started.")
-        
-        while self._connected.is_set():
+    def _process_io(self):
+        
+        self._debug_print("I/O Thread started.")
+        
+        # Register the socket and the wakeup socket with a selector, which
+        # will block until at least one of them is ready.
+        selector = selectors.DefaultSelector()
+        selector.register(self._sock, selectors.EVENT_READ)
+        selector.register(self._wakeup_recv, selectors.EVENT_READ)
+        # Bytes that still need to be sent.
+        outbuffer = b''
+        
+        while self._connected.is_set() or outbuffer or self._outqueue:
+
+            # Move all queued outgoing messages to the outgoing buffer.
+            while self._outqueue:
+                msg = self._outqueue.popleft()
+                self._debug_print(r"Outgoing: {}".format(msg))
+                outbuffer += msg.encode("utf-8")
+            # Only wait for the socket to be writable if there is
+            # something to write.
+            if outbuffer:
+                selector.modify(self._sock, \
+                    selectors.EVENT_READ | selectors.EVENT_WRITE)
+            else:
+                selector.modify(self._sock, selectors.EVENT_READ)
+
+            # Wait until the socket is ready, or until another Thread
+            # wakes us up. (The timeout is only there to prevent hanging on
+            # an unresponsive server after the connection was closed.)
+            events = selector.select(timeout=1.0)
+            if not events and not self._connected.is_set():
+                self._debug_print("Failed to send: {}".format(outbuffer))
+                break
 
-            # Get new messages from the OpenGaze Server.
-            timeout = False
-            with self._socklock:
-                try:
-                    instring = self._sock.recv(self._maxrecvsize)
-                except socket.timeout:
-                    timeout = True
-                else:
-                    instring = instring.decode("utf-8")
-            # Get a received timestamp.
-            t = time.time()
-            # Unlock the socket again.
-            
-            # Skip further processing if no new message came in.
-            if timeout:
-                self._debug_print("socket recv timeout")
-                continue
-
-            self._debug_print(r"Raw instring: {}".format(instring))
-
-            # Split the messages. These should be are separated by '\r\n', but
-            # the safest way to split them is to split them by any newline
-            # character while ignoring the empty messages.
-            messages = [msg for msg in instring.splitlines() if msg.strip()]
-
-            # Check if there is currently an unfinished message.
-            if self._unfinished:
-                # Combine the currently unfinished message and the
-                # most recent incoming message.
-                messages[0] = copy.copy(self._unfinished) + messages[0]
-                # Reset the unfinished message.
-                self._unfinished = ''
-            # Check if the last message was actually complete.
-            if not messages[-1][-2:] == '/>':
-                self._unfinished = messages.pop(-1)
-            
-            # Run through all messages.
-            for msg in messages:
-                self._debug_print(r"Incoming: {}".format(msg))
-                # Parse the message.
-                command, msgdict = self._parse_msg(msg)
-                # Check if the incoming message is an acknowledgement.
-                # Acknowledgements are also stored in a different dict,
-                # which is used to monitor whether sent messages are
-                # properly received.
-                if command == 'ACK':
-                    self._acklock.acquire()
-                    self._acknowledgements[msgdict['ID']] = copy.copy(t)
-                    self._acklock.release()
-                # Acquire the Lock for the incoming dict, so that it
-                # won't be accessed at the same time.
-                self._inlock.acquire()
+            for key, mask in events:
+                # Clear the wakeup signal(s).
+                if key.fileobj is self._wakeup_recv:
+                    try:
+                        self._wakeup_recv.recv(self._maxrecvsize)
+                    except BlockingIOError:
+                        pass
+                    continue
+                # Send as much of the outgoing buffer as the socket will
+                # take.
+                if mask & selectors.EVENT_WRITE and outbuffer:
+                    try:
+                        n = self._sock.send(outbuffer)
+                    except BlockingIOError:
+                        n = 0
+                    outbuffer = outbuffer[n:]
+                # Process new incoming messages.
+                if mask & selectors.EVENT_READ:
+                    try:
+                        instring = self._sock.recv(self._maxrecvsize)
+                    except BlockingIOError:
+                        continue
+                    # Get a received timestamp.
+                    t = time.time()
+                    # An empty string means that the server closed the
+                    # connection.
+                    if not instring:
+                        self._debug_print("Connection closed by server")
+                        selector.unregister(self._sock)
+                        self._connected.clear()
+                        outbuffer = b''
+                        self._outqueue.clear()
+                        break
+                    self._process_incoming(instring.decode("utf-8"), t)
+        
+        selector.close()
+        # Signal that we're done processing all the outgoing messages.
+        self._sock_ready_for_closing.set()
+        self._debug_print("I/O Thread ended.")
+        return
+    
+    def _process_incoming(self, instring, t):
+        
+        self._debug_print(r"Raw instring: {}".format(instring))
+
+        # Split the messages. These should be are separated by '\r\n', but
+        # the safest way to split them is to split them by any newline
+        # character while ignoring the empty messages.
+        messages = [msg for msg in instring.splitlines() if msg.strip()]
+        if not messages:
+            return
+
+        # Check if there is currently an unfinished message.
+        if self._unfinished:
+            # Combine the currently unfinished message and the
+            # most recent incoming message.
+            messages[0] = self._unfinished + messages[0]
+            # Reset the unfinished message.
+            self._unfinished = ''
+        # Check if the last message was actually complete.
+        if not messages[-1][-2:] == '/>':
+            self._unfinished = messages.pop(-1)
+        
+        # Run through all messages.
+        for msg in messages:
+            self._debug_print(r"Incoming: {}".format(msg))
+            # Parse the message.
+            command, msgdict = self._parse_msg(msg)
+            # Acquire the Lock for the incoming dict, so that it
+            # won't be accessed at the same time.
+            with self._incond:
                 # Check if this command is already in the current dict.
                 if command not in self._incoming.keys():
                     self._incoming[command] = {}
@@ -435,90 +527,77 @@ class OpenGazeTracker:
                     self._incoming[command][msgdict['ID']] = {}
                 # Add receiving time stamp, and the values for each
                 # parameter to the current dict.
-                self._incoming[command][msgdict['ID']]['t'] = \
-                    copy.copy(t)
-                for par, val in msgdict.items():
-                    self._incoming[command][msgdict['ID']][par] = \
-                        copy.copy(val)
+                current = self._incoming[command][msgdict['ID']]
+                current['t'] = t
+                current.update(msgdict)
                 # Log sample if command=='REC' and when the logging
-                # event is set.
-                if command == 'REC' and self._logging.is_set():
-                    self._logqueue.put(copy.deepcopy( \
-                        self._incoming[command][msgdict['ID']]))
-                # Unlock the incoming dict again.
-                self._inlock.release()
-            time.sleep(0.005)  # throttle to allow outgoing thread to work
-        self._debug_print("Incoming Thread ended.")
-        return
-
-    def _process_outgoing(self):
-        
-        self._debug_print("Outgoing Thread started.")
-        while not self._sock_ready_for_closing.is_set():
-            # Get a new command from the Queue.
-            msg = self._outqueue.get()
-            # Check if this is the shutdown signal.
-            if msg == self._thread_shutdown_signal:
-                # Signal that we're done processing all the outgoing
-                # messages.
-                self._sock_ready_for_closing.set()
-                # Break the while loop.
-                break
-            self._debug_print(r"Outgoing: {}".format(msg))
-            # Send the command to the OpenGaze Server.
-            t = time.time()
-            with self._socklock:
-                self._sock.send(msg.encode("utf-8"))
-            # Store a timestamp for the latest outgoing message.
-            with self._outlock:
-                self._outlatest[msg] = copy.copy(t)
-        self._debug_print("Outgoing Thread ended.")
-        return
+                # event is set. Other messages are rare, and could be
+                # waited for (e.g. during calibration).
+                if command == 'REC':
+                    if self._logging.is_set():
+                        self._logqueue.put(dict(current))
+                else:
+                    self._incond.notify_all()
+            # Check if the incoming message is an acknowledgement.
+            # Acknowledgements are also stored in a different dict,
+            # which is used to monitor whether sent messages are
+            # properly received. Functions that wait for them are
+            # notified straight away, but only after the incoming dict
+            # was updated, as they read the acknowledged values from it.
+            if command == 'ACK':
+                with self._ackcond:
+                    self._acknowledgements[msgdict['ID']] = t
+                    self._ackcond.notify_all()
+
+    def _queue_outgoing(self, msg):
+        
+        # Add the message to the outgoing queue, and wake up the I/O Thread
+        # so that it will send it straight away.
+        self._debug_print(r"Outqueue add: {}".format(msg))
+        self._outqueue.append(msg)
+        try:
+            self._wakeup_send.send(b'\x00')
+        except BlockingIOError:
+            # The wakeup buffer is full, so the I/O Thread is bound to
+            # wake up anyway.
+            pass
     
     def _send_message(self, command, ID, values=None,
                       wait_for_acknowledgement=True, resend_timeout=3.0,
                       maxwait=9.0):
         # Format a message in an XML format that the Open Gaze API needs.
         msg = self._format_msg(command, ID, values=values)
+        # Enabling or disabling data fields changes the REC message format.
+        if ID.upper().startswith('ENABLE_SEND_'):
+            self._rec_fields = None
         # Run until the message is acknowledged or a timeout occurs (or
         # break if we're not supposed to wait for an acknowledgement.)
         timeout = False
         acknowledged = False
         t0 = time.time()
+        ID = ID.upper()
         while not acknowledged and not timeout:
-            # Add the command to the outgoing Queue.
-            self._debug_print(r"Outqueue add: {}".format(msg))
-            self._outqueue.put(msg)
+            # Add the command to the outgoing queue. Any acknowledgement
+            # that comes in from now on must be a response to this message.
+            t = time.time()
+            self._queue_outgoing(msg)
             if not wait_for_acknowledgement:
                 break
-            # Wait until an acknowledgement comes in.
-            sent = False
-            t1 = time.time()
-            while time.time() - t1 < resend_timeout and not acknowledged:
-                # Check the outgoing queue for the sent message to
-                # appear.
-                if not sent:
-                    with self._outlock:
-                        if msg in self._outlatest.keys():
-                            t = copy.copy(self._outlatest[msg])
-                            sent = True
-                            self._debug_print(r"Outqueue sent: {}".format(msg))
-                    time.sleep(0.001)
-                # Check the incoming queue for the expected
-                # acknowledgement. (NOTE: This does not check
-                # whether the values of the incoming acknowlement
-                # match the sent message. Ideally, they should.)
-                else:
-                    with self._acklock:
-                        if ID in self._acknowledgements.keys():
-                            if self._acknowledgements[ID] >= t:
-                                acknowledged = True
-                                self._debug_print(r"Outqueue acknowledged: {}".format(msg))
-                    time.sleep(0.001)
-                # Check if there is a timeout.
-                if not acknowledged and time.time() - t0 > maxwait:
-                    timeout = True
-                    break
+            # Check if there is a timeout.
+            remaining = maxwait - (t - t0)
+            if remaining <= 0:
+                timeout = True
+                break
+            # Wait until the expected acknowledgement comes in, or until
+            # it's time to resend the message. (NOTE: This does not check
+            # whether the values of the incoming acknowlement match the
+            # sent message. Ideally, they should.)
+            with self._ackcond:
+                acknowledged = self._ackcond.wait_for( \
+                    lambda: self._acknowledgements.get(ID, 0) >= t, \
+                    timeout=min(resend_timeout, remaining))
+            if acknowledged:
+                self._debug_print(r"Outqueue acknowledged: {}".format(msg))
         return acknowledged, timeout
     
 
@@ -532,23 +611,25 @@ class OpenGazeTracker:
         # Reset the user-defined value.
         self.user_data('0')
         
-        # Unset the self._connected event to stop the incoming Thread.
+        # Unset the self._connected event to stop the I/O Thread once it
+        # has sent all outgoing messages, and wake it up.
         self._debug_print("Unsetting the connection event")
         self._connected.clear()
+        self._wakeup_send.send(b'\x00')
         
-        # Queue the stop signal to stop the outgoing and logging Threads.
-        self._debug_print("Adding stop signal to outgoing Queue")
-        self._outqueue.put(self._thread_shutdown_signal)
+        # Queue the stop signal to stop the logging Thread.
         self._debug_print("Adding stop signal to logging Queue")
         self._logqueue.put(self._thread_shutdown_signal)
         
-        # Wait for the outgoing Queue to be fully processed.
+        # Wait for the outgoing queue to be fully processed.
         self._debug_print("Waiting for the socket to close...")
         self._sock_ready_for_closing.wait()
         
         # Close the socket connection to the OpenGaze server.
         self._debug_print("Closing socket connection...")
         self._sock.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
         self._debug_print("Socket connection closed!")
         
         # Wait for the log Queue to be fully processed.
@@ -561,10 +642,8 @@ class OpenGazeTracker:
         
         # Join the Threads.
         self._debug_print("Waiting for the Threads to join...")
-        self._outthread.join()
-        self._debug_print("Outgoing Thread joined!")
-        self._inthread.join()
-        self._debug_print("Incoming Thread joined!")
+        self._iothread.join()
+        self._debug_print("I/O Thread joined!")
         self._logthread.join()
         self._debug_print("Logging Thread joined!")
 
@@ -1084,15 +1163,17 @@ class OpenGazeTracker:
         
         # Get the most recent calibration start time.
         t0 = None
-        while (t0 is None) and (time.time() - start < timeout):
-            self._inlock.acquire()
-            if 'ACK' in self._incoming.keys():
-                if 'CALIBRATE_START' in self._incoming['ACK'].keys():
-                    t0 = copy.copy( \
-                        self._incoming['ACK']['CALIBRATE_START']['t'])
-            self._inlock.release()
-            if t0 == None:
-                time.sleep(0.001)
+        with self._incond:
+            while (t0 is None) and (time.time() - start < timeout):
+                if 'ACK' in self._incoming.keys():
+                    if 'CALIBRATE_START' in self._incoming['ACK'].keys():
+                        t0 = copy.copy( \
+                            self._incoming['ACK']['CALIBRATE_START']['t'])
+                # Wait for the next incoming message. (Samples do not
+                # notify the Condition, so this does not wake up at the
+                # sampling rate.)
+                if t0 is None:
+                    self._incond.wait(max(0, timeout - (time.time() - start)))
 
         # Return None if there was no calibration start.
         if t0 is None:
@@ -1103,36 +1184,32 @@ class OpenGazeTracker:
         pt_nr = None
         started = False
         timed_out = False
-        while (not started) and (not timed_out):
-            # Get the latest calibration point start.
-            t1 = 0
-            self._inlock.acquire()
-            if 'CAL' in self._incoming.keys():
-                if 'CALIB_START_PT' in self._incoming['CAL'].keys():
-                    t1 = copy.copy( \
-                        self._incoming['CAL']['CALIB_START_PT']['t'])
-            self._inlock.release()
-            # Check if the point is later than the most recent
-            # calibration start.
-            if t1 >= t0:
-                # Check if the current point is already the latest
-                # registered point.
-                self._inlock.acquire()
-                pt_nr = int(copy.copy(self._incoming['CAL']['CALIB_START_PT']['PT']))
-                x = float(copy.copy(self._incoming['CAL']['CALIB_START_PT']['CALX']))
-                y = float(copy.copy(self._incoming['CAL']['CALIB_START_PT']['CALY']))
-                self._inlock.release()
-                if pt_nr != self._current_calibration_point:
-                    self._current_calibration_point = copy.copy(pt_nr)
-                    pos = (x, y)
-                    started = True
-            # Check if there is a timeout.
-            if time.time() - start > timeout:
-                timed_out = True
-            # Wait for a short bit to avoid wasting too many resources,
-            # and to avoid hogging the incoming messages Lock.
-            if not timed_out:
-                time.sleep(0.001)
+        with self._incond:
+            while (not started) and (not timed_out):
+                # Get the latest calibration point start.
+                t1 = 0
+                if 'CAL' in self._incoming.keys():
+                    if 'CALIB_START_PT' in self._incoming['CAL'].keys():
+                        t1 = copy.copy( \
+                            self._incoming['CAL']['CALIB_START_PT']['t'])
+                # Check if the point is later than the most recent
+                # calibration start.
+                if t1 >= t0:
+                    # Check if the current point is already the latest
+                    # registered point.
+                    pt_nr = int(copy.copy(self._incoming['CAL']['CALIB_START_PT']['PT']))
+                    x = float(copy.copy(self._incoming['CAL']['CALIB_START_PT']['CALX']))
+                    y = float(copy.copy(self._incoming['CAL']['CALIB_START_PT']['CALY']))
+                    if pt_nr != self._current_calibration_point:
+                        self._current_calibration_point = copy.copy(pt_nr)
+                        pos = (x, y)
+                        started = True
+                # Check if there is a timeout.
+                if time.time() - start > timeout:
+                    timed_out = True
+                # Wait for the next incoming message.
+                if not started and not timed_out:
+                    self._incond.wait(max(0, timeout - (time.time() - start)))
         
         if started:
             return pt_nr, pos
@@ -7,13 +7,19 @@
 
 import os
 import copy
+import asyncio
+import collections
 import json
 import time
 import socket
 import codecs
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from threading import Lock, Thread
 from multiprocessing import Event, Process, Queue
 from pygaze.py3compat import *
+from pygaze._eyetracker.samplequeue import SampleQueue
 
 
 # # # # #
@@ -40,48 +46,49 @@ class EyeTribe:
         self._logfile = codecs.open("{}.tsv".format(logfilename), "w", "utf-8")
         self._separator = "\t"
         self._log_header()
-        self._queue = Queue()
 
         # initialize connection
         self._connection = connection(host=host, port=port)
         self._tracker = tracker(self._connection)
-#        self._tracker.set_push(push=False)
         self._heartbeat = heartbeat(self._connection)
 
-        # create a new Lock
-        self._lock = Lock()
-
-        # initialize heartbeat thread
+        # initialize heartbeat thread; this runs on its own timer, and does
+        # not wait for the tracker's responses, so other requests are never
+        # held up by heartbeats (or the other way around)
         self._beating = True
+        self._stop_beating = threading.Event()
         self._heartbeatinterval = self._tracker.get_heartbeatinterval() / 1000.0
         self._hbthread = Thread(target=self._heartbeater, args=[self._heartbeatinterval])
         self._hbthread.daemon = True
         self._hbthread.name = 'heartbeater'
 
-        # initialize sample streamer
+        # initialize sample streamer; the tracker pushes its frames over
+        # the connection, and these are parsed on the connection's listener
+        # Thread, straight into a bounded in-process queue
         self._streaming = True
         self._samplefreq = self._tracker.get_framerate()
         self._intsampletime = 1.0 / self._samplefreq
         self._clockdiff = None
         self._newestframe = self._tracker.get_frame()
-        self._ssthread = Thread(target=self._stream_samples, args=[self._queue])
-        self._ssthread.daemon = True
-        self._ssthread.name = 'samplestreamer'
+        self._samplequeue = SampleQueue(maxsize=1024, name="EyeTribe frame")
 
         # initialize data processer
         self._processing = True
         self._processing_paused = False
         self._logdata = False
-        self._currentsample = copy.deepcopy(self._newestframe)
-        self._dpthread = Thread(target=self._process_samples, args=[self._queue])
+        self._currentsample = self._newestframe
+        self._dpthread = Thread(target=self._process_samples, args=[])
         self._dpthread.daemon = True
         self._dpthread.name = 'dataprocessor'
 
         # start all threads
         self._hbthread.start()
-        self._ssthread.start()
         self._dpthread.start()
 
+        # start receiving pushed frames
+        self._connection.frame_callback = self._push_frame
+        self._tracker.set_push(push=True)
+
         # initialize calibration
         self.calibration = calibration(self._connection)
 
@@ -184,7 +191,9 @@ class EyeTribe:
             self.stop_recording()
 
         # signal all threads to halt
+        self._connection.frame_callback = None
         self._beating = False
+        self._stop_beating.set()
         self._streaming = False
         self._processing = False
 
@@ -226,79 +235,58 @@ class EyeTribe:
                             recalculated to seconds here!
         """
 
-        # keep beating until it is signalled that we should stop
+        # keep beating until it is signalled that we should stop; beats are
+        # scheduled relative to the first, so the interval does not drift
+        t0 = time.time()
+        n = 0
         while self._beating:
-            # do not bother the tracker when it is calibrating
-            #self._wait_while_calibrating()
-            # wait for the Threading Lock to be released, then lock it
-            self._lock.acquire(True)
-            # send heartbeat
-            self._heartbeat.beat()
-            # release the Threading Lock
-            self._lock.release()
-            # wait for a bit
-            time.sleep(heartbeatinterval)
-
-    def _stream_samples(self, queue):
-
-        """Continuously polls the device, and puts all new samples in a
-        Queue instance
+            # send heartbeat, without waiting for the response
+            self._heartbeat.beat(wait=False)
+            # wait until the next beat is due (or until we should stop)
+            n += 1
+            self._stop_beating.wait(max(0, t0 + n*heartbeatinterval - time.time()))
 
-        arguments
+    def _push_frame(self, frame):
 
-        queue        --    a multithreading.Queue instance, to put samples
-                        into
-        """
-
-        # keep streaming until it is signalled that we should stop
-        while self._streaming:
-            # Only get a sample if the processing is not paused
-            if not self._processing_paused:
-                # wait for the Threading Lock to be released, then lock it
-                self._lock.acquire(True)
-                # get a new sample
-                sample = self._tracker.get_frame()
-                t1 = time.time() * 1000
-                # put the sample in the Queue
-                queue.put(sample)
-                # release the Threading Lock
-                self._lock.release()
-                # Update the newest frame
-                self._newestframe = copy.deepcopy(sample)
-                # Calculate the clock difference
-                self._clockdiff = sample['time'] - t1
-            # pause for half the intersample time, to avoid an overflow
-            # (but to make sure to not miss any samples)
-            time.sleep(self._intsampletime/2)
-
-    def _process_samples(self, queue):
-
-        """Continuously processes samples, updating the most recent sample
-        and writing data to a the log file when self._logdata is set to True
+        """Parses a frame that was pushed by the tracker, and puts the
+        sample in the sample queue. This is called on the connection's
+        listener Thread, so it should return quickly.
 
         arguments
 
-        queue        --    a multithreading.Queue instance, to read samples
-                        from
+        frame        --    a frame dict, as it is sent by the EyeTribe
+                        server
+        """
+
+        # Only process the frame if the processing is not paused
+        if self._processing_paused or not self._streaming:
+            return
+        sample = _parse_frame(frame)
+        # Update the newest frame (a single reference assignment, so the
+        # main Thread always sees a complete sample)
+        self._newestframe = sample
+        # Calculate the clock difference
+        self._clockdiff = sample['time'] - time.time() * 1000
+        # Queue the sample for the data processer
+        self._samplequeue.put(sample)
+
+    def _process_samples(self):
+
+        """Continuously processes samples from the sample queue, updating
+        the most recent sample and writing data to a the log file when
+        self._logdata is set to True
         """
 
         # keep processing until it is signalled that we should stop
         while self._processing:
-            # wait for the Threading Lock to be released, then lock it
-            self._lock.acquire(True)
-            # read new item from the queue
-            if not queue.empty():
-                sample = queue.get()
-            else:
-                sample = None
-            # release the Threading Lock
-            self._lock.release()
-            # update newest sample
-            if sample != None:
+            # wait until new samples have come in, and process all of them
+            # (the timeout is there to regularly check whether we should
+            # stop)
+            for sample in self._samplequeue.get_batch(timeout=0.1):
                 # check if the new sample is the same as the current sample
                 if not self._currentsample['timestamp'] == sample['timestamp']:
                     # update current sample
-                    self._currentsample = copy.deepcopy(sample)
+                    self._currentsample = sample
                     # write to file if data logging is on
                     if self._logdata:
                         self._log_sample(sample)
@@ -528,6 +516,68 @@ def _run_eyetribe_process(logfilename, host, port, connection_alive, command_que
         _current_sample = copy.deepcopy(tracker._currentsample)
 
 
+# # # # #
+# HELPER FUNCTIONS
+
+def _parse_frame(frame):
+
+    """Flattens a frame dict, as it is sent by the EyeTribe server, into a
+    sample dict (see tracker.get_frame)
+
+    arguments
+
+    frame        --    a frame dict, as it is sent by the EyeTribe server
+
+    returns
+
+    sample    --    a sample dict, as is returned by tracker.get_frame
+    """
+
+    # calculate pupil size
+    # if both eyes are available, take the average
+    if frame['lefteye']['psize'] > 0 and \
+        frame['righteye']['psize'] > 0:
+        psize = (frame['lefteye']['psize'] + \
+            frame['righteye']['psize']) / 2.0
+    # if only the right eye is available, then use the right eye
+    elif frame['lefteye']['psize'] == 0 and \
+        frame['righteye']['psize'] > 0:
+        psize = frame['righteye']['psize']
+    # if only the left eye is available, then use the left eye
+    elif frame['lefteye']['psize'] > 0 and \
+        frame['righteye']['psize'] == 0:
+        psize = frame['lefteye']['psize']
+    # if neither eye is available, then use the EyeTribe's standard
+    # missing value (0.0)
+    else:
+        psize = 0.0
+    # return the data in a dict
+    return {    'timestamp':    frame['timestamp'],
+            'time':        frame['time'],
+            'fix':        frame['fix'],
+            'state':        frame['state'],
+            'rawx':        frame['raw']['x'],
+            'rawy':        frame['raw']['y'],
+            'avgx':        frame['avg']['x'],
+            'avgy':        frame['avg']['y'],
+            'psize':        psize,
+            'Lrawx':        frame['lefteye']['raw']['x'],
+            'Lrawy':        frame['lefteye']['raw']['y'],
+            'Lavgx':        frame['lefteye']['avg']['x'],
+            'Lavgy':        frame['lefteye']['avg']['y'],
+            'Lpsize':        frame['lefteye']['psize'],
+            'Lpupilx':        frame['lefteye']['pcenter']['x'],
+            'Lpupily':        frame['lefteye']['pcenter']['y'],
+            'Rrawx':        frame['righteye']['raw']['x'],
+            'Rrawy':        frame['righteye']['raw']['y'],
+            'Ravgx':        frame['righteye']['avg']['x'],
+            'Ravgy':        frame['righteye']['avg']['y'],
+            'Rpsize':        frame['righteye']['psize'],
+            'Rpupilx':        frame['righteye']['pcenter']['x'],
+            'Rpupily':        frame['righteye']['pcenter']['y']
+            }
+
+
 # # # # #
 # SUPPORTING CLASSES
 
@@ -552,61 +602,27 @@ class connection:
         self.port = port
         self.DEBUG = False
 
-        # Dict for the most recent responses. This dict is updated whenever
-        # a new response comes in from the tracker. It has top-level keys
-        # for each category ('tracker', 'calibration', and 'heartbeat'),
-        # second-level keys for each potential request (e.g. 'set' and
-        # 'get' for the tracker category), and third-level keys for each
-        # subtype of request (e.g. 'frame' for the 'get' request in the
-        # 'tracker' category).
-        self._responses = { \
-            'tracker':        { \
-                'get':    { \
-                    'push':            None,
-                    'heartbeatinterval':    None,
-                    'version':            None,
-                    'trackerstate':        None,
-                    'framerate':        None,
-                    'iscalibrated':        None,
-                    'iscalibrating':        None,
-                    'calibresult':        None,
-                    'frame':            None,
-                    'screenindex':        None,
-                    'screenresw':        None,
-                    'screenresh':        None,
-                    'screenpsyw':        None,
-                    'screenpsyh':        None
-                    }, \
-                'set':    { \
-                    'push':            None,
-                    'heartbeatinterval':    None,
-                    'version':            None,
-                    'trackerstate':        None,
-                    'framerate':        None,
-                    'iscalibrated':        None,
-                    'iscalibrating':        None,
-                    'calibresult':        None,
-                    'frame':            None,
-                    'screenindex':        None,
-                    'screenresw':        None,
-                    'screenresh':        None,
-                    'screenpsyw':        None,
-                    'screenpsyh':        None
-                    } \
-                }, \
-            'calibration':    { \
-                'start':                None, \
-                'pointstart':            None, \
-                'pointend':                None, \
-                'abort':                None, \
-                'clear':                None \
-                }, \
-            'heartbeat':                None \
-            }
+        # Function that is called with every frame that is pushed by the
+        # tracker (or None to not process pushed frames). This is called
+        # on the listener Thread, and should thus return quickly.
+        self.frame_callback = None
+
+        # Dict for the requests that are awaiting a response. Its keys are
+        # (category,) tuples for heartbeats and tracker 'set' requests,
+        # (category, request) tuples for calibration requests, and
+        # (category, request, value) tuples for tracker 'get' requests
+        # (e.g. ('tracker', 'get', 'framerate')). Its values are deques of
+        # Future instances, one for every request that was sent (requests
+        # are pipelined, so multiple can be awaiting a response at the
+        # same time). The tracker answers requests in order, so the
+        # listener Thread resolves the oldest Future with the same key as
+        # soon as a response comes in.
+        self._pending = {}
+        self._pending_lock = Lock()
 
         # The reponse timeout (in seconds) determines how long we should
-        # wait for the relevant _responses dict field to be populated,
-        # after sending a request over the connection.        
+        # wait for the response to a request, after sending it over the
+        # connection.
         self.response_timeout = 1.0
 
         # Initialize a connection with the EyeTribe server.
@@ -636,35 +652,72 @@ class connection:
 
     def request(self, category, request, values):
 
-        """Send a message over the connection
+        """Send a message over the connection, and wait for the response
 
         arguments
 
         category    --    string indicating the query category
         request    --    string indicating the actual request of the message
         values    --    dict or list containing parameters of the request
+
+        returns
+
+        response    --    the parsed response, or a response with a 404
+                        status code if no response came in within
+                        response_timeout seconds
+        """
+        
+        future = self.request_async(category, request, values)
+        
+        # Wait until the listener Thread resolves the Future.
+        try:
+            r = future.result(timeout=self.response_timeout)
+        # If we couldn't find the response that matches our request, return
+        # a 404 status message.
+        except FutureTimeoutError:
+            self._cancel(category, request, values, future)
+            r = self._timeout_response()
+
+        # Return the response.
+        return r
+
+    def request_async(self, category, request, values):
+
+        """Send a message over the connection, without waiting for the
+        response
+
+        arguments
+
+        category    --    string indicating the query category
+        request    --    string indicating the actual request of the message
+        values    --    dict or list containing parameters of the request
+
+        returns
+
+        future    --    a concurrent.futures.Future that is resolved with
+                        the parsed response as soon as it comes in
         """
         
         # Create a JSON-formatted string for the current request.
         msg = self.create_json(category, request, values)
         
-        # Acquire the lock, to prevent simultaneous access.
-        self._request_lock.acquire()
-        # Clear the response that's currently in memory.
-        if category == 'heartbeat':
-            self._responses[category] = None
-        elif category == 'calibration':
-            self._responses[category][request] = None
-        elif category == 'tracker':
-            self._responses[category][request][values[0]] = None
-        # Release the lock, to allow other Threads to access the
-        # _responses dict again.
-        self._request_lock.release()
+        # Register a Future for the response to this request. The Lock is
+        # held until the message is sent, so that the order of the Futures
+        # is the same as the order of the requests.
+        key = self._response_key(category, request, values)
+        future = Future()
+        self._pending_lock.acquire()
+        if key not in self._pending.keys():
+            self._pending[key] = collections.deque()
+        self._pending[key].append(future)
 
         # Send the JSON-formatted message over the connection.
         self._request_lock.acquire()
-        self.sock.send(msg.encode("utf-8"))
-        self._request_lock.release()
+        try:
+            self.sock.send(msg.encode("utf-8"))
+        finally:
+            self._request_lock.release()
+            self._pending_lock.release()
 
         # Store request in DEBUG mode.
         if self.DEBUG:
@@ -672,39 +725,78 @@ class connection:
             self._debugfile.write("\nREQUEST ({}): '{}'".format( \
                 int(time.time()*1000), msg))
             self._debuglock.release()
-        
-        # Wait until a response is available.
-        r = None
-        t0 = time.time()
-        success = False
-        while time.time() - t0 <= self.response_timeout:
-            # Acquire the lock, to prevent simultaneous access.
-            self._request_lock.acquire()
-            # Check if a response is available.
-            if category == 'heartbeat':
-                r = self._responses[category]
-            elif category == 'calibration':
-                r = self._responses[category][request]
-            elif category == 'tracker':
-                r = self._responses[category][request][values[0]]
-            # Release the lock, to allow other Threads to access the
-            # _responses dict again.
-            self._request_lock.release()
-            # Wait for a bit if no response is available.
-            if r == None:
-                time.sleep(0.005)
-            else:
-                success = True
-                break
 
-        # If we couldn't find the response that matches our request, return
-        # a 404 status message.
-        if not success:
-            r = self.parse_json('{"statuscode":404,"values":{"statusmessage":"could not find response to this request"}}')
+        return future
+
+    async def request_coroutine(self, category, request, values):
+
+        """Send a message over the connection, and wait for the response
+        without blocking the running asyncio event loop
+
+        arguments
+
+        category    --    string indicating the query category
+        request    --    string indicating the actual request of the message
+        values    --    dict or list containing parameters of the request
+
+        returns
+
+        response    --    the parsed response, or a response with a 404
+                        status code if no response came in within
+                        response_timeout seconds
+        """
+
+        future = self.request_async(category, request, values)
+        try:
+            r = await asyncio.wait_for(asyncio.wrap_future(future), \
+                self.response_timeout)
+        except asyncio.TimeoutError:
+            self._cancel(category, request, values, future)
+            r = self._timeout_response()
 
-        # Parse and return the response.
         return r
 
+    def _cancel(self, category, request, values, future):
+
+        """INTERNAL USE ONLY. Stops waiting for the response to a request.
+        """
+
+        key = self._response_key(category, request, values)
+        self._pending_lock.acquire()
+        if key in self._pending.keys():
+            try:
+                self._pending[key].remove(future)
+            except ValueError:
+                pass
+        self._pending_lock.release()
+
+    def _timeout_response(self):
+
+        """INTERNAL USE ONLY. Returns the response for requests that were
+        not answered in time.
+        """
+
+        return self.parse_json('{"statuscode":404,"values":{"statusmessage":"could not find response to this request"}}')
+
+    def _response_key(self, category, request, values):
+
+        """INTERNAL USE ONLY. Returns the key under which the response to
+        a request is awaited in the _pending dict.
+        """
+
+        if category == 'heartbeat':
+            return (category,)
+        elif category == 'calibration':
+            return (category, request)
+        # The tracker does not echo the values of 'set' requests, so these
+        # can only be matched to their response by their order.
+        elif request == 'set':
+            return (category, request)
+        # Tracker 'get' requests are stored under the name of their (first)
+        # value.
+        else:
+            return (category, request, list(values)[0])
+
     def create_json(self, category, request, values):
 
         """Creates a new json message, in the format that is required by the
@@ -796,6 +888,9 @@ class connection:
         # Initialize a new connection.
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.connect((self.host,self.port))
+        # Closing the old connection stopped the listener; it should
+        # continue on the new connection.
+        self._listening = True
 
         # Release the lock, to allow other Threads to access the new
         # connection.
@@ -817,115 +912,138 @@ class connection:
     def _get_responses(self):
 
         """INTERNAL USE ONLY. This method is run in a sub-Thread, to listen
-        to the EyeTribe, and to process all its responses. Responses are
-        stored in a 
+        to the EyeTribe, and to process all its responses. The EyeTribe
+        sends one JSON message per line, but a single recv call can return
+        any number of (partial) lines. Incoming data is thus collected in a
+        buffer, and only complete lines are parsed and dispatched.
         """
         
-        # Create a variable to store any unfinished responses.
-        unfinished = ''
+        # Create a buffer to store incoming data in until a full line is
+        # available. This same buffer is reused throughout.
+        buf = bytearray()
         
         # Run until self._listening turns False.
         while self._listening:
             
             # Try to get a response from the connection.
             try:
-                responses = self.sock.recv(32768)
-                responses = responses.decode("utf-8")
+                data = self.sock.recv(32768)
             # If it fails, revive the connection and register a
-            # connection error.
+            # connection error for all pending requests.
             except socket.error:
+                if not self._listening:
+                    break
                 print("reviving connection")
                 self.revive()
-                responses = '{"statuscode":901,"values":{"statusmessage":"connection error"}}'
+                del buf[:]
+                self._fail_pending(self.parse_json('{"statuscode":901,"values":{"statusmessage":"connection error"}}'))
+                continue
+            
+            # An empty read means the EyeTribe closed the connection.
+            if len(data) == 0:
+                break
             
             # Store the raw responses in DEBUG mode.
             if self.DEBUG:
                 self._debuglock.acquire()
-                self._debugfile.write("\nRAWRESPONSES ({}): '{}'".format(int(time.time()*1000), responses))
+                self._debugfile.write("\nRAWRESPONSES ({}): '{}'".format(int(time.time()*1000), data))
                 self._debuglock.release()
 
-            # Split the responses (usually, multiple come in at once).
-            responses = responses.split('\n')
-
-            # Parse the responses.
-            for i, r in enumerate(responses):
-
+            # Add the new data to the buffer, and parse all complete lines
+            # that are in it.
+            buf += data
+            start = 0
+            end = buf.find(b'\n', start)
+            while end != -1:
+                line = buf[start:end]
+                start = end + 1
+                end = buf.find(b'\n', start)
                 # Skip the response if it's empty.
-                if r == '':
+                if len(line.strip()) == 0:
                     continue
-
-                # Reset the resp variable.
-                resp = None
-
-                # Try to parse the response.
+                # Try to parse the response; a line that cannot be parsed
+                # is corrupt, as lines are always complete here.
                 try:
-                    resp = self.parse_json(r)
-                # If parsing the response fails, we probably received
-                # a half-formed response.
-                except:
-                    # If we currently don't have half a respons
-                    # stored, then the current response might well be
-                    # the first half of a half-formed response.
-                    if unfinished == '':
-                        # Store the unfinished response.
-                        unfinished = copy.deepcopy(r)
-                    # If we do have an unfinished response stored, try
-                    # to match it up with the current half-formed
-                    # response.
-                    else:
-                        # Combine + parse the stored unfinished
-                        # response, and the incoming half-formed
-                        # response.
-                        try:
-                            resp = self.parse_json(unfinished + r)
-                        # If we can't use the stored unfinished
-                        # response and the incoming half-formed one,
-                        # just do nothing.
-                        except:
-                            pass
-                        # Reset the unfinished response.
-                        unfinished = ''
-                
+                    resp = self.parse_json(line.decode("utf-8"))
+                except ValueError:
+                    print("Could not parse response: '{}'".format(line))
+                    continue
+
                 # In DEBUG mode, store the parsed response.
                 if self.DEBUG:
                     self._debuglock.acquire()
                     self._debugfile.write("\nPARSEDRESPONSE ({}): '{}'".format(int(time.time()*1000), resp))
                     self._debuglock.release()
 
-                # Store the parsed response in the _responses dict.
-                if resp != None:
-                    if 'category' in resp.keys():
-                        self._request_lock.acquire()
-                        if resp['category'] == 'heartbeat':
-                            self._responses[resp['category']] = \
-                                copy.deepcopy(resp)
-                        elif resp['category'] == 'calibration':
-                            if 'request' in resp.keys():
-                                # Special category: if the
-                                # request was 'pointend', the
-                                # 'calibresult' can be returned.
-                                # We want to store this in the
-                                # tracker.get.calibresult entry
-                                # too.
-                                self._responses[resp['category']][resp['request']] = \
-                                    copy.deepcopy(resp)
-                                if resp['request'] == 'pointend' and \
-                                    'values' in resp.keys() and \
-                                    'calibresult' in resp['values'].keys():
-                                    self._responses['tracker']['get']['calibresult'] = \
-                                        copy.deepcopy(resp)
-                            else:
-                                print("Could not store response: '{}'".format(resp))
-                        elif resp['category'] == 'tracker':
-                            if ('request' in resp.keys()) and ('values' in resp.keys()):
-                                for k in resp['values'].keys():
-                                    self._responses[resp['category']][resp['request']][k] = \
-                                        copy.deepcopy(resp)
-                            else:
-                                print("Could not store response: '{}'".format(resp))
-                        self._request_lock.release()
-                    else:
-                        print("Could not store response: '{}'".format(resp))
+                # Pass the response on to whoever is waiting for it.
+                self._dispatch(resp)
+
+            # Remove the parsed lines from the buffer, keeping only the
+            # unfinished line (if any).
+            del buf[:start]
+
+    def _dispatch(self, resp):
+
+        """INTERNAL USE ONLY. Resolves the Future of the request that a
+        response belongs to, or passes a pushed frame on to the
+        frame_callback.
+        """
+
+        if 'category' not in resp.keys():
+            print("Could not store response: '{}'".format(resp))
+            return
+
+        category = resp['category']
+        request = resp.get('request', None)
+        values = resp.get('values', None)
+
+        # Frames are pushed by the tracker at the full sampling rate, so we
+        # pass them on directly.
+        if category == 'tracker' and values != None and 'frame' in values.keys():
+            if self.frame_callback != None:
+                self.frame_callback(values['frame'])
+
+        # Find the keys of the requests that this is a response to.
+        if category == 'heartbeat':
+            keys = [(category,)]
+        elif category == 'calibration' and request != None:
+            keys = [(category, request)]
+            # Special category: if the request was 'pointend', the
+            # 'calibresult' can be returned. This also answers a
+            # tracker.get.calibresult request.
+            if request == 'pointend' and values != None and \
+                'calibresult' in values.keys():
+                keys.append(('tracker', 'get', 'calibresult'))
+        elif category == 'tracker' and request == 'get' and values != None:
+            keys = [(category, request, k) for k in values.keys()]
+        elif category == 'tracker' and request == 'set':
+            keys = [(category, request)]
+        else:
+            print("Could not store response: '{}'".format(resp))
+            return
+
+        # Resolve the oldest Future of each of the matching requests.
+        futures = []
+        self._pending_lock.acquire()
+        for key in keys:
+            if len(self._pending.get(key, ())) > 0:
+                futures.append(self._pending[key].popleft())
+        self._pending_lock.release()
+        for future in futures:
+            future.set_result(resp)
+
+    def _fail_pending(self, resp):
+
+        """INTERNAL USE ONLY. Resolves the Futures of all pending requests
+        with the passed (error) response.
+        """
+
+        self._pending_lock.acquire()
+        futures = [f for pending in self._pending.values() for f in pending]
+        self._pending.clear()
+        self._pending_lock.release()
+        for future in futures:
+            future.set_result(resp)
 
 
 class tracker:
@@ -1217,49 +1335,8 @@ class tracker:
         if response['statuscode'] != 200:
             raise Exception("Error in tracker.get_frame: {} (code {})".format( \
                 response['values']['statusmessage'], response['statuscode']))
-        # calculate pupil size
-        # if both eyes are available, take the average
-        if response['values']['frame']['lefteye']['psize'] > 0 and \
-            response['values']['frame']['righteye']['psize'] > 0:
-            psize = (response['values']['frame']['lefteye']['psize'] + \
-                response['values']['frame']['righteye']['psize']) / 2.0
-        # if only the right eye is available, then use the right eye
-        elif response['values']['frame']['lefteye']['psize'] == 0 and \
-            response['values']['frame']['righteye']['psize'] > 0:
-            psize = response['values']['frame']['righteye']['psize']
-        # if only the left eye is available, then use the left eye
-        elif response['values']['frame']['lefteye']['psize'] > 0 and \
-            response['values']['frame']['righteye']['psize'] == 0:
-            psize = response['values']['frame']['lefteye']['psize']
-        # if neither eye is available, then use the EyeTribe's standard
-        # missing value (0.0)
-        else:
-            psize = 0.0
-        # return the data in a dict
-        return {    'timestamp':    response['values']['frame']['timestamp'],
-                'time':        response['values']['frame']['time'],
-                'fix':        response['values']['frame']['fix'],
-                'state':        response['values']['frame']['state'],
-                'rawx':        response['values']['frame']['raw']['x'],
-                'rawy':        response['values']['frame']['raw']['y'],
-                'avgx':        response['values']['frame']['avg']['x'],
-                'avgy':        response['values']['frame']['avg']['y'],
-                'psize':        psize,
-                'Lrawx':        response['values']['frame']['lefteye']['raw']['x'],
-                'Lrawy':        response['values']['frame']['lefteye']['raw']['y'],
-                'Lavgx':        response['values']['frame']['lefteye']['avg']['x'],
-                'Lavgy':        response['values']['frame']['lefteye']['avg']['y'],
-                'Lpsize':        response['values']['frame']['lefteye']['psize'],
-                'Lpupilx':        response['values']['frame']['lefteye']['pcenter']['x'],
-                'Lpupily':        response['values']['frame']['lefteye']['pcenter']['y'],
-                'Rrawx':        response['values']['frame']['righteye']['raw']['x'],
-                'Rrawy':        response['values']['frame']['righteye']['raw']['y'],
-                'Ravgx':        response['values']['frame']['righteye']['avg']['x'],
-                'Ravgy':        response['values']['frame']['righteye']['avg']['y'],
-                'Rpsize':        response['values']['frame']['righteye']['psize'],
-                'Rpupilx':        response['values']['frame']['righteye']['pcenter']['x'],
-                'Rpupily':        response['values']['frame']['righteye']['pcenter']['y']
-                }
+        # parse and return the frame
+        return _parse_frame(response['values']['frame'])
 
     def get_screenindex(self):
 
@@ -1735,11 +1812,22 @@ class heartbeat:
 
         self.connection = connection
 
-    def beat(self):
+    def beat(self, wait=True):
 
         """Sends a heartbeat to the device
+
+        keyword arguments
+
+        wait        --    Boolean indicating whether to wait for the
+                    response; if False, the heartbeat is sent and a
+                    Future for its response is returned immediately
+                    (default = True)
         """
 
+        # send the request without waiting for the response
+        if not wait:
+            return self.connection.request_async('heartbeat', None, None)
+
         # send the request
         response = self.connection.request('heartbeat', None, None)
         # return value or error
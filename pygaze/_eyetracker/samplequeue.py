@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of PyGaze - the open-source toolbox for eye tracking
+#
+# PyGaze is a Python module for easily creating gaze contingent experiments
+# or other software (as well as non-gaze contingent experiments/software)
+# Copyright (C) 2012-2013 Edwin S. Dalmaijer
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import ctypes
+import collections
+import threading
+
+import numpy
+
+
+class SampleQueue:
+
+    """A bounded queue for handing samples (or any other objects) from one
+    Thread to another within the same process. Objects are not copied or
+    pickled, so the producer should not change them after putting them in
+    the queue. When the queue is full, the oldest objects are dropped
+    (and counted in nlost), so that putting never blocks; this makes it
+    safe to use from callbacks that are called by a tracker's API. The
+    consumer prints a warning with the number of dropped objects when it
+    gets its next batch, so that data loss does not go unnoticed.
+
+    A consumer that calls task_done after processing each batch allows
+    other Threads to wait until everything that was queued so far has
+    been processed, using wait_flushed.
+    """
+
+    def __init__(self, maxsize=65536, name="sample"):
+
+        """Initializes a new SampleQueue
+
+        keyword arguments
+
+        maxsize        --    maximum number of objects in the queue; at
+                        1000 Hz, the default holds about a minute of
+                        samples (default = 65536)
+        name        --    what is queued, which is used in the warning
+                        about dropped objects (default = "sample")
+        """
+
+        self.maxsize = maxsize
+        self.name = name
+        # the number of objects that were put in the queue, the number of
+        # objects that were dropped because the queue was full, and the
+        # number of objects that were processed (or dropped)
+        self.nput = 0
+        self.nlost = 0
+        self.ndone = 0
+        # the number of dropped objects that have been warned about
+        self._nwarned = 0
+
+        # a single Lock protects the queue and the counters; the
+        # Conditions wake up a consumer that is waiting for new objects,
+        # and Threads that are waiting for the queue to be flushed
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._nonempty = threading.Condition(self._lock)
+        self._flushed = threading.Condition(self._lock)
+
+    def __len__(self):
+
+        return len(self._items)
+
+    def empty(self):
+
+        """Returns True when the queue is empty, and False otherwise"""
+
+        return len(self._items) == 0
+
+    def put(self, item):
+
+        """Adds an object to the end of the queue, dropping the oldest
+        object if the queue is full
+
+        arguments
+
+        item        --    the object that should be queued
+        """
+
+        with self._lock:
+            if len(self._items) == self.maxsize:
+                self._items.popleft()
+                self.nlost += 1
+                self.ndone += 1
+            self._items.append(item)
+            self.nput += 1
+            self._nonempty.notify()
+
+    def get_batch(self, timeout=None):
+
+        """Waits until the queue is not empty, and then removes and returns
+        all queued objects
+
+        keyword arguments
+
+        timeout        --    maximum time in seconds to wait for new objects,
+                        or None to wait indefinitely (default = None)
+
+        returns
+
+        batch        --    a list of all queued objects in the order in
+                        which they were put; this is empty after a
+                        timeout
+        """
+
+        with self._lock:
+            if not self._items:
+                self._nonempty.wait(timeout)
+            batch = list(self._items)
+            self._items.clear()
+            nlost = self.nlost - self._nwarned
+            self._nwarned = self.nlost
+
+        if nlost > 0:
+            print("WARNING! samplequeue.SampleQueue.get_batch: {} {} " \
+                "objects were dropped, because the queue was full".format( \
+                nlost, self.name))
+
+        return batch
+
+    def task_done(self, n=1):
+
+        """Signals that queued objects have been processed; consumers
+        should call this after processing each batch
+
+        keyword arguments
+
+        n            --    the number of processed objects (default = 1)
+        """
+
+        with self._lock:
+            self.ndone += n
+            self._flushed.notify_all()
+
+    def wait_flushed(self, timeout=None):
+
+        """Waits until all objects that were queued before calling this
+        have been processed (as signalled through task_done)
+
+        keyword arguments
+
+        timeout        --    maximum time in seconds to wait, or None to
+                        wait indefinitely (default = None)
+
+        returns
+
+        flushed        --    True if all objects were processed, or False
+                        after a timeout
+        """
+
+        with self._lock:
+            target = self.nput
+            return self._flushed.wait_for(lambda: self.ndone >= target, \
+                timeout=timeout)
+
+
+class SampleRing:
+
+    """A preallocated ring buffer for samples that a tracker's API provides
+    as ctypes Structures. Each sample is copied into a structured numpy
+    array with a single memmove, so that a sample callback does not need
+    to allocate or copy any Python objects. Samples are identified by
+    their sequence number (the number of samples written before them),
+    which can be handed to another Thread through a SampleQueue.
+
+    There is a single writer, which only overwrites a slot after wrapping
+    around the whole buffer, so reading recent samples requires no Lock.
+    """
+
+    def __init__(self, struct_type, size=16384):
+
+        """Initializes a new SampleRing
+
+        arguments
+
+        struct_type    --    the ctypes.Structure class of the samples
+
+        keyword arguments
+
+        size        --    number of samples in the ring; at 1000 Hz, the
+                        default holds about 16 seconds of samples
+                        (default = 16384)
+        """
+
+        self.dtype = numpy.dtype(struct_type)
+        self.size = size
+        self.data = numpy.zeros(size, dtype=self.dtype)
+        # the number of samples that have been written
+        self.nwritten = 0
+
+        self._address = self.data.ctypes.data
+        self._itemsize = self.dtype.itemsize
+        if self._itemsize != ctypes.sizeof(struct_type):
+            raise Exception("Error in samplequeue.SampleRing.__init__: " \
+                "could not match the memory layout of {}".format( \
+                struct_type.__name__))
+
+    def write(self, address):
+
+        """Copies a sample into the ring
+
+        arguments
+
+        address        --    the memory address of a ctypes Structure of
+                        the ring's struct_type, e.g. as returned by
+                        ctypes.addressof
+
+        returns
+
+        seq            --    the sequence number of the sample
+        """
+
+        seq = self.nwritten
+        ctypes.memmove(self._address + (seq % self.size) * self._itemsize, \
+            address, self._itemsize)
+        self.nwritten = seq + 1
+
+        return seq
+
+    def read(self, seq):
+
+        """Returns a copy of a sample
+
+        arguments
+
+        seq            --    the sequence number of the sample
+
+        returns
+
+        sample        --    a numpy.void with the sample's fields, or None
+                        if the sample has already been overwritten
+        """
+
+        if seq < self.nwritten - self.size:
+            return None
+
+        return self.data[seq % self.size].copy()
+
+    def newest(self):
+
+        """Returns a copy of the most recently written sample (all zeros
+        if no sample has been written yet)
+
+        returns
+
+        sample        --    a numpy.void with the sample's fields
+        """
+
+        return self.data[(self.nwritten - 1) % self.size].copy()
+
+
+class SampleBuffer:
+
+    """A preallocated ring buffer of samples, with one row per sample. By
+    default, the rows are gaze samples of (time, x, y, pupil size), but
+    any other samples can be stored as long as their first value is the
+    time. Times are in milliseconds on the PyGaze clock. A reader Thread
+    appends every sample it receives from a device (e.g. a tracker), so
+    that other Threads can read complete and consistent data: the newest
+    sample, all samples since a given sequence number, or all samples
+    within a time window.
+
+    There is a single writer, which fills in a row before counting it, so
+    reading recent samples requires no Lock. Waiting for new samples is
+    done through a Condition, so readers do not need to poll.
+    """
+
+    def __init__(self, size=65536, ncols=4):
+
+        """Initializes a new SampleBuffer
+
+        keyword arguments
+
+        size        --    number of samples in the buffer; at 2000 Hz, the
+                        default holds about half a minute of samples
+                        (default = 65536)
+        ncols        --    number of values in each sample, including the
+                        time (default = 4)
+        """
+
+        self.size = size
+        self.data = numpy.zeros((size, ncols), dtype=numpy.float64)
+        # the number of samples that have been written
+        self.nwritten = 0
+
+        self._newsample = threading.Condition(threading.Lock())
+
+    def append(self, *sample):
+
+        """Adds a sample to the buffer
+
+        arguments
+
+        sample        --    the values of the sample, starting with the
+                        timestamp in milliseconds; for gaze samples,
+                        these are followed by the horizontal and
+                        vertical gaze position, and the pupil size
+        """
+
+        self.data[self.nwritten % self.size] = sample
+        with self._newsample:
+            self.nwritten += 1
+            self._newsample.notify_all()
+
+    def latest(self):
+
+        """Returns the most recently written sample
+
+        returns
+
+        sample        --    a tuple of the sample's values (e.g. time, x,
+                        y, pupil size), or None if no sample has been
+                        written yet
+        """
+
+        n = self.nwritten
+        if n == 0:
+            return None
+
+        return tuple(self.data[(n - 1) % self.size].tolist())
+
+    def read(self, seq):
+
+        """Returns all samples from a sequence number onwards
+
+        arguments
+
+        seq            --    the sequence number of the first sample; this
+                        is moved forward if older samples have already
+                        been overwritten
+
+        returns
+
+        seq, samples    --    the sequence number of the first returned
+                        sample, and a (n, ncols) numpy array of samples
+        """
+
+        n = self.nwritten
+        seq = max(seq, n - self.size, 0)
+        i0 = seq % self.size
+        i1 = i0 + n - seq
+        if i1 <= self.size:
+            samples = self.data[i0:i1].copy()
+        else:
+            samples = numpy.concatenate((self.data[i0:], \
+                self.data[:i1 - self.size]))
+
+        # drop samples that were overwritten while they were being copied,
+        # and the oldest remaining one, as the writer may be halfway
+        # through overwriting it
+        nlost = self.nwritten - (self.size - 1) - seq
+        if nlost > 0:
+            samples = samples[nlost:]
+            seq += nlost
+
+        return seq, samples
+
+    def window(self, duration):
+
+        """Returns all samples that were recorded within a time window up to
+        the newest sample; only these samples are copied, as the first one
+        is found with a binary search over the times (which should not
+        decrease from one sample to the next)
+
+        arguments
+
+        duration    --    duration of the window in milliseconds
+
+        returns
+
+        samples        --    a (n, ncols) numpy array of samples
+        """
+
+        n = self.nwritten
+        if n == 0:
+            return self.data[:0].copy()
+
+        # find the oldest sample within the window, among the samples that
+        # are not being overwritten
+        tmin = self.data[(n - 1) % self.size, 0] - duration
+        lo = max(n - self.size + 1, 0)
+        hi = n - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.data[mid % self.size, 0] < tmin:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        # newer samples may have come in since
+        seq, samples = self.read(lo)
+        if len(samples) == 0:
+            return samples
+
+        return samples[samples[:, 0] >= samples[-1, 0] - duration]
+
+    def wait(self, seq, timeout=None):
+
+        """Waits until the sample with a given sequence number has been
+        written
+
+        arguments
+
+        seq            --    the sequence number of the sample
+
+        keyword arguments
+
+        timeout        --    maximum time in seconds to wait, or None to
+                        wait indefinitely (default = None)
+
+        returns
+
+        written        --    True if the sample has been written, or False
+                        after a timeout
+        """
+
+        with self._newsample:
+            return self._newsample.wait_for(lambda: self.nwritten > seq, \
+                timeout=timeout)
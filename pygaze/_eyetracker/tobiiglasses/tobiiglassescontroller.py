@@ -22,11 +22,55 @@ import datetime
 import threading
 import socket
 import uuid
+import select
 import logging as log
 
+import numpy
+
 log.basicConfig(format='[%(levelname)s]: %(message)s', level=log.DEBUG)
 
 
+# Data streams: the key of the value in a data packet, whether the packet
+# is for a single eye, and the number of values
+STREAMS = [
+    ('ac', False, 3),
+    ('gy', False, 3),
+    ('pc', True, 3),
+    ('pd', True, 1),
+    ('gd', True, 3),
+    ('gp', False, 2),
+    ('gp3', False, 3),
+    ]
+
+
+class StreamBuffer():
+
+    # A ring buffer with the timestamps and values of a data stream, in
+    # preallocated numpy arrays.
+
+    def __init__(self, nvalues, size=4096):
+
+        self.size = size
+        self.ts = numpy.zeros(size, dtype=numpy.int64)
+        self.values = numpy.full((size, nvalues), numpy.nan, dtype=numpy.float64)
+        self.nwritten = 0
+
+    def append(self, ts, values):
+
+        i = self.nwritten % self.size
+        self.ts[i] = ts
+        self.values[i] = values
+        self.nwritten += 1
+
+    def latest(self, n=1):
+
+        # Returns copies of the timestamps and values of the (up to) n
+        # newest samples, oldest first.
+        n = min(n, self.nwritten, self.size)
+        i = numpy.arange(self.nwritten - n, self.nwritten) % self.size
+        return self.ts[i], self.values[i]
+
+
 class TobiiGlassesController():
 
     def __init__(self, udpport = 49152, address =  None):
@@ -44,6 +88,22 @@ class TobiiGlassesController():
         self.data['gp'] = nd
         self.data['gp3'] = nd
 
+        # Ring buffers for every data stream, by stream name (e.g. 'gp' or
+        # 'left_pc')
+        self.buffers = {}
+        self.__dispatch__ = {}
+        for key, per_eye, n in STREAMS:
+            if per_eye:
+                for eye in ['left', 'right']:
+                    self.buffers[eye + '_' + key] = StreamBuffer(n)
+            else:
+                self.buffers[key] = StreamBuffer(n)
+            self.__dispatch__[key] = per_eye
+
+        # Queues (anything with a put method) that receive every incoming
+        # data packet, e.g. for logging
+        self.packet_queues = []
+
         self.project_id = str(uuid.uuid4())
         self.project_name = "TobiiProGlasses PyController"
         self.project_creation_date = datetime.datetime.now().strftime("%m/%d/%y %H:%M:%S")
@@ -77,7 +137,14 @@ class TobiiGlassesController():
         iptype = socket.AF_INET
         if ':' in self.peer[0]:
             iptype = socket.AF_INET6
-        return socket.socket(iptype, socket.SOCK_DGRAM)
+        sock = socket.socket(iptype, socket.SOCK_DGRAM)
+        # A larger receive buffer holds bursts of datagrams until the
+        # receiving Thread drains them.
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
+        except socket.error:
+            pass
+        return sock
 
 
     def __send_keepalive_msg__(self, socket, msg):
@@ -90,75 +157,60 @@ class TobiiGlassesController():
     def __grab_data__(self, socket):
 
         time.sleep(1)
+        socket.setblocking(False)
         while self.streaming:
-            data, address = socket.recvfrom(1024)
-            data = data.decode("utf-8")
-            jdata = json.loads(data)
-            self.__refresh_data__(jdata)
+            # Wait until there is data (the timeout is there to regularly
+            # check whether we should stop), and then read all datagrams
+            # that have come in.
+            readable, _, _ = select.select([socket], [], [], 0.1)
+            if not readable:
+                continue
+            packets = []
+            while True:
+                try:
+                    data = socket.recv(1024)
+                except (BlockingIOError, InterruptedError):
+                    break
+                packets.append(json.loads(data))
+            for jdata in packets:
+                self.__refresh_data__(jdata)
+            for queue in self.packet_queues:
+                for jdata in packets:
+                    queue.put(jdata)
 
 
 
     def __refresh_data__(self, jsondata):
 
-        try:
-            gy = jsondata['gy']
-            ts = jsondata['ts']
-            if( (self.data['mems']['gy']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data['mems']['gy'] = jsondata
-        except:
-            pass
-
-        try:
-            ac = jsondata['ac']
-            ts = jsondata['ts']
-            if( (self.data['mems']['ac']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data['mems']['ac'] = jsondata
-        except:
-            pass
-
-        try:
-            pc = jsondata['pc']
-            ts = jsondata['ts']
-            eye = jsondata['eye']
-            if( (self.data[eye + '_eye']['pc']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data[eye + '_eye']['pc'] = jsondata
-        except:
-            pass
-
-        try:
-            pd = jsondata['pd']
-            ts = jsondata['ts']
-            eye = jsondata['eye']
-            if( (self.data[eye + '_eye']['pd']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data[eye + '_eye']['pd'] = jsondata
-        except:
-            pass
-
-        try:
-            gd = jsondata['gd']
-            ts = jsondata['ts']
-            eye = jsondata['eye']
-            if( (self.data[eye + '_eye']['gd']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data[eye + '_eye']['gd'] = jsondata
-        except:
-            pass
+        # Only packets without errors are stored.
+        if jsondata.get('s') != 0:
+            return
 
-        try:
-            gp = jsondata['gp']
-            ts = jsondata['ts']
-            if( (self.data['gp']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data['gp'] = jsondata
+        # Find the data key in the packet; all other keys are metadata,
+        # like 'ts', 's', 'gidx', 'eye', and 'l'.
+        for key in jsondata:
+            if key in self.__dispatch__:
+                break
+        else:
+            return
+
+        ts = jsondata['ts']
+        if self.__dispatch__[key]:
+            eye = jsondata.get('eye')
+            if eye not in ('left', 'right'):
+                return
+            self.buffers[eye + '_' + key].append(ts, jsondata[key])
+            latest = self.data[eye + '_eye']
+        elif key in ('ac', 'gy'):
+            self.buffers[key].append(ts, jsondata[key])
+            latest = self.data['mems']
+        else:
+            self.buffers[key].append(ts, jsondata[key])
+            latest = self.data
 
-        except:
-            pass
-
-        try:
-            gp3 = jsondata['gp3']
-            ts = jsondata['ts']
-            if( (self.data['gp3']['ts'] < ts) and (jsondata['s'] == 0) ):
-                self.data['gp3'] = jsondata
-        except:
-            pass
+        # Also keep the newest packet of each stream.
+        if latest[key]['ts'] < ts:
+            latest[key] = jsondata
 
 
     def __start_streaming__(self):
@@ -383,3 +435,12 @@ class TobiiGlassesController():
 
     def get_data(self):
         return self.data
+
+    def get_buffer(self, stream):
+        return self.buffers[stream]
+
+    def add_packet_queue(self, queue):
+        self.packet_queues = self.packet_queues + [queue]
+
+    def remove_packet_queue(self, queue):
+        self.packet_queues = [q for q in self.packet_queues if q is not queue]
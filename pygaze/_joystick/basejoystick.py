@@ -280,3 +280,109 @@ class BaseJoystick:
         """
 
         pass
+
+
+    def start_streaming(self):
+
+        """
+        Starts sampling all axes, hats and buttons at a fixed rate on a
+        background Thread
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        rate            --    number of samples per second (default = 100)
+        buffersize        --    number of samples that are kept in the stream
+                        buffer (default = 65536)
+        logfile        --    a Logfile to which all samples are written, or
+                        None to not log samples; call stop_streaming
+                        before closing the Logfile (default = None)
+        loginterval        --    time in milliseconds between writing batches
+                        of samples to the logfile (default = 1000)
+        
+        returns
+        
+        None            --    samples are added to the stream property, with
+                        rows of [time, axis 0, axis 1, ..., hat 0 x,
+                        hat 0 y, ..., button 0, button 1, ...]
+        """
+
+        pass
+
+
+    def stop_streaming(self):
+
+        """
+        Stops sampling the joystick; the samples that were streamed remain
+        available through get_latest and get_window
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        None            --    stops the streaming Thread, after it has
+                        logged all remaining samples
+        """
+
+        pass
+
+
+    def get_latest(self):
+
+        """
+        Returns the newest streamed sample
+        
+        arguments
+        
+        None
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        time, axespos, hatpos, buttons    --    time is the time (measured
+                                from expbegintime) of the sample;
+                                axespos is a list of all axis
+                                positions; hatpos a list of (x,y)
+                                tuples for all hats; buttons is a
+                                list of the state (0 or 1) of all
+                                buttons; or None when nothing has
+                                been streamed yet
+        """
+
+        pass
+
+
+    def get_window(self):
+
+        """
+        Returns all streamed samples within a time window up to the newest
+        sample
+        
+        arguments
+        
+        duration        --    duration of the window in milliseconds
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        samples        --    a numpy array with one row of [time, axis 0,
+                        axis 1, ..., hat 0 x, hat 0 y, ..., button 0,
+                        button 1, ...] per sample
+        """
+
+        pass
@@ -19,11 +19,11 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-import copy
-
 from pygaze.libtime import clock
 from pygaze import settings
 from pygaze._joystick.basejoystick import BaseJoystick
+from pygaze._misc.pygameevents import dispatcher
+from pygaze._eyetracker.samplequeue import SampleBuffer
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -32,6 +32,11 @@ try:
 except:
     pass
 
+import sys
+import threading
+import time
+
+import numpy
 import pygaze
 import pygame
 from pygame.joystick import Joystick
@@ -78,6 +83,11 @@ class PyGameJoystick(BaseJoystick):
         self.set_joybuttonlist(joybuttonlist)
         self.set_timeout(timeout)
 
+        # streaming is off until start_streaming is called
+        self.stream = None
+        self._streaming = False
+        self._streamthread = None
+
 
     def set_joybuttonlist(self, joybuttonlist=None):
 
@@ -152,20 +162,15 @@ class PyGameJoystick(BaseJoystick):
             joybuttonlist = self.jbuttonlist
         if timeout == "default":
             timeout = self.timeout
-        # register start time
-        starttime = clock.get_time()
-        time = copy.copy(starttime)
         # wait for button press
-        while timeout == None or time - starttime <= timeout:
-            time = clock.get_time()
-            for event in pygame.event.get():
-                if event.type == pygame.JOYBUTTONDOWN:
-                    time = clock.get_time()
-                    if joybuttonlist == None or event.button in joybuttonlist:
-                        pressed = event.button
-                        return pressed, time
+        response = dispatcher.wait("joystick", timeout=timeout,
+            accept=lambda event: event.type == pygame.JOYBUTTONDOWN and \
+            (joybuttonlist == None or event.button in joybuttonlist))
+        if response is not None:
+            time, event = response
+            return event.button, time
         # in case of timeout
-        return None, time
+        return None, clock.get_time()
 
 
     def get_joyaxes(self, timeout="default"):
@@ -192,21 +197,17 @@ class PyGameJoystick(BaseJoystick):
         # set timeout
         if timeout == "default":
             timeout = self.timeout
-        # start time and pos
-        pos = []
-        starttime = clock.get_time()
-        time = copy.copy(starttime)
         # wait for axis movement
-        while timeout == None or time - starttime <= timeout:
-            time = clock.get_time()
-            for event in pygame.event.get():
-                if event.type == pygame.JOYAXISMOTION:
-                    time = clock.get_time()
-                    for axis in range(self.js.get_numaxes()):
-                        pos.append(self.js.get_axis(axis))
-                    return pos, time
+        response = dispatcher.wait("joystick", timeout=timeout,
+            accept=lambda event: event.type == pygame.JOYAXISMOTION)
+        if response is not None:
+            time, event = response
+            pos = []
+            for axis in range(self.js.get_numaxes()):
+                pos.append(self.js.get_axis(axis))
+            return pos, time
         # in case of timeout
-        return None, time
+        return None, clock.get_time()
 
 
     def get_joyballs(self, timeout="default"):
@@ -233,21 +234,17 @@ class PyGameJoystick(BaseJoystick):
         # set timeout
         if timeout == "default":
             timeout = self.timeout
-        # start time and pos
-        ballpos = []
-        starttime = clock.get_time()
-        time = copy.copy(starttime)
-        # wait for axis movement
-        while timeout == None or time - starttime <= timeout:
-            time = clock.get_time()
-            for event in pygame.event.get():
-                if event.type == pygame.JOYBALLMOTION:
-                    time = clock.get_time()
-                    for ball in range(self.js.get_numballs()):
-                        ballpos.append(self.js.get_ball(ball))
-                    return ballpos, time
+        # wait for ball movement
+        response = dispatcher.wait("joystick", timeout=timeout,
+            accept=lambda event: event.type == pygame.JOYBALLMOTION)
+        if response is not None:
+            time, event = response
+            ballpos = []
+            for ball in range(self.js.get_numballs()):
+                ballpos.append(self.js.get_ball(ball))
+            return ballpos, time
         # in case of timeout
-        return None, time
+        return None, clock.get_time()
 
 
     def get_joyhats(self, timeout="default"):
@@ -274,21 +271,17 @@ class PyGameJoystick(BaseJoystick):
         # set timeout
         if timeout == "default":
             timeout = self.timeout
-        # start time and pos
-        hatpos = []
-        starttime = clock.get_time()
-        time = copy.copy(starttime)
-        # wait for axis movement
-        while timeout == None or time - starttime <= timeout:
-            time = clock.get_time()
-            for event in pygame.event.get():
-                if event.type == pygame.JOYHATMOTION:
-                    time = clock.get_time()
-                    for hat in range(self.js.get_numhats()):
-                        hatpos.append(self.js.get_hat(hat))
-                    return hatpos, time
+        # wait for hat movement
+        response = dispatcher.wait("joystick", timeout=timeout,
+            accept=lambda event: event.type == pygame.JOYHATMOTION)
+        if response is not None:
+            time, event = response
+            hatpos = []
+            for hat in range(self.js.get_numhats()):
+                hatpos.append(self.js.get_hat(hat))
+            return hatpos, time
         # in case of timeout
-        return None, time
+        return None, clock.get_time()
 
 
     def get_joyinput(self, joybuttonlist="default", timeout="default"):
@@ -339,37 +332,230 @@ class PyGameJoystick(BaseJoystick):
         pos = []
         ballpos = []
         hatpos = []
-        eventtype = None
-        starttime = clock.get_time()
-        time = copy.copy(starttime)
         # wait for input
-        while timeout == None or time - starttime <= timeout:
-            time = clock.get_time()
-            for event in pygame.event.get():
-                if event.type == pygame.JOYBUTTONDOWN:
-                    time = clock.get_time()
-                    if joybuttonlist == None or event.button in joybuttonlist:
-                        eventtype = "joybuttonpress"
-                        pressed = event.button
-                        return eventtype, pressed, time
-                if event.type == pygame.JOYAXISMOTION:
-                    time = clock.get_time()
-                    eventtype = "joyaxismotion"
-                    for axis in range(self.js.get_numaxes()):
-                        pos.append(self.js.get_axis(axis))
-                    return eventtype, pos, time
-                if event.type == pygame.JOYBALLMOTION:
-                    time = clock.get_time()
-                    eventtype = "joyballmotion"
-                    for ball in range(self.js.get_numballs()):
-                        ballpos.append(self.js.get_ball(ball))
-                    return eventtype, ballpos, time
-                if event.type == pygame.JOYHATMOTION:
-                    time = clock.get_time()
-                    eventtype = "joyhatmotion"
-                    for hat in range(self.js.get_numhats()):
-                        hatpos.append(self.js.get_hat(hat))
-                    return eventtype, hatpos, time
-        # in case of timeout
-        return eventtype, None, time
-    
+        response = dispatcher.wait("joystick", timeout=timeout,
+            accept=lambda event: event.type != pygame.JOYBUTTONDOWN or \
+            joybuttonlist == None or event.button in joybuttonlist)
+        if response is None:
+            # in case of timeout
+            return None, None, clock.get_time()
+        time, event = response
+        if event.type == pygame.JOYBUTTONDOWN:
+            return "joybuttonpress", event.button, time
+        if event.type == pygame.JOYAXISMOTION:
+            for axis in range(self.js.get_numaxes()):
+                pos.append(self.js.get_axis(axis))
+            return "joyaxismotion", pos, time
+        if event.type == pygame.JOYBALLMOTION:
+            for ball in range(self.js.get_numballs()):
+                ballpos.append(self.js.get_ball(ball))
+            return "joyballmotion", ballpos, time
+        for hat in range(self.js.get_numhats()):
+            hatpos.append(self.js.get_hat(hat))
+        return "joyhatmotion", hatpos, time
+
+
+    def start_streaming(self, rate=100, buffersize=65536, logfile=None,
+        loginterval=1000):
+
+        """Starts sampling all axes, hats and buttons at a fixed rate on
+        a background Thread
+        
+        arguments
+        None
+        
+        keyword arguments
+        rate        -- number of samples per second (default = 100)
+        buffersize    -- number of samples that are kept in the stream
+                   buffer; at 100 Hz, the default holds about 10
+                   minutes of samples (default = 65536)
+        logfile    -- a Logfile to which all samples are written, or
+                   None to not log samples; call stop_streaming
+                   before closing the Logfile (default = None)
+        loginterval    -- time in milliseconds between writing batches of
+                   samples to the logfile (default = 1000)
+        
+        returns
+        Nothing    -- samples are added to the stream property, a
+                   SampleBuffer with rows of [time, axis 0, axis 1,
+                   ..., hat 0 x, hat 0 y, ..., button 0, button 1,
+                   ...]; see get_latest and get_window
+        """
+
+        if self._streaming:
+            return
+
+        self._naxes = self.js.get_numaxes()
+        self._nhats = self.js.get_numhats()
+        self._nbuttons = self.js.get_numbuttons()
+        self.stream = SampleBuffer(size=buffersize,
+            ncols=1 + self._naxes + 2 * self._nhats + self._nbuttons)
+
+        self._streaming = True
+        self._streamthread = threading.Thread(target=self._stream,
+            args=(rate, logfile, loginterval))
+        self._streamthread.daemon = True
+        self._streamthread.start()
+
+
+    def stop_streaming(self):
+
+        """Stops sampling the joystick; the samples that were streamed
+        remain available through get_latest and get_window
+        
+        arguments
+        None
+        
+        keyword arguments
+        None
+        
+        returns
+        Nothing    -- stops the streaming Thread, after it has logged all
+                   remaining samples
+        """
+
+        if not self._streaming:
+            return
+
+        self._streaming = False
+        self._streamthread.join()
+        self._streamthread = None
+
+
+    def get_latest(self):
+
+        """Returns the newest streamed sample
+        
+        arguments
+        None
+        
+        keyword arguments
+        None
+        
+        returns
+        time, axespos, hatpos, buttons    -- time is the time (measured from
+                           expbegintime) of the sample;
+                           axespos is a list of all axis
+                           positions; hatpos a list of (x,y)
+                           tuples for all hats; buttons is a
+                           list of the state (0 or 1) of all
+                           buttons; or None when nothing has
+                           been streamed yet
+        """
+
+        if self.stream is None:
+            return None
+        sample = self.stream.latest()
+        if sample is None:
+            return None
+
+        i = 1 + self._naxes
+        j = i + 2 * self._nhats
+        axespos = list(sample[1:i])
+        hatpos = [(int(sample[k]), int(sample[k+1])) for k in range(i, j, 2)]
+        buttons = [int(b) for b in sample[j:]]
+
+        return sample[0], axespos, hatpos, buttons
+
+
+    def get_window(self, duration):
+
+        """Returns all streamed samples within a time window up to the
+        newest sample
+        
+        arguments
+        duration    -- duration of the window in milliseconds
+        
+        keyword arguments
+        None
+        
+        returns
+        samples    -- a numpy array with one row of [time, axis 0,
+                   axis 1, ..., hat 0 x, hat 0 y, ..., button 0,
+                   button 1, ...] per sample
+        """
+
+        if self.stream is None:
+            return numpy.zeros((0, 1))
+
+        return self.stream.window(duration)
+
+
+    def _stream(self, rate, logfile, loginterval):
+
+        """Samples the joystick until stop_streaming is called (runs on
+        the streaming Thread)
+        
+        arguments
+        rate        -- number of samples per second
+        logfile    -- a Logfile or None
+        loginterval    -- time in milliseconds between writing batches
+        
+        keyword arguments
+        None
+        
+        returns
+        Nothing    -- appends samples to the stream
+        """
+
+        interval = 1000.0 / rate
+        seq = self.stream.nwritten
+        nextsample = clock.get_time()
+        nextlog = nextsample + loginterval
+        while self._streaming:
+            # the joystick state is updated when events are pumped; SDL does
+            # not support that on another Thread than the window's, which
+            # only happens to work on Linux (as for the dispatcher's own
+            # Thread), so elsewhere the state is updated whenever the main
+            # Thread handles input
+            if sys.platform.startswith("linux"):
+                dispatcher.pump()
+            sample = [clock.get_time()]
+            for axis in range(self._naxes):
+                sample.append(self.js.get_axis(axis))
+            for hat in range(self._nhats):
+                sample.extend(self.js.get_hat(hat))
+            for button in range(self._nbuttons):
+                sample.append(self.js.get_button(button))
+            self.stream.append(*sample)
+
+            # write all new samples at once
+            if logfile is not None and sample[0] >= nextlog:
+                seq = self._log_stream(logfile, seq)
+                nextlog = sample[0] + loginterval
+
+            # wait for the next sample, without trying to catch up when
+            # sampling fell behind
+            nextsample += interval
+            if nextsample < sample[0]:
+                nextsample = sample[0] + interval
+            wait = nextsample - clock.get_time()
+            if wait > 0:
+                time.sleep(wait / 1000.0)
+
+        if logfile is not None:
+            self._log_stream(logfile, seq)
+
+
+    def _log_stream(self, logfile, seq):
+
+        """Writes all samples from a sequence number onwards to the
+        logfile
+        
+        arguments
+        logfile    -- a Logfile
+        seq        -- the sequence number of the first sample
+        
+        keyword arguments
+        None
+        
+        returns
+        seq        -- the sequence number of the next sample to log
+        """
+
+        seq, samples = self.stream.read(seq)
+        if len(samples) > 0:
+            logfile.write_batch([["JOYSTICK"] + row for row in \
+                samples.tolist()])
+
+        return seq + len(samples)
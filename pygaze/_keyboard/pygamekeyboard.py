@@ -22,6 +22,7 @@
 from pygaze.libtime import clock
 from pygaze import settings
 from pygaze._keyboard.basekeyboard import BaseKeyboard
+from pygaze._misc.pygameevents import dispatcher
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -102,21 +103,15 @@ class PyGameKeyboard(BaseKeyboard):
           
           # flush if necessary
           if flush:
-               pygame.event.get(pygame.KEYDOWN)
-               
-          # starttime
-          starttime = clock.get_time()
-          time = clock.get_time()
+               dispatcher.flush("keyboard")
 
           # wait for input
-          while timeout == None or time - starttime <= timeout:
-               time = clock.get_time()
-               for event in pygame.event.get():
-                    if event.type == pygame.KEYDOWN:
-                         time = clock.get_time()
-                         key = pygame.key.name(event.key)
-                         if keylist == None or key in keylist:
-                              return key, time
-                         
+          response = dispatcher.wait("keyboard", timeout=timeout,
+               accept=lambda event: keylist == None or \
+               pygame.key.name(event.key) in keylist)
+          if response is not None:
+               time, event = response
+               return pygame.key.name(event.key), time
+
           # in case of timeout
-          return None, time
+          return None, clock.get_time()
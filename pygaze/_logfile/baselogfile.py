@@ -95,6 +95,30 @@ class BaseLogfile:
         pass
 
 
+    def write_batch(self):
+
+        """
+        Writes many lines of values to logfile at once, which is faster
+        than writing them one by one
+        
+        arguments
+        
+        vallists    --    list of lists of values; every list of values is
+                    written on its own line (each value separated with
+                    a tab)
+        
+        keyword arguments
+        
+        None
+        
+        returns
+        
+        None        --    writes all lines to the logfile
+        """
+
+        pass
+
+
     def close(self):
 
         """
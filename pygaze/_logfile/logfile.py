@@ -20,6 +20,8 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 import os
+import threading
+
 from pygaze import settings
 from pygaze._logfile.baselogfile import BaseLogfile
 # we try importing the copy_docstr function, but as we do not really need it
@@ -51,6 +53,9 @@ class Logfile(BaseLogfile):
 
         self.filename = filename + ".txt"
         self.logfile = open(self.filename, "w")
+        # lines may be written from other Threads (e.g. streamed joystick
+        # samples), so writing is protected by a Lock
+        self._lock = threading.Lock()
 
 
     def write(self, vallist, sync_to_disk=True):
@@ -68,13 +73,30 @@ class Logfile(BaseLogfile):
 
         # write line to file (on disk)
         if sync_to_disk:
-            self.logfile.write(line) # write to internal buffer
-            self.logfile.flush() # internal buffer to RAM
-            os.fsync(self.logfile.fileno()) # RAM file cache to disk
+            with self._lock:
+                self.logfile.write(line) # write to internal buffer
+                self.logfile.flush() # internal buffer to RAM
+                os.fsync(self.logfile.fileno()) # RAM file cache to disk
+
+
+    def write_batch(self, vallists):
+
+        # See _logfile.baselogfile.BaseLogfile
+
+        # one line per list of values, all written at once
+        lines = "".join(["\t".join(map(str, vallist)) + "\n" \
+            for vallist in vallists])
+
+        with self._lock:
+            self.logfile.write(lines)
+            self.logfile.flush()
+            os.fsync(self.logfile.fileno())
 
 
     def close(self):
 
         # See _logfile.baselogfile.BaseLogfile
 
-        self.logfile.close()
+        # wait for lines that are being written on other Threads
+        with self._lock:
+            self.logfile.close()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of PyGaze - the open-source toolbox for eye tracking
+#
+#    PyGaze is a Python module for easily creating gaze contingent experiments
+#    or other software (as well as non-gaze contingent experiments/software)
+#    Copyright (C) 2012-2013  Edwin S. Dalmaijer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+import collections
+import sys
+import threading
+
+from pygaze.libtime import clock
+
+import pygame
+
+
+class PyGameEventDispatcher:
+
+    """Collects all PyGame input events in a single place, so that the
+    keyboard, mouse and joystick do not throw away each other's events.
+    Every time the event queue is pumped, events are timestamped and
+    routed into a queue per device; events that no device is interested
+    in are discarded. Devices then wait for events in their own queue,
+    which blocks until an event arrives instead of spinning.
+
+    All Keyboard (Mouse, Joystick) instances share the same queue, so an
+    event is handled by the first instance that asks for it, as it would
+    be with a single PyGame event queue.
+
+    Optionally, a background Thread reads events as soon as they arrive,
+    so that response times do not depend on when the experiment gets
+    around to checking for input (e.g. while it is drawing, or waiting
+    for an eye tracker). Events are timestamped when they are read from
+    PyGame's event queue, as PyGame does not pass on SDL's own event
+    timestamps; with the Thread, that is as soon as they arrive.
+    """
+
+    # the PyGame event types that are routed to every device
+    ROUTES = {
+        pygame.KEYDOWN: "keyboard",
+        pygame.MOUSEBUTTONDOWN: "mouse",
+        pygame.JOYBUTTONDOWN: "joystick",
+        pygame.JOYAXISMOTION: "joystick",
+        pygame.JOYBALLMOTION: "joystick",
+        pygame.JOYHATMOTION: "joystick",
+        }
+
+    def __init__(self, maxlen=1024):
+
+        """Initializes a new PyGameEventDispatcher
+
+        keyword arguments
+
+        maxlen        --    maximum number of events in each device's queue;
+                        when a queue is full, the oldest events are
+                        dropped (default = 1024)
+        """
+
+        self.queues = {}
+        for device in set(self.ROUTES.values()):
+            self.queues[device] = collections.deque(maxlen=maxlen)
+
+        # the Thread that reads events, if it is running
+        self._thread = None
+        self._reading = False
+        # the Condition protects the queues, and wakes up waiting devices
+        self._newevent = threading.Condition(threading.Lock())
+
+    def _route(self, event, t):
+
+        """Adds an event to the queue of its device, if any
+
+        arguments
+
+        event        --    a pygame.event.Event
+        t            --    the time at which the event was read
+        """
+
+        device = self.ROUTES.get(event.type)
+        if device is not None:
+            with self._newevent:
+                self.queues[device].append((t, event))
+                self._newevent.notify_all()
+
+    def pump(self):
+
+        """Takes all events from the PyGame event queue, and routes them
+        into the device queues; this does nothing while the Thread is
+        reading events
+        """
+
+        if self._thread is not None:
+            return
+
+        events = pygame.event.get()
+        t = clock.get_time()
+        for event in events:
+            self._route(event, t)
+
+    def flush(self, device):
+
+        """Discards all events that are waiting for a device
+
+        arguments
+
+        device        --    "keyboard", "mouse" or "joystick"
+        """
+
+        self.pump()
+        with self._newevent:
+            self.queues[device].clear()
+
+    def wait(self, device, accept=None, timeout=None):
+
+        """Waits for an event of a device; events that are not accepted are
+        discarded
+
+        arguments
+
+        device        --    "keyboard", "mouse" or "joystick"
+
+        keyword arguments
+
+        accept        --    a function that takes an event and returns True
+                        if the event should be returned, or None to
+                        accept all events (default = None)
+        timeout        --    time in milliseconds after which None is
+                        returned, or None to wait indefinitely
+                        (default = None)
+
+        returns
+
+        t, event    --    the time at which the event arrived and the
+                        pygame.event.Event, or None after a timeout
+        """
+
+        queue = self.queues[device]
+        starttime = clock.get_time()
+        while True:
+            self.pump()
+            with self._newevent:
+                while queue:
+                    t, event = queue.popleft()
+                    if accept is None or accept(event):
+                        return t, event
+                # block until the next event arrives (or, at most, until
+                # the timeout passes), rather than polling the event queue
+                wait = 10
+                if timeout is not None:
+                    wait = timeout - (clock.get_time() - starttime)
+                    if wait < 0:
+                        return None
+                    wait = max(1, min(10, int(wait)))
+                if self._thread is not None:
+                    self._newevent.wait(wait / 1000.0)
+                    continue
+            event = pygame.event.wait(wait)
+            if event.type != pygame.NOEVENT:
+                self._route(event, clock.get_time())
+
+    def start(self):
+
+        """Starts reading events on a background Thread. SDL does not
+        support reading events on another Thread than the one that opened
+        the window; on Linux this happens to work, but on other platforms
+        (e.g. Windows and macOS) it does not, so this is only allowed on
+        Linux.
+        """
+
+        if self._thread is not None:
+            return
+        if not sys.platform.startswith("linux"):
+            raise Exception("Error in PyGameEventDispatcher.start: " \
+                "reading input on a background Thread is not supported " \
+                "on {}".format(sys.platform))
+
+        self._reading = True
+        self._thread = threading.Thread(target=self._read_events)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+
+        """Stops reading events on the background Thread"""
+
+        if self._thread is None:
+            return
+
+        self._reading = False
+        self._thread.join()
+        self._thread = None
+
+    def _read_events(self):
+
+        """Reads events as soon as they arrive, until stop is called (runs
+        on the background Thread)
+        """
+
+        while self._reading:
+            event = pygame.event.wait(10)
+            t = clock.get_time()
+            if event.type == pygame.NOEVENT:
+                continue
+            for e in [event] + pygame.event.get():
+                self._route(e, t)
+
+
+# the dispatcher that is shared by all input devices
+dispatcher = PyGameEventDispatcher()
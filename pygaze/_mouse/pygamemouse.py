@@ -19,11 +19,10 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-import copy
-
 from pygaze.libtime import clock
 from pygaze import settings
 from pygaze._mouse.basemouse import BaseMouse
+from pygaze._misc.pygameevents import dispatcher
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -114,26 +113,22 @@ class PyGameMouse(BaseMouse):
             mousebuttonlist = self.mbuttonlist
         if timeout == "default":
             timeout = self.timeout
-        # starttime
-        starttime = clock.get_time()
-        time = copy.copy(starttime)
         # wait for mouse clicks
-        while timeout == None or time - starttime <= timeout:
-            time = clock.get_time()
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    time = clock.get_time()
-                    clickpos = self.get_pos()
-                    if mousebuttonlist == None or event.button in mousebuttonlist:
-                        pressed = event.button
-                        return pressed, clickpos, time
+        response = dispatcher.wait("mouse", timeout=timeout,
+            accept=lambda event: mousebuttonlist == None or \
+            event.button in mousebuttonlist)
+        if response is not None:
+            time, event = response
+            return event.button, event.pos, time
         # in case of timeout
-        return None, None, time
+        return None, None, clock.get_time()
 
 
     def get_pressed(self):
 
         # See _mouse.basemouse.BaseMouse
 
-        pygame.event.get()
+        # pump the event queue to update the mouse state, keeping the
+        # events for the devices that wait for them
+        dispatcher.pump()
         return pygame.mouse.get_pressed()
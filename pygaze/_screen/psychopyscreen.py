@@ -60,7 +60,15 @@ except:
 
 class PsychoPyScreen(BaseScreen):
 
-    """A class for PsychoPy Screen objects, for visual stimuli (to be displayed via a Display object)"""
+    """A class for PsychoPy Screen objects, for visual stimuli (to be displayed via a Display object)
+
+    Constructing PsychoPy stimuli is expensive (text layout, texture
+    uploads), so every Screen keeps a pool of the stimuli it created. After
+    a call to clear, the draw_* methods reuse pooled stimuli of the same
+    type and with the same structural parameters (e.g. font, or image
+    file), and only update the attributes that actually changed (e.g. pos,
+    colour, or text).
+    """
     
     def __init__(self, dispsize=settings.DISPSIZE, fgc=settings.FGC,
         bgc=settings.BGC, screennr=settings.SCREENNR,
@@ -107,6 +115,11 @@ class PsychoPyScreen(BaseScreen):
         """
 
         self.screen = []
+        # pool of previously created stimuli: a dict with (stimulus type,
+        # structural parameters) keys, and lists of [stim, params] values
+        self._pool = {}
+        # the number of stimuli in each pool that are in the draw list
+        self._used = {}
         self.clear()
         if screen != None:
             self.copy(screen)
@@ -141,6 +154,7 @@ class PsychoPyScreen(BaseScreen):
             colour = self.bgc
         
         self.screen = []
+        self._used = {}
         self.draw_rect(colour=colour, x=0, y=0, w=self.dispsize[0], \
             h=self.dispsize[1], fill=True)
 
@@ -158,6 +172,69 @@ class PsychoPyScreen(BaseScreen):
         """
 
         self.screen = copy.copy(screen.screen)
+        # the stimuli are now shared between both screens, so the other
+        # screen should no longer recycle (and thus change) them
+        screen._release(self.screen)
+
+
+    def _stim(self, stimtype, key, construct, params):
+
+        """Adds a stimulus to the screen, reusing a pooled stimulus if
+        possible (internal use)
+        
+        arguments
+        stimtype    -- a PsychoPy stimulus class, e.g. Circle
+        key        -- a tuple of the structural parameters of the
+                   stimulus; only pooled stimuli with the same type and
+                   key are reused
+        construct    -- a dict of keyword arguments that are only passed
+                   when the stimulus is constructed
+        params    -- a dict of attributes that are updated on reused
+                   stimuli, but only when their values changed
+        
+        returns
+        stim        -- the stimulus that was added to self.screen
+        """
+
+        key = (stimtype,) + key
+        pool = self._pool.setdefault(key, [])
+        n = self._used.get(key, 0)
+        if n < len(pool):
+            stim, current = pool[n]
+            for name, value in params.items():
+                if current.get(name) != value:
+                    setattr(stim, name, value)
+                    current[name] = value
+        else:
+            args = dict(construct)
+            args.update(params)
+            stim = stimtype(pygaze.expdisplay, **args)
+            pool.append([stim, dict(params)])
+        self._used[key] = n + 1
+        self.screen.append(stim)
+
+        return stim
+
+
+    def _release(self, stims):
+
+        """Removes stimuli from the pool, so that they will not be reused
+        (internal use)
+        
+        arguments
+        stims    -- a list of PsychoPy stimuli
+        
+        returns
+        Nothing    -- updates the self._pool and self._used properties
+        """
+
+        stims = [id(stim) for stim in stims]
+        for key, pool in self._pool.items():
+            n = self._used.get(key, 0)
+            self._used[key] = len([entry for entry in pool[:n] \
+                if id(entry[0]) not in stims])
+            pool[:] = [entry for entry in pool[:n] \
+                if id(entry[0]) not in stims] + pool[n:]
             
 
     def draw_circle(self, colour=None, color=None, pos=None, r=50, pw=1, \
@@ -203,13 +280,15 @@ class PsychoPyScreen(BaseScreen):
         pos = pos2psychopos(pos,dispsize=self.dispsize)
 
         if fill:
-            self.screen.append(Circle(pygaze.expdisplay, radius=r, edges=32, \
-                pos=pos, lineWidth=pw, lineColor=colour, \
-                lineColorSpace='rgb', fillColor=colour, fillColorSpace='rgb'))
+            self._stim(Circle, ("circle", True), \
+                {"edges":32, "lineColorSpace":'rgb', "fillColorSpace":'rgb'}, \
+                {"radius":r, "pos":pos, "lineWidth":pw, "lineColor":colour, \
+                "fillColor":colour})
         else:
-            self.screen.append(Circle(pygaze.expdisplay, radius=r-pw, \
-                edges=32, pos=pos, lineWidth=pw, lineColor=colour, \
-                lineColorSpace='rgb'))
+            self._stim(Circle, ("circle", False), \
+                {"edges":32, "lineColorSpace":'rgb'}, \
+                {"radius":r-pw, "pos":pos, "lineWidth":pw, \
+                "lineColor":colour})
         
 
     def draw_ellipse(self, colour=None, color=None, x=None, y=None, w=50, \
@@ -266,13 +345,15 @@ class PsychoPyScreen(BaseScreen):
         pos = pos[0] + w/2, pos[1] - h/2
 
         if fill:
-            self.screen.append(Circle(pygaze.expdisplay, lineWidth=pw, \
-                lineColor=colour, lineColorSpace='rgb', fillColor=colour, \
-                fillColorSpace='rgb', pos=pos, size=(w,h)))
+            self._stim(Circle, ("ellipse", True), \
+                {"lineColorSpace":'rgb', "fillColorSpace":'rgb'}, \
+                {"lineWidth":pw, "lineColor":colour, "fillColor":colour, \
+                "pos":pos, "size":(w,h)})
         else:
-            self.screen.append(Circle(pygaze.expdisplay, lineWidth=pw, \
-                lineColor=colour, lineColorSpace='rgb', fillColor=None, \
-                pos=pos, size=(w,h)))
+            self._stim(Circle, ("ellipse", False), \
+                {"lineColorSpace":'rgb', "fillColor":None}, \
+                {"lineWidth":pw, "lineColor":colour, "pos":pos, \
+                "size":(w,h)})
 
         
     def draw_rect(self, colour=None, color=None, x=None, y=None, w=50, h=50, \
@@ -325,13 +406,15 @@ class PsychoPyScreen(BaseScreen):
         pos = pos[0] + w/2, pos[1] - h/2
 
         if fill:
-            self.screen.append(Rect(pygaze.expdisplay, width=w, height=h, \
-                lineWidth=pw, lineColor=colour, lineColorSpace='rgb', \
-                fillColor=colour, fillColorSpace='rgb', pos=pos))
+            self._stim(Rect, (True,), \
+                {"lineColorSpace":'rgb', "fillColorSpace":'rgb'}, \
+                {"width":w, "height":h, "lineWidth":pw, "lineColor":colour, \
+                "fillColor":colour, "pos":pos})
         else:
-            self.screen.append(Rect(pygaze.expdisplay, width=w, height=h, \
-                lineWidth=pw, lineColor=colour, lineColorSpace='rgb', \
-                fillColor=None, pos=pos))
+            self._stim(Rect, (False,), \
+                {"lineColorSpace":'rgb', "fillColor":None}, \
+                {"width":w, "height":h, "lineWidth":pw, "lineColor":colour, \
+                "pos":pos})
 
 
     def draw_line(self, colour=None, color=None, spos=None, epos=None, pw=1):
@@ -383,10 +466,8 @@ class PsychoPyScreen(BaseScreen):
         # <https://groups.google.com/forum/#!topic/psychopy-dev/1sKn6RrqH-8>
         #self.screen.append(Line(pygaze.expdisplay, start=spos, end=epos, \
         #    lineColor=colour, lineColorSpace='rgb', lineWidth=pw))
-        stim = ShapeStim(pygaze.expdisplay, lineWidth=pw, \
-            vertices=[spos, epos], lineColor=colour)
-
-        self.screen.append(stim)
+        self._stim(ShapeStim, ("line",), {}, \
+            {"lineWidth":pw, "vertices":[spos, epos], "lineColor":colour})
 
 
     def draw_polygon(self, pointlist, colour=None, color=None, pw=1, \
@@ -430,14 +511,14 @@ class PsychoPyScreen(BaseScreen):
             pl.append(pos2psychopos(pos,dispsize=self.dispsize))
 
         if fill:
-            self.screen.append(ShapeStim(pygaze.expdisplay, lineWidth=pw, \
-                lineColor=colour, lineColorSpace='rgb', fillColor=colour, \
-                fillColorSpace='rgb',vertices=pl, closeShape=True))
+            fillcolour = colour
         else:
-            self.screen.append(ShapeStim(pygaze.expdisplay, lineWidth=pw, \
-                lineColor=colour, lineColorSpace='rgb', \
-                fillColor=rgb2psychorgb(self.bgc), fillColorSpace='rgb', \
-                vertices=pl, closeShape=True))
+            fillcolour = rgb2psychorgb(self.bgc)
+        self._stim(ShapeStim, ("polygon",), \
+            {"lineColorSpace":'rgb', "fillColorSpace":'rgb', \
+            "closeShape":True}, \
+            {"lineWidth":pw, "lineColor":colour, "fillColor":fillcolour, \
+            "vertices":pl})
 
             
     def draw_fixation(self, fixtype="cross", colour=None, color=None, \
@@ -568,18 +649,23 @@ class PsychoPyScreen(BaseScreen):
         colour = rgb2psychorgb(colour)
         pos = pos2psychopos(pos,dispsize=self.dispsize)
 
-        self.screen.append(TextStim(pygaze.expdisplay, text=str(text), \
-            font=font, pos=pos, color=colour, height=fontsize, \
-            antialias=antialias, alignHoriz=align, \
-            fontFiles=pygaze.FONTFILES, wrapWidth=wrap_width))
+        # the font and layout parameters are part of the pool key, so that
+        # a reused TextStim only needs its text, position and colour set
+        stim = self._stim(TextStim, \
+            (font, fontsize, antialias, align, wrap_width), \
+            {"font":font, "height":fontsize, "antialias":antialias, \
+            "alignHoriz":align, "fontFiles":pygaze.FONTFILES, \
+            "wrapWidth":wrap_width}, \
+            {"text":str(text), "pos":pos, "color":colour})
         # PsychoPy deprecated "alignHoriz", but in version 3.2.4 (and maybe
         # also others, who knows?) its replacements "alignText" and
         # "anchorHoriz" are unknown keyword arguments to __init__. Yet,
         # "alignHoriz" does NOT work any longer. I guess alignment is just
         # broken now? The ugly workaround below will NOT work for those broken
         # versions of PsychoPy, but will at least not crash them.
-        self.screen[-1].anchorHoriz = align
-        self.screen[-1].alignText = align
+        if getattr(stim, "anchorHoriz", None) != align:
+            stim.anchorHoriz = align
+            stim.alignText = align
 
 
     def draw_image(self, image, pos=None, scale=None):
@@ -616,8 +702,14 @@ class PsychoPyScreen(BaseScreen):
                 imgsize = None
                 print("WARNING! libscreen.Screen: PIL's Image class could not be loaded; image scaling with PsychoPy disptype is now impossible!")
             
-        self.screen.append(ImageStim(pygaze.expdisplay, image=image, \
-            pos=pos, size=imgsize))
+        # images from the same file share a pooled stimulus (and thus its
+        # texture); other images (e.g. arrays) are never reused
+        if type(image) == str:
+            self._stim(ImageStim, (image, imgsize), \
+                {"image":image, "size":imgsize}, {"pos":pos})
+        else:
+            self.screen.append(ImageStim(pygaze.expdisplay, image=image, \
+                pos=pos, size=imgsize))
 
 
     def set_background_colour(self, colour=None, color=None):
@@ -31,7 +31,6 @@ try:
 except:
     pass
 
-import copy
 import math
 import os.path
 
@@ -43,7 +42,15 @@ import pygame.image
 
 class PyGameScreen(BaseScreen):
 
-    """A class for PyGame Screen objects, for visual stimuli (to be displayed via a Display object)"""
+    """A class for PyGame Screen objects, for visual stimuli (to be displayed via a Display object)
+
+    Drawing operations are not rendered straight away, but recorded in an
+    overlay draw list on top of a (shared, never modified) base layer. The
+    layers are flattened into a single Surface only when the screen
+    property is requested (e.g. in Display.fill), and the flattened
+    Surface is cached until one of the layers changes. This means that
+    copying a Screen, or creating one on the basis of another, is cheap.
+    """
     
     def __init__(self, dispsize=settings.DISPSIZE, fgc=settings.FGC,
         bgc=settings.BGC, mousevisible=settings.MOUSEVISIBLE, screen=None,
@@ -88,11 +95,87 @@ class PyGameScreen(BaseScreen):
                    disptype
         """
 
-        self.screen = pygame.Surface(self.dispsize)
-        self.screen.fill(self.bgc)
+        self._fillcolour = self.bgc
+        self._base = None
+        self._layer = []
+        self._canvas = None
+        self._valid = False
+        self._shared = False
 
         if screen is not None:
-            self.screen.blit(screen.screen,(0,0))
+            # the other screen's flattened surface becomes our base layer;
+            # it will never be drawn on again, so it can be shared
+            self._base = screen.screen
+            screen._shared = True
+
+
+    @property
+    def screen(self):
+
+        """The flattened PyGame Surface of this Screen; it is only (re)
+        rendered when the base layer or the draw list have changed
+        """
+
+        if not self._valid:
+            self._flatten()
+        return self._canvas
+
+
+    @screen.setter
+    def screen(self, surface):
+
+        self._fillcolour = self.bgc
+        self._base = surface
+        self._layer = []
+        self._canvas = surface
+        self._valid = True
+        # we do not own this surface, so we should not draw on it
+        self._shared = True
+
+
+    def _flatten(self):
+
+        """Renders the base layer and the draw list onto the canvas Surface
+        
+        arguments
+        None
+        
+        returns
+        Nothing    -- updates the self._canvas property
+        """
+
+        # the canvas is only reused if no other Screen refers to it
+        if self._canvas is None or self._shared:
+            self._canvas = pygame.Surface(self.dispsize)
+            self._shared = False
+        self._canvas.fill(self._fillcolour)
+        if self._base is not None:
+            self._canvas.blit(self._base, (0,0))
+        for func, args in self._layer:
+            func(self._canvas, *args)
+        self._valid = True
+
+
+    def _draw(self, func, *args):
+
+        """Adds a drawing operation to the overlay draw list
+        
+        arguments
+        func        -- a function that takes the target Surface as its first
+                   argument, e.g. pygame.draw.circle or
+                   pygame.Surface.blit
+        args        -- the remaining arguments for func
+        
+        returns
+        Nothing    -- appends to the draw list, and updates the cached
+                   canvas if it is up-to-date and not shared
+        """
+
+        self._layer.append((func, args))
+        if self._valid and not self._shared:
+            func(self._canvas, *args)
+        else:
+            self._valid = False
 
 
     def clear(self, colour=None, color=None):
@@ -124,7 +207,10 @@ class PyGameScreen(BaseScreen):
         if colour is None:
             colour = self.bgc
         
-        self.screen.fill(colour)
+        self._fillcolour = colour
+        self._base = None
+        self._layer = []
+        self._valid = False
 
 
     def copy(self, screen):
@@ -135,11 +221,18 @@ class PyGameScreen(BaseScreen):
         screen    -- a libscreen.Screen object
         
         returns
-        Nothing    -- sets the self.screen property to a copy of
-                   screen.screen
+        Nothing    -- shares the layers of screen; nothing is actually
+                   copied until either of the screens is changed
         """
 
-        self.screen = copy.copy(screen.screen)
+        self._fillcolour = screen._fillcolour
+        self._base = screen._base
+        self._layer = list(screen._layer)
+        self._canvas = screen._canvas
+        self._valid = screen._valid
+        # the canvas is now shared, so neither screen can draw on it
+        self._shared = True
+        screen._shared = True
             
 
     def draw_circle(self, colour=None, color=None, pos=None, r=50, pw=1, \
@@ -183,7 +276,7 @@ class PyGameScreen(BaseScreen):
         if fill:
             pw = 0
 
-        pygame.draw.circle(self.screen, colour, (int(pos[0]),int(pos[1])), int(r), int(pw))
+        self._draw(pygame.draw.circle, colour, (int(pos[0]),int(pos[1])), int(r), int(pw))
         
 
     def draw_ellipse(self, colour=None, color=None, x=None, y=None, w=50, \
@@ -236,7 +329,7 @@ class PyGameScreen(BaseScreen):
         if fill:
             pw = 0
 
-        pygame.draw.ellipse(self.screen, colour, \
+        self._draw(pygame.draw.ellipse, colour, \
             [int(x),int(y),int(w),int(h)], int(pw))
 
         
@@ -286,7 +379,7 @@ class PyGameScreen(BaseScreen):
         if fill:
             pw = 0
 
-        pygame.draw.rect(self.screen, colour, [int(x),int(y),int(w),int(h)], \
+        self._draw(pygame.draw.rect, colour, [int(x),int(y),int(w),int(h)], \
             int(pw))
 
 
@@ -330,7 +423,7 @@ class PyGameScreen(BaseScreen):
         if epos is None:
             epos = (int(self.dispsize[0]*0.75), self.dispsize[1]/2)
 
-        pygame.draw.line(self.screen, colour, (int(spos[0]),int(spos[1])), (int(epos[0]),int(epos[1])), int(pw))
+        self._draw(pygame.draw.line, colour, (int(spos[0]),int(spos[1])), (int(epos[0]),int(epos[1])), int(pw))
 
 
     def draw_polygon(self, pointlist, colour=None, color=None, pw=1, \
@@ -370,10 +463,9 @@ class PyGameScreen(BaseScreen):
         if fill:
             pw = 0
         
-        for i in range(len(pointlist)):
-            pointlist[i] = [int(pointlist[i][0]),int(pointlist[i][1])]
+        pointlist = [[int(x), int(y)] for x, y in pointlist]
 
-        pygame.draw.polygon(self.screen, colour, pointlist, int(pw))
+        self._draw(pygame.draw.polygon, colour, pointlist, int(pw))
 
 
     def draw_fixation(self, fixtype="cross", colour=None, color=None, \
@@ -428,19 +520,19 @@ class PyGameScreen(BaseScreen):
         pw = int(pw)
 
         if fixtype == "cross":
-            pygame.draw.line(self.screen, colour, (pos[0]-r, pos[1]), \
+            self._draw(pygame.draw.line, colour, (pos[0]-r, pos[1]), \
                 (pos[0]+r, pos[1]), pw)
-            pygame.draw.line(self.screen, colour, (pos[0], pos[1]-r), \
+            self._draw(pygame.draw.line, colour, (pos[0], pos[1]-r), \
                 (pos[0], pos[1]+r), pw)
         elif fixtype == "x":
             x = int(math.cos(math.radians(45)) * r)
             y = int(math.sin(math.radians(45)) * r)
-            pygame.draw.line(self.screen, colour, (pos[0]-x, pos[1]-y), \
+            self._draw(pygame.draw.line, colour, (pos[0]-x, pos[1]-y), \
                 (pos[0]+x, pos[1]+y), pw)
-            pygame.draw.line(self.screen, colour, (pos[0]-x, pos[1]+y), \
+            self._draw(pygame.draw.line, colour, (pos[0]-x, pos[1]+y), \
                 (pos[0]+x, pos[1]-y), pw)
         elif fixtype == "dot":
-            pygame.draw.circle(self.screen, colour, pos, r, 0)
+            self._draw(pygame.draw.circle, colour, pos, r, 0)
 
 
     def draw_text(self, text="text", colour=None, color=None, pos=None, \
@@ -522,7 +614,7 @@ class PyGameScreen(BaseScreen):
                 linepos = (pos[0] - font.size(lines[lnr])[0]/2, pos[1] + lineh * (2 * (lnr - (len(lines)/2.0) + 0.5)))
             else:
                 linepos = (pos[0], pos[1] + 2 * lnr)
-            self.screen.blit(txtsurf, (int(linepos[0]),int(linepos[1])))
+            self._draw(pygame.Surface.blit, txtsurf, (int(linepos[0]),int(linepos[1])))
     
     
     def draw_image(self, image, pos=None, scale=None):
@@ -581,7 +673,7 @@ class PyGameScreen(BaseScreen):
         imgpos = (int(pos[0] - img.get_width()/2), \
             int(pos[1] - img.get_height()/2))
         
-        self.screen.blit(img, imgpos)
+        self._draw(pygame.Surface.blit, img, imgpos)
 
 
     def set_background_colour(self, colour=None, color=None):
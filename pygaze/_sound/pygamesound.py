@@ -20,7 +20,9 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 from pygaze import settings
+from pygaze.libtime import clock
 from pygaze._sound.basesound import BaseSound
+from pygaze._sound.soundcache import SoundCache
 # we try importing the copy_docstr function, but as we do not really need it
 # for a proper functioning of the code, we simply ignore it when it fails to
 # be imported correctly
@@ -33,7 +35,10 @@ import math
 import numpy
 import os.path
 import pygame
-import random
+import time
+
+# buffers of all sounds that were created, shared by all Sound instances
+_cache = SoundCache(maxsize=settings.SOUNDCACHESIZE)
 
 
 class PyGameSound(BaseSound):
@@ -60,52 +65,73 @@ class PyGameSound(BaseSound):
             size=settings.SOUNDSAMPLESIZE, channels=settings.SOUNDCHANNELS,
             buffer=settings.SOUNDBUFFERSIZE)
 
-        # if a sound file was specified, use soundfile and ignore other keyword arguments
+        # sounds are identified by how they were made and by the mixer's
+        # format; the buffers of known sounds are reused from the cache
         if soundfile is not None:
-            if not os.path.exists(soundfile):
-                raise Exception("Error in libsound.Player.__init__(): Sound file '{}' not found!".format(soundfile))
-            if os.path.splitext(soundfile)[1].lower() not in (".ogg", ".wav"):
-                raise Exception("Error in libsound.Player.__init__(): Sound file '{}' is not in .ogg or .wav format!".format(soundfile))
-
-            self.sound = pygame.mixer.Sound(soundfile)
-
-        # if no soundfile was specified, use keyword arguments to create sound
+            key = (None, None, None, None, None, soundfile,
+                pygame.mixer.get_init())
         else:
-            if osc == "sine":
-                _func = math.sin
-            elif osc == "saw":
-                _func = self.saw
-            elif osc == "square":
-                _func = self.square
-            elif osc == "whitenoise":
-                _func = self.white_noise
-            else:
-                raise Exception("Error in libsound.Sound.__init__(): oscillator '{}' could not be recognized; oscillator is set to 'sine'.".format(osc))
-
-            l = []
+            key = (osc, freq, length, attack, decay, None,
+                pygame.mixer.get_init())
+        buf = _cache.get(key)
 
-            attack = attack * (settings.SOUNDSAMPLINGFREQUENCY // 1000)
-            decay = decay * (settings.SOUNDSAMPLINGFREQUENCY // 1000)
-            amp = 32767 // 2
-            sps = settings.SOUNDSAMPLINGFREQUENCY
-            # cycles per sample
-            cps = float(sps/freq)
-            # number of samples
-            slen = (settings.SOUNDSAMPLINGFREQUENCY * length) // 1000
+        if buf is None:
+            # if a sound file was specified, use soundfile and ignore other keyword arguments
+            if soundfile is not None:
+                if not os.path.exists(soundfile):
+                    raise Exception("Error in libsound.Player.__init__(): Sound file '{}' not found!".format(soundfile))
+                if os.path.splitext(soundfile)[1].lower() not in (".ogg", ".wav"):
+                    raise Exception("Error in libsound.Player.__init__(): Sound file '{}' is not in .ogg or .wav format!".format(soundfile))
 
-            for i in range(slen):
-                p = float((i % cps)) / cps * 2 * math.pi
-                v = int(amp * (_func(p)))
-                if i < attack:
-                    v = int(v * float(i) / attack)
-                if i > slen - decay:
-                    v = int(v * (float(slen) - float(i)) / decay)
-                l.append(v)
-                l.append(v)
+                buf = pygame.mixer.Sound(soundfile).get_raw()
 
-            b = numpy.array(l, dtype="int16").reshape(len(l) // 2, 2)
-
-            self.sound = pygame.mixer.Sound(b)
+            # if no soundfile was specified, use keyword arguments to create sound
+            else:
+                if osc == "sine":
+                    _func = numpy.sin
+                elif osc == "saw":
+                    _func = self.saw
+                elif osc == "square":
+                    _func = self.square
+                elif osc == "whitenoise":
+                    _func = self.white_noise
+                else:
+                    raise Exception("Error in libsound.Sound.__init__(): oscillator '{}' could not be recognized; oscillator is set to 'sine'.".format(osc))
+
+                attack = attack * (settings.SOUNDSAMPLINGFREQUENCY // 1000)
+                decay = decay * (settings.SOUNDSAMPLINGFREQUENCY // 1000)
+                amp = 32767 // 2
+                sps = settings.SOUNDSAMPLINGFREQUENCY
+                # cycles per sample
+                cps = float(sps/freq)
+                # number of samples
+                slen = (settings.SOUNDSAMPLINGFREQUENCY * length) // 1000
+
+                # phase of every sample, and the waveform
+                i = numpy.arange(slen, dtype=float)
+                p = (i % cps) / cps * 2 * math.pi
+                v = numpy.trunc(amp * _func(p))
+                # attack and decay envelope
+                if attack > 0:
+                    a = i < attack
+                    v[a] = numpy.trunc(v[a] * i[a] / attack)
+                if decay > 0:
+                    d = i > slen - decay
+                    v[d] = numpy.trunc(v[d] * (slen - i[d]) / decay)
+
+                # the same waveform for both channels
+                b = numpy.repeat(v.astype("int16"), 2).reshape(slen, 2)
+
+                buf = b.tobytes()
+
+            # white noise is not cached, as every instance should be
+            # different noise
+            if osc != "whitenoise" or soundfile is not None:
+                _cache.put(key, buf)
+
+        # every instance gets its own copy of the buffer, so that panning one
+        # sound does not affect others
+        self.sound = pygame.mixer.Sound(buffer=buf)
 
 
     def saw(self, phase):
@@ -123,12 +149,13 @@ class PyGameSound(BaseSound):
         
         returns
         
-        p        --    point in a saw wave
+        p        --    point in a saw wave (or an array of points if phase
+                    is an array)
         """
 
         phase = phase % math.pi
 
-        return float(phase) / (0.5 * math.pi) - 1.0
+        return phase / (0.5 * math.pi) - 1.0
 
 
     def square(self, phase):
@@ -145,12 +172,11 @@ class PyGameSound(BaseSound):
         None
         
         returns
-        p        --    point in a square wave
+        p        --    point in a square wave (or an array of points if
+                    phase is an array)
         """
 
-        if phase < math.pi:
-            return 1
-        return -1
+        return numpy.where(phase < math.pi, 1, -1)
 
 
     def white_noise(self, phase):
@@ -169,10 +195,11 @@ class PyGameSound(BaseSound):
         
         returns
         
-        p        --    random number (i.e. a point in white noise sound)
+        p        --    random number (i.e. a point in white noise sound), or
+                    an array of random numbers if phase is an array
         """
 
-        return random.random()
+        return numpy.random.random(numpy.shape(phase))
 
 
     def pan(self, panning):
@@ -183,6 +210,12 @@ class PyGameSound(BaseSound):
         if type(panning) not in (int, float) and panning not in ["left","right"]:
             raise Exception("Error in libsound.Sound.pan(): panning must be a value between -1.0 and 1.0 or either 'left' or 'right'.")
 
+        # full panning
+        if panning == "left":
+            panning = -1
+        elif panning == "right":
+            panning = 1
+
         # correct wrong inputs
         if panning < -1:
             panning = -1
@@ -191,28 +224,14 @@ class PyGameSound(BaseSound):
         
         # round off, to prevent too long numbers
         panning = numpy.round(panning, decimals=8)
-        
-
-        buf = pygame.sndarray.array(self.sound)
-
-        for i in range(len(buf)):
-
-            l = buf[i][0]
-            r = buf[i][1]
-
-            if panning == 'left':
-                r = 0
-            elif panning == 'right':
-                l = 0
-            elif panning < 0:
-                r = int(float(r) / numpy.abs(panning))
-            elif panning > 0:
-                l = int(float(l) / numpy.abs(panning))
 
-            buf[i][0] = l
-            buf[i][1] = r
-
-        self.sound = pygame.sndarray.make_sound(numpy.array(buf))
+        # the volume of the 'unpanned' channel decreases; the samples are
+        # changed in place, in the sound's own buffer
+        buf = pygame.sndarray.samples(self.sound)
+        if panning < 0:
+            buf[:,1] = (buf[:,1] * (1.0 + panning)).astype(buf.dtype)
+        elif panning > 0:
+            buf[:,0] = (buf[:,0] * (1.0 - panning)).astype(buf.dtype)
 
 
     def play(self, repeats=0):
@@ -237,3 +256,91 @@ class PyGameSound(BaseSound):
             self.sound.set_volume(volume)
         else:
             raise Exception("Error in libsound.Sound.set_volume(): Volume must be a value between 0.0 and 1.0.")
+
+
+def preload(sounds):
+
+    """
+    Creates sounds ahead of time, so that creating the same sounds later
+    on (e.g. within a trial) reuses their cached buffers
+    
+    arguments
+    
+    sounds    --    a list of sounds, each either a dict of keyword arguments
+                for Sound (e.g. {"osc":"square", "freq":880}) or the path
+                to a .ogg or .wav file
+    
+    keyword arguments
+    
+    None
+    
+    returns
+    
+    None        --    the sounds' buffers are stored in the cache
+    """
+
+    for sound in sounds:
+        if isinstance(sound, dict):
+            PyGameSound(**sound)
+        else:
+            PyGameSound(soundfile=sound)
+
+
+def measure_latency(repeats=10, length=50):
+
+    """
+    Measures the delay between calling play and the mixer playing a sound,
+    which helps to choose SOUNDBUFFERSIZE. Every repeat plays a short sound
+    and times it until the mixer is done with it; the delay is the time
+    that this took beyond the sound's length. The sound card adds about one
+    more buffer (and its own latency) before the sound is actually heard,
+    which is included in the estimated output delay.
+    
+    arguments
+    
+    None
+    
+    keyword arguments
+    
+    repeats    --    number of times a sound is played (default = 10)
+    length    --    length of the played sound in milliseconds (default =
+                50)
+    
+    returns
+    
+    latency    --    a dict with the mixer's "frequency" in Hz, the
+                "buffersize" in samples, the "bufferduration" in ms, the
+                mean duration of the "playcall" in ms, the mean "delay"
+                and its "delay_sd" in ms, all measured "delays", and the
+                estimated "outputdelay" in ms
+    """
+
+    sound = PyGameSound(osc="sine", length=length, attack=0, decay=0)
+    sound.set_volume(0.0)
+    freq = pygame.mixer.get_init()[0]
+
+    playcalls = []
+    delays = []
+    for i in range(repeats):
+        # wait for the mixer to finish all other sounds
+        while pygame.mixer.get_busy():
+            time.sleep(0.001)
+        t0 = clock.get_time()
+        channel = sound.sound.play()
+        t1 = clock.get_time()
+        while channel is not None and channel.get_sound() is sound.sound:
+            time.sleep(0.0002)
+        t2 = clock.get_time()
+        playcalls.append(t1 - t0)
+        delays.append(t2 - t0 - length)
+
+    bufferduration = 1000.0 * settings.SOUNDBUFFERSIZE / freq
+
+    return {"frequency": freq,
+        "buffersize": settings.SOUNDBUFFERSIZE,
+        "bufferduration": bufferduration,
+        "playcall": float(numpy.mean(playcalls)),
+        "delay": float(numpy.mean(delays)),
+        "delay_sd": float(numpy.std(delays)),
+        "delays": delays,
+        "outputdelay": float(numpy.mean(delays)) + bufferduration}
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of PyGaze - the open-source toolbox for eye tracking
+#
+#    PyGaze is a Python module for easily creating gaze contingent experiments
+#    or other software (as well as non-gaze contingent experiments/software)
+#    Copyright (C) 2012-2013  Edwin S. Dalmaijer
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+import collections
+import threading
+
+
+class SoundCache:
+
+    """A memory-bounded cache of sound buffers, so that sounds that are
+    created over and over again (e.g. within every trial) only need to be
+    synthesized or loaded from file once. Buffers are raw sample data in
+    the mixer's format, and are stored with a key that describes how the
+    sound was made. When the cache exceeds its maximum size, the buffers
+    that were used least recently are evicted.
+    """
+
+    def __init__(self, maxsize=64*1024*1024):
+
+        """Initializes a new SoundCache
+
+        keyword arguments
+
+        maxsize        --    maximum total size of all cached buffers in
+                        bytes, or 0 to disable caching (default =
+                        64 MB, which holds about 5 minutes of 48 kHz
+                        16-bit stereo sound)
+        """
+
+        self.maxsize = maxsize
+        # the total size of all cached buffers
+        self.nbytes = 0
+
+        self._buffers = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+
+        return len(self._buffers)
+
+    def __contains__(self, key):
+
+        return key in self._buffers
+
+    def get(self, key):
+
+        """Returns a cached buffer, and marks it as the most recently used
+
+        arguments
+
+        key            --    the key of the buffer
+
+        returns
+
+        buf            --    the cached buffer, or None if the key is not in
+                        the cache
+        """
+
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is not None:
+                self._buffers.move_to_end(key)
+
+        return buf
+
+    def put(self, key, buf):
+
+        """Adds a buffer to the cache, evicting the least recently used
+        buffers if the cache becomes too large; buffers that are larger
+        than the whole cache are not stored
+
+        arguments
+
+        key            --    the key of the buffer
+        buf            --    a bytes object with the sound's raw samples
+        """
+
+        if len(buf) > self.maxsize:
+            return
+
+        with self._lock:
+            if key in self._buffers:
+                self.nbytes -= len(self._buffers.pop(key))
+            self._buffers[key] = buf
+            self.nbytes += len(buf)
+            while self.nbytes > self.maxsize:
+                k, b = self._buffers.popitem(last=False)
+                self.nbytes -= len(b)
+
+    def clear(self):
+
+        """Removes all buffers from the cache"""
+
+        with self._lock:
+            self._buffers.clear()
+            self.nbytes = 0
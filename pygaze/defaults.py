@@ -69,6 +69,9 @@ SOUNDSAMPLINGFREQUENCY = 48000
 SOUNDSAMPLESIZE = -16
 # Default sound channels. 1 for mono, 2 for stereo.
 SOUNDCHANNELS = 2
+# Maximum memory in bytes for cached sounds (synthesized or loaded from file),
+# so that identical sounds are only created once. Set to 0 to disable caching.
+SOUNDCACHESIZE = 64*1024*1024
 
 # INPUT
 # Default allowed mouse button list. None to allow all buttons, or a list for
@@ -89,6 +92,10 @@ KEYTIMEOUT = None
 JOYBUTTONLIST = None
 # Default joystick response timeout in milliseconds. Set to None for no timeout.
 JOYTIMEOUT = None
+# Boolean indicating whether keyboard, mouse and joystick events should be read
+# on a background thread as soon as they arrive, so that response times do not
+# depend on how often the experiment checks for input (PyGame only, Linux only).
+INPUTTHREAD = False
 
 # EYETRACKER
 # Tracker type. Choose from: "alea", "eyelink", "eyelogic", "eyetribe", "opengaze",
@@ -42,3 +42,32 @@ class Sound(BaseSound):
         self.__class__ = Sound
         self.__class__.__init__(self, **args)
         copy_docstr(BaseSound, Sound)
+
+
+def preload(sounds, disptype=settings.DISPTYPE):
+
+    """
+    Creates sounds ahead of time, so that creating the same sounds later
+    on reuses their cached buffers; see
+    pygaze._sound.pygamesound.preload
+    """
+
+    if disptype in ("pygame", "psychopy", "opensesame"):
+        from pygaze._sound.pygamesound import preload
+    else:
+        raise Exception("Unexpected disptype: {}".format(disptype))
+    preload(sounds)
+
+
+def measure_latency(disptype=settings.DISPTYPE, **args):
+
+    """
+    Measures the delay between calling play and the mixer playing a sound;
+    see pygaze._sound.pygamesound.measure_latency
+    """
+
+    if disptype in ("pygame", "psychopy", "opensesame"):
+        from pygaze._sound.pygamesound import measure_latency
+    else:
+        raise Exception("Unexpected disptype: {}".format(disptype))
+    return measure_latency(**args)